@@ -0,0 +1,4 @@
+"""Замеры бота без подключения к Discord.
+
+Запуск: `python -m benchmarks.commands --help`.
+"""
@@ -0,0 +1,117 @@
+"""Замер `/browse`: страницы категории по ключу против OFFSET.
+
+Для каждой глубины ключ предыдущей страницы находится заранее, а затем
+замеряются `Database.browse_category` с этим ключом и тот же запрос с OFFSET.
+С ключом дальняя страница стоит столько же, сколько первая; OFFSET читает
+и отбрасывает все предыдущие строки индекса.
+
+    python -m benchmarks.browse --users 670000 --depths 0 100 1000 10000 --json browse.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from benchmarks.harness import DEFAULT_DATA_DIR, BenchEnvironment, environment_info, percentile
+from bot.database import Project
+from bot.misc.config import BotConfig
+
+
+def _page_query(category_norm: str):
+    return (
+        select(Project)
+        .options(joinedload(Project.user))
+        .where(Project.category_norm == category_norm)
+        .order_by(Project.created_at.desc(), Project.id.desc())
+    )
+
+
+async def offset_page(env: BenchEnvironment, category_norm: str, page: int, per_page: int) -> List[Project]:
+    async with env.bot.db.get_session() as session:
+        result = await session.scalars(_page_query(category_norm).offset(page * per_page).limit(per_page))
+        return result.unique().all()
+
+
+async def run_browse(args: argparse.Namespace) -> Dict[str, Any]:
+    per_page = BotConfig.BROWSE_PAGE_SIZE
+
+    async with BenchEnvironment(args.users, args.seed, args.data_dir) as env:
+        category, = await env.bot.db.get_categories(limit=1)
+        pages = -(-category.project_count // per_page)
+        result = {
+            'users': args.users,
+            'category': category.name,
+            'category_projects': category.project_count,
+            'depths': [],
+        }
+
+        for depth in args.depths:
+            if depth >= pages:
+                continue
+
+            # Ключ конца предыдущей страницы — его хранит view при листании
+            after = None
+            if depth:
+                previous = await offset_page(env, category.norm, depth - 1, per_page)
+                after = (previous[-1].created_at, previous[-1].id)
+
+            keyset, offset = [], []
+            for _ in range(args.iterations):
+                started_at = time.perf_counter()
+                await env.bot.db.browse_category(category.norm, after, per_page)
+                keyset.append(time.perf_counter() - started_at)
+
+                started_at = time.perf_counter()
+                await offset_page(env, category.norm, depth, per_page)
+                offset.append(time.perf_counter() - started_at)
+
+            row = {
+                'page': depth,
+                'keyset_p50_ms': percentile(keyset, 0.5) * 1000,
+                'keyset_p99_ms': percentile(keyset, 0.99) * 1000,
+                'offset_p50_ms': percentile(offset, 0.5) * 1000,
+                'offset_p99_ms': percentile(offset, 0.99) * 1000,
+            }
+            result['depths'].append(row)
+            print(
+                f"стр. {depth:>7}  ключ p50 {row['keyset_p50_ms']:>7.2f} мс  p99 {row['keyset_p99_ms']:>7.2f} мс  "
+                f"OFFSET p50 {row['offset_p50_ms']:>7.2f} мс  p99 {row['offset_p99_ms']:>7.2f} мс"
+            )
+
+        started_at = time.perf_counter()
+        for _ in range(args.iterations):
+            await env.bot.db.get_categories()
+        result['categories_ms'] = (time.perf_counter() - started_at) / args.iterations * 1000
+        print(f"Список категорий: {result['categories_ms']:.2f} мс")
+
+        return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер постраничного просмотра категорий")
+    parser.add_argument('--users', type=int, default=670_000, help="Размер заполненной базы")
+    parser.add_argument('--depths', type=int, nargs='+', default=[0, 100, 1000, 10000],
+                        help="Номера страниц самой крупной категории")
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--json', help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(run_browse(args))
+    print(f"Категория «{result['category']}»: {result['category_projects']} проектов")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment_info(), 'run': result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Замер команд на заполненной базе.
+
+Команды вызываются напрямую, как `Context.invoke`: без проверок и хуков, но
+через настоящие коги, базу, хранилище и очередь отправки. Для каждой команды
+считаются p50/p99, SQL-запросы и байты, отправленные в Discord.
+
+    python -m benchmarks.commands --users 10000 100000 1000000 --json results.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from benchmarks.fakes import FakeMember
+from benchmarks.harness import DEFAULT_DATA_DIR, BenchEnvironment, environment_info, percentile
+
+COMMANDS = ('add-project', 'add-media', 'preview', 'profile', 'set-links')
+
+
+@dataclass
+class Samples:
+    latencies: List[float] = field(default_factory=list)
+    statements: List[int] = field(default_factory=list)
+    bytes_sent: List[int] = field(default_factory=list)
+    messages: List[int] = field(default_factory=list)
+    # Для add-media: от вызова команды до замены подтверждения результатом
+    job_latencies: List[float] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, Any]:
+        count = len(self.latencies)
+        summary = {
+            'count': count,
+            'p50_ms': percentile(self.latencies, 0.5) * 1000,
+            'p99_ms': percentile(self.latencies, 0.99) * 1000,
+            'mean_ms': sum(self.latencies) / count * 1000 if count else 0.0,
+            'statements_per_call': sum(self.statements) / count if count else 0.0,
+            'bytes_sent_per_call': sum(self.bytes_sent) / count if count else 0.0,
+            'messages_per_call': sum(self.messages) / count if count else 0.0,
+        }
+
+        if self.job_latencies:
+            summary['job_p50_ms'] = percentile(self.job_latencies, 0.5) * 1000
+            summary['job_p99_ms'] = percentile(self.job_latencies, 0.99) * 1000
+
+        return summary
+
+
+async def _run_command(env: BenchEnvironment, name: str, iteration: int, rng: random.Random,
+                       sample: Samples) -> None:
+    channel = env.channel(rng.choice(env.guilds))
+
+    if name == 'add-project':
+        ctx = env.context(name, env.random_user(rng), channel)
+        args, kwargs = (f"Bench {iteration}", "Дизайн"), {'description': f"Проект для замера {iteration}"}
+    elif name == 'add-media':
+        (author, project_name), = await env.sample_projects(rng, 1)
+        ctx = env.context(name, author, channel, attachments=env.attachments(rng, rng.randrange(1, 4)))
+        args, kwargs = (project_name,), {}
+    elif name in ('preview', 'profile'):
+        ctx = env.context(name, env.random_user(rng), channel)
+        args, kwargs = (FakeMember(env.random_user(rng)),), {}
+    else:
+        ctx = env.context(name, env.random_user(rng), channel)
+        args, kwargs = (), {'links': f"GitHub: github.com/bench{iteration}, Сайт: example.com/{iteration}"}
+
+    statements = env.statements
+    started_at = time.perf_counter()
+    await ctx.command(ctx, *args, **kwargs)
+    sample.latencies.append(time.perf_counter() - started_at)
+
+    if name == 'add-media':
+        ack = next(iter(channel.messages.values()))
+        await asyncio.wait_for(ack.edited.wait(), timeout=60)
+        sample.job_latencies.append(time.perf_counter() - started_at)
+
+    # Запросы и отправки считаются вместе с фоновой задачей, если она есть
+    sample.statements.append(env.statements - statements)
+    sample.bytes_sent.append(channel.bytes_sent)
+    sample.messages.append(channel.sent + channel.edits)
+
+    if name == 'add-media':
+        # Варианты изображений создаются после ответа; следующий замер начинается без них
+        await env.wait_media_jobs()
+
+
+async def run_benchmark(users: int, iterations: int, seed: int, data_dir: str, commands: List[str]) -> Dict[str, Any]:
+    seeding_started = time.perf_counter()
+    async with BenchEnvironment(users, seed, data_dir) as env:
+        seeding = time.perf_counter() - seeding_started
+        rng = random.Random(seed)
+        samples: Dict[str, Samples] = {}
+
+        for name in commands:
+            # Прогрев: первое обращение открывает соединения пула и заполняет кэши SQLite
+            await _run_command(env, name, -1, rng, Samples())
+            sample = samples[name] = Samples()
+            for iteration in range(iterations):
+                await _run_command(env, name, iteration, rng, sample)
+
+        return {
+            'users': users,
+            'seed': seed,
+            'iterations': iterations,
+            'setup_seconds': seeding,
+            'commands': {name: sample.summary() for name, sample in samples.items()},
+            'services': env.bot.metrics.collect(),
+        }
+
+
+def _print_report(result: Dict[str, Any]) -> None:
+    print(f"\nПользователей: {result['users']:,}  (подготовка {result['setup_seconds']:.1f} с)")
+    print(f"{'команда':<16}{'p50, мс':>10}{'p99, мс':>10}{'SQL':>8}{'байт':>12}{'сообщ.':>8}")
+    for name, summary in result['commands'].items():
+        print(
+            f"{name:<16}{summary['p50_ms']:>10.2f}{summary['p99_ms']:>10.2f}"
+            f"{summary['statements_per_call']:>8.1f}{summary['bytes_sent_per_call']:>12.0f}"
+            f"{summary['messages_per_call']:>8.1f}"
+        )
+        if 'job_p50_ms' in summary:
+            print(f"{'  фоновая задача':<16}{summary['job_p50_ms']:>10.2f}{summary['job_p99_ms']:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер команд бота на заполненной базе")
+    parser.add_argument('--users', type=int, nargs='+', default=[10_000], help="Размеры базы (число пользователей)")
+    parser.add_argument('--iterations', type=int, default=200, help="Вызовов каждой команды")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--commands', nargs='+', choices=COMMANDS, default=list(COMMANDS))
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="Где хранить заполненные базы и медиафайлы")
+    parser.add_argument('--json', help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = []
+    for users in args.users:
+        result = asyncio.run(run_benchmark(users, args.iterations, args.seed, args.data_dir, args.commands))
+        _print_report(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment_info(), 'runs': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Пиковая память при одновременных загрузках вложений с локального `MediaServer`.
+
+`streaming` — `MediaUtils.download_media`: файл пишется частями во временный
+файл вне event loop, а общий бюджет `--inflight-mb` ограничивает объем
+одновременных загрузок. `buffered` — прежний способ: ответ читается в память
+целиком и записывается синхронно в event loop. Для каждого режима считаются
+прирост RSS над исходным уровнем, лаг event loop и пропускная способность.
+
+    python -m benchmarks.downloads --downloads 32 --file-mb 16 --json downloads.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from benchmarks.harness import DEFAULT_DATA_DIR, environment_info, measure_loop_lag, percentile, rss_bytes
+from benchmarks.media_server import MediaServer
+from bot.misc.media_utils import MediaUtils
+
+SOURCE_FILES = 8
+
+
+def _prepare_sources(source_dir: str, size: int) -> Dict[str, str]:
+    """Файлы для раздачи; случайное содержимое, чтобы хранилище не склеило их в один"""
+    os.makedirs(source_dir, exist_ok=True)
+    files = {}
+
+    for i in range(SOURCE_FILES):
+        path = os.path.join(source_dir, f"source-{i}.bin")
+        if not os.path.exists(path) or os.path.getsize(path) != size:
+            with open(path, 'wb') as f:
+                for _ in range(0, size, 2 ** 20):
+                    f.write(os.urandom(min(2 ** 20, size - f.tell())))
+        files[f"source-{i}.bin"] = path
+
+    return files
+
+
+async def buffered_download(media_utils: MediaUtils, url: str) -> int:
+    """Прежний `download_media`: весь ответ в памяти и синхронная запись"""
+    async with media_utils.session.get(url) as response:
+        response.raise_for_status()
+        fd, path = tempfile.mkstemp(dir=media_utils.tmp_dir)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(await response.read())
+        size = os.path.getsize(path)
+        os.remove(path)
+        return size
+
+
+async def _sample_rss(peak: List[int], stop: asyncio.Event, interval: float = 0.005) -> None:
+    while not stop.is_set():
+        peak[0] = max(peak[0], rss_bytes())
+        await asyncio.sleep(interval)
+
+
+async def _run_mode(mode: str, server: MediaServer, args: argparse.Namespace) -> Dict[str, Any]:
+    store_dir = os.path.join(args.data_dir, "downloads", "store")
+    shutil.rmtree(store_dir, ignore_errors=True)
+
+    media_utils = MediaUtils(
+        media_dir=store_dir,
+        max_size=args.file_mb * 2 ** 21,
+        inflight_bytes=args.inflight_mb * 2 ** 20
+    )
+    await media_utils.start()
+
+    names = sorted(server.files)
+    urls = [server.url(names[i % len(names)]) for i in range(args.downloads)]
+    latencies: List[float] = []
+    lag: List[float] = []
+
+    async def download(url: str) -> int:
+        started_at = time.perf_counter()
+        if mode == 'streaming':
+            size = (await media_utils.download_media(url)).size
+        else:
+            size = await buffered_download(media_utils, url)
+        latencies.append(time.perf_counter() - started_at)
+        return size
+
+    try:
+        baseline = rss_bytes()
+        peak = [baseline]
+        stop = asyncio.Event()
+        monitors = [
+            asyncio.create_task(_sample_rss(peak, stop)),
+            asyncio.create_task(measure_loop_lag(lag, stop)),
+        ]
+
+        started_at = time.perf_counter()
+        sizes = await asyncio.gather(*(download(url) for url in urls))
+        duration = time.perf_counter() - started_at
+
+        stop.set()
+        await asyncio.gather(*monitors)
+    finally:
+        await media_utils.close()
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    return {
+        'mode': mode,
+        'downloads': len(sizes),
+        'total_mb': sum(sizes) / 2 ** 20,
+        'seconds': duration,
+        'throughput_mb_s': sum(sizes) / 2 ** 20 / duration,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'rss_baseline_mb': baseline / 2 ** 20,
+        'rss_peak_growth_mb': (peak[0] - baseline) / 2 ** 20,
+        'loop_lag_p99_ms': percentile(lag, 0.99) * 1000,
+        'loop_lag_max_ms': max(lag, default=0.0) * 1000,
+    }
+
+
+async def run_downloads(args: argparse.Namespace) -> Dict[str, Any]:
+    files = await asyncio.to_thread(
+        _prepare_sources, os.path.join(args.data_dir, "downloads", "sources"), args.file_mb * 2 ** 20
+    )
+    server = MediaServer(files)
+    await server.start()
+
+    result = {
+        'downloads': args.downloads,
+        'file_mb': args.file_mb,
+        'inflight_mb': args.inflight_mb,
+        'modes': [],
+    }
+
+    try:
+        for mode in args.modes:
+            summary = await _run_mode(mode, server, args)
+            result['modes'].append(summary)
+            print(
+                f"{mode:<10} {summary['downloads']} x {args.file_mb} МБ  {summary['throughput_mb_s']:>7.1f} МБ/с  "
+                f"RSS +{summary['rss_peak_growth_mb']:>7.1f} МБ  "
+                f"лаг p99 {summary['loop_lag_p99_ms']:>6.1f} мс  max {summary['loop_lag_max_ms']:>6.1f} мс"
+            )
+    finally:
+        await server.close()
+
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер памяти при одновременных загрузках медиафайлов")
+    parser.add_argument('--downloads', type=int, default=32, help="Сколько файлов скачивается одновременно")
+    parser.add_argument('--file-mb', type=int, default=16, help="Размер одного файла, МБ")
+    parser.add_argument('--inflight-mb', type=int, default=128,
+                        help="Бюджет одновременно скачиваемых байт для streaming, МБ")
+    parser.add_argument('--modes', nargs='+', choices=('streaming', 'buffered'), default=['streaming', 'buffered'],
+                        help="Порядок важен: освобожденную память процесс возвращает системе не полностью")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--json', help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(run_downloads(args))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment_info(), 'run': result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
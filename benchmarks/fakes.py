@@ -0,0 +1,206 @@
+import asyncio
+import itertools
+import json
+import time
+from typing import Dict, List, Optional
+
+from nextcord import Embed, File
+from nextcord.ext.commands import Context, Command
+from nextcord.ext.commands.view import StringView
+
+_ids = itertools.count(10 ** 18)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+def payload_size(content: Optional[str] = None, embeds: Optional[List[Embed]] = None,
+                 files: Optional[List[File]] = None) -> int:
+    """Примерный объем запроса к Discord: JSON эмбедов, текст и файлы"""
+    size = len((content or "").encode())
+    size += sum(len(json.dumps(embed.to_dict(), ensure_ascii=False).encode()) for embed in embeds or [])
+
+    for file in files or []:
+        file.fp.seek(0, 2)
+        size += file.fp.tell()
+        file.close()
+
+    return size
+
+
+class FakeAttachment:
+    def __init__(self, url: str, filename: str, content_type: Optional[str] = None, size: int = 0):
+        self.url = url
+        self.filename = filename
+        self.content_type = content_type
+        self.size = size
+
+
+class FakeMember:
+    def __init__(self, member_id: int):
+        self.id = member_id
+        self.name = f"user{member_id}"
+        self.display_name = self.name
+        self.mention = f"<@{member_id}>"
+        self.avatar = None
+        self.bot = False
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, filesize_limit: int = 25 * 1024 * 1024):
+        self.id = guild_id
+        self.filesize_limit = filesize_limit
+
+
+class FakeMessage:
+    """Отправленное сообщение; правки фиксируются в `edits`"""
+
+    def __init__(self, channel: "FakeChannel", author: Optional[FakeMember] = None,
+                 content: Optional[str] = None, attachments: Optional[List[FakeAttachment]] = None):
+        self.id = next_id()
+        self.channel = channel
+        self.author = author
+        self.guild = channel.guild
+        self.content = content or ""
+        self.attachments = attachments or []
+        self.edits = 0
+        self.edited = asyncio.Event()
+        # View с компонентами, отправленное вместе с сообщением
+        self.view = None
+        self._state = None
+
+    async def edit(self, content: Optional[str] = None, embed: Optional[Embed] = None,
+                   embeds: Optional[List[Embed]] = None, files: Optional[List[File]] = None, **kwargs):
+        embeds = [embed] if embed is not None else embeds
+        self.channel.record(payload_size(content, embeds, files), edit=True)
+        self.attachments = self.channel.cdn_attachments(self.id, files)
+        self.edits += 1
+        self.edited.set()
+        return self
+
+
+class FakeChannel:
+    """Канал, который вместо HTTP-запросов считает отправленные сообщения и байты"""
+
+    def __init__(self, channel_id: int, guild: Optional[FakeGuild] = None):
+        self.id = channel_id
+        self.guild = guild
+        self.messages: Dict[int, FakeMessage] = {}
+        self.sent = 0
+        self.edits = 0
+        self.bytes_sent = 0
+
+    def record(self, size: int, edit: bool = False) -> None:
+        self.bytes_sent += size
+        if edit:
+            self.edits += 1
+        else:
+            self.sent += 1
+
+    def cdn_attachments(self, message_id: int, files: Optional[List[File]]) -> List[FakeAttachment]:
+        """Вложения ответа со ссылками CDN, действующими сутки"""
+        expires = format(int(time.time()) + 24 * 3600, 'x')
+        return [
+            FakeAttachment(
+                f"https://cdn.discordapp.com/attachments/{self.id}/{message_id}/{file.filename}?ex={expires}",
+                file.filename
+            )
+            for file in files or []
+        ]
+
+    async def send(self, content: Optional[str] = None, *, embed: Optional[Embed] = None,
+                   embeds: Optional[List[Embed]] = None, files: Optional[List[File]] = None, view=None, **kwargs):
+        embeds = [embed] if embed is not None else embeds
+        message = FakeMessage(self)
+        message.attachments = self.cdn_attachments(message.id, files)
+        message.view = view
+        self.record(payload_size(content, embeds, files))
+        self.messages[message.id] = message
+        return message
+
+    def get_partial_message(self, message_id: int) -> FakeMessage:
+        return self.messages[message_id]
+
+
+class FakeInteractionResponse:
+    """Ответ на взаимодействие; `done` выставляется при первом ответе"""
+
+    def __init__(self):
+        self._responded = False
+        self.done = asyncio.Event()
+
+    def _respond(self) -> None:
+        self._responded = True
+        self.done.set()
+
+    async def edit_message(self, **kwargs) -> None:
+        self._respond()
+
+    async def send_message(self, *args, **kwargs) -> None:
+        self._respond()
+
+    async def defer(self, **kwargs) -> None:
+        self._respond()
+
+
+class FakeInteraction:
+    """Выбор в меню сообщения `message`, который Discord доставил бы по custom_id.
+
+    `edited` выставляется, когда отложенный ответ правится через `edit_original_message`.
+    """
+
+    def __init__(self, user: FakeMember, message: FakeMessage, custom_id: str, values: List[str]):
+        self.user = user
+        self.message = message
+        self.guild = message.guild
+        self.data = {'custom_id': custom_id, 'component_type': 3, 'values': values}
+        self.response = FakeInteractionResponse()
+        self.edited = asyncio.Event()
+        self._state = None
+
+    def is_expired(self) -> bool:
+        return False
+
+    async def edit_original_message(self, **kwargs) -> FakeMessage:
+        self.edited.set()
+        return self.message
+
+
+class FakeClient:
+    """Клиент для задач загрузки: готов сразу и правит сообщения в поддельных каналах"""
+
+    def __init__(self):
+        self.channels: Dict[int, FakeChannel] = {}
+
+    def channel(self, channel_id: int, guild: Optional[FakeGuild] = None) -> FakeChannel:
+        channel = self.channels.get(channel_id)
+        if channel is None:
+            channel = self.channels[channel_id] = FakeChannel(channel_id, guild)
+        return channel
+
+    def get_partial_messageable(self, channel_id: int, **kwargs) -> FakeChannel:
+        return self.channel(channel_id)
+
+    async def wait_until_ready(self) -> None:
+        pass
+
+
+class FakeContext(Context):
+    """Настоящий `Context` поверх сообщения-заглушки; `send` уходит в `FakeChannel`"""
+
+    def __init__(self, bot, command: Command, author: FakeMember, channel: FakeChannel,
+                 args: str = "", attachments: Optional[List[FakeAttachment]] = None):
+        message = FakeMessage(channel, author, f"{bot.command_prefix}{command.qualified_name} {args}".strip(),
+                              attachments)
+        super().__init__(
+            message=message,
+            bot=bot,
+            view=StringView(args),
+            prefix=bot.command_prefix,
+            command=command,
+            invoked_with=command.qualified_name
+        )
+
+    async def send(self, content: Optional[str] = None, **kwargs):
+        return await self.message.channel.send(content, **kwargs)
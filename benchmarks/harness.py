@@ -0,0 +1,175 @@
+import asyncio
+import math
+import os
+import random
+import resource
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event, select, func
+
+from bot.main import create_bot
+from bot.database import User, Project, MediaJob
+from benchmarks.fakes import FakeAttachment, FakeChannel, FakeClient, FakeContext, FakeGuild, FakeMember, next_id
+from benchmarks.media_server import MediaServer
+from benchmarks.seed import SeedInfo, seed_database
+
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "portfolio-bench")
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered), max(1, math.ceil(q * len(ordered))))
+    return ordered[rank - 1]
+
+
+def rss_bytes() -> int:
+    """Текущий RSS процесса (или пиковый, если /proc недоступен)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+async def measure_loop_lag(samples: List[float], stop: asyncio.Event, interval: float = 0.01) -> None:
+    """Опоздание пробуждений event loop относительно `interval`, пока не выставлен `stop`"""
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - started_at - interval))
+
+
+def environment_info() -> Dict[str, Any]:
+    return {
+        'python': sys.version.split()[0],
+        'sqlite': sqlite3.sqlite_version,
+        'platform': sys.platform,
+        'cpus': os.cpu_count(),
+        'timestamp': time.time(),
+    }
+
+
+class BenchEnvironment:
+    """Настоящий бот со всеми сервисами и когами, но без подключения к Discord.
+
+    Ответы уходят в `FakeChannel`, сообщения задач загрузки правятся через
+    `FakeClient`, вложения скачиваются с локального `MediaServer`.
+    """
+
+    def __init__(self, users: int, seed: int = 0, data_dir: str = DEFAULT_DATA_DIR, guilds: int = 16):
+        self.users = users
+        self.seed = seed
+        self.data_dir = data_dir
+        self.guilds = [FakeGuild(next_id()) for _ in range(guilds)]
+        self.client = FakeClient()
+        self.statements = 0
+        self.bot = None
+        self.info: Optional[SeedInfo] = None
+        self.media_server: Optional[MediaServer] = None
+
+    @property
+    def seed_path(self) -> str:
+        return os.path.join(self.data_dir, f"portfolio-{self.users}-{self.seed}.db")
+
+    @property
+    def db_path(self) -> str:
+        return os.path.join(self.data_dir, "run.db")
+
+    def _create_bot(self, path: str):
+        return create_bot(db_url=f"sqlite+aiosqlite:///{path}", media_dir=os.path.join(self.data_dir, "media"))
+
+    async def _prepare_seed(self) -> None:
+        """Заполняет эталонную базу один раз; каждый запуск работает с ее копией"""
+        bot = self._create_bot(self.seed_path)
+        await bot.db.init_models()
+        # Эталонная база приводится к текущей схеме хранилища один раз, а не в каждой копии
+        await bot.media_utils.migrate_media_store(bot.db)
+        self.info = await seed_database(bot.db.engine, bot.media_utils, self.users, self.seed)
+        await bot.db.dispose()
+
+    async def __aenter__(self) -> "BenchEnvironment":
+        os.makedirs(self.data_dir, exist_ok=True)
+        await self._prepare_seed()
+
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.db_path + suffix):
+                os.remove(self.db_path + suffix)
+        shutil.copyfile(self.seed_path, self.db_path)
+
+        self.bot = self._create_bot(self.db_path)
+        await self.bot.start_services()
+        # Бот не входит в Discord: обработчики загрузок перезапускаются с клиентом, который
+        # готов сразу и правит подтверждения в поддельных каналах, а не через HTTP
+        await self.bot.media_jobs.close()
+        self.bot.media_jobs.start(self.client)
+
+        self.media_server = MediaServer({f"{m.sha256}.png": m.path for m in self.info.media})
+        await self.media_server.start()
+
+        event.listen(self.bot.db.engine.sync_engine, "before_cursor_execute", self._count_statement)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        event.remove(self.bot.db.engine.sync_engine, "before_cursor_execute", self._count_statement)
+        await self.media_server.close()
+        await self.bot.close_services()
+        await self.bot.send_queue.close()
+        await self.bot.media_utils.close()
+        await self.bot.db.dispose()
+
+    def _count_statement(self, *args) -> None:
+        self.statements += 1
+
+    def channel(self, guild: Optional[FakeGuild] = None) -> FakeChannel:
+        return self.client.channel(next_id(), guild or self.guilds[0])
+
+    def context(self, command_name: str, author_id: int, channel: FakeChannel, args: str = "",
+                attachments: Optional[List[FakeAttachment]] = None) -> FakeContext:
+        command = self.bot.get_command(command_name)
+        return FakeContext(self.bot, command, FakeMember(author_id), channel, args, attachments)
+
+    def attachments(self, rng: random.Random, count: int) -> List[FakeAttachment]:
+        """Вложения со ссылками на локальный сервер"""
+        names = rng.sample(sorted(self.media_server.files), count)
+        return [
+            FakeAttachment(self.media_server.url(name), name, "image/png", self.media_server.size(name))
+            for name in names
+        ]
+
+    def random_user(self, rng: random.Random) -> int:
+        return SeedInfo.discord_id(rng.randrange(self.users))
+
+    async def sample_projects(self, rng: random.Random, count: int) -> List[Tuple[int, str]]:
+        """Случайные (discord_id владельца, название) существующих проектов"""
+        async with self.bot.db.get_session() as session:
+            total = await session.scalar(select(func.max(Project.id)))
+            ids = [rng.randrange(1, total + 1) for _ in range(count)]
+            rows = await session.execute(
+                select(Project.id, User.discord_id, Project.name)
+                .join(User, User.id == Project.user_id)
+                .where(Project.id.in_(ids))
+            )
+            by_id = {row.id: (row.discord_id, row.name) for row in rows}
+
+        return [by_id[project_id] for project_id in ids if project_id in by_id]
+
+    async def wait_media_jobs(self, timeout: float = 60.0) -> None:
+        """Ждет, пока обработчики загрузок не освободятся"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.bot.media_jobs.active:
+                async with self.bot.db.get_session() as session:
+                    pending = await session.scalar(
+                        select(func.count()).select_from(MediaJob).where(MediaJob.status.in_(('pending', 'running')))
+                    )
+                if not pending:
+                    return
+            await asyncio.sleep(0.01)
@@ -0,0 +1,90 @@
+"""Память при обходе всей таблицы: `Database.iter_projects` против списка `.all()`.
+
+Пиковый прирост памяти Python считается через tracemalloc (он замедляет
+обход, поэтому время сравнимо только между методами одного запуска).
+В среднем 1,5 проекта на пользователя: `--users 670000` — около миллиона строк.
+
+    python -m benchmarks.iterate --users 670000 --batch-sizes 1000 5000 --json iterate.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict
+
+from sqlalchemy import select
+
+from benchmarks.harness import DEFAULT_DATA_DIR, BenchEnvironment, environment_info
+from bot.database import Project
+
+
+async def _measure(walk: Callable[[], Awaitable[int]]) -> Dict[str, Any]:
+    gc.collect()
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    try:
+        rows = await walk()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'rows': rows, 'seconds': time.perf_counter() - started_at, 'peak_mb': peak / 2 ** 20}
+
+
+async def run_iterate(args: argparse.Namespace) -> Dict[str, Any]:
+    async with BenchEnvironment(args.users, args.seed, args.data_dir) as env:
+        db = env.bot.db
+        result = {'users': args.users, 'methods': {}}
+
+        def iterate(batch_size: int) -> Callable[[], Awaitable[int]]:
+            async def walk() -> int:
+                rows = 0
+                async for _ in db.iter_projects(batch_size=batch_size):
+                    rows += 1
+                return rows
+            return walk
+
+        async def load_all() -> int:
+            async with db.get_session() as session:
+                projects = (await session.scalars(select(Project))).all()
+                return len(projects)
+
+        walks = {f"iter_{batch_size}": iterate(batch_size) for batch_size in args.batch_sizes}
+        if not args.skip_list:
+            walks['list'] = load_all
+
+        for name, walk in walks.items():
+            summary = result['methods'][name] = await _measure(walk)
+            print(
+                f"{name:<12} строк {summary['rows']:>9}  {summary['seconds']:>7.1f} с  "
+                f"пик памяти {summary['peak_mb']:>8.1f} МБ"
+            )
+
+        return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер памяти при потоковом обходе таблицы проектов")
+    parser.add_argument('--users', type=int, default=670_000, help="Размер заполненной базы")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1000, 5000],
+                        help="Размеры пачек iter_projects")
+    parser.add_argument('--skip-list', action='store_true', help="Не загружать таблицу списком целиком")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--json', help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(run_iterate(args))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment_info(), 'run': result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
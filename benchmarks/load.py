@@ -0,0 +1,297 @@
+"""Нагрузочный прогон: смесь команд с заданной частотой через `Bot.invoke`.
+
+В отличие от `benchmarks.commands`, команды проходят настоящий путь
+обработки: глобальные проверки (лимиты частоты), хуки метрик, разбор
+аргументов и `on_command_error`. Частота поднимается ступенями, чтобы найти
+точку насыщения; на каждой ступени считаются пропускная способность,
+задержки, лаг event loop, ожидание блокировок SQLite и рост памяти.
+
+Команды, отклоненные ограничителем частоты, `Bot.invoke` не пробрасывает —
+их ловит `on_command_error`, поэтому они определяются по каждому запросу
+через обертку глобальной проверки и не входят в выполненные и задержки.
+Ожидание окна отправки в канал (`SendQueue`, `CHANNEL_SEND_LIMIT` сообщений
+за `CHANNEL_SEND_WINDOW` с) входит в задержку команды и выводится отдельно.
+
+    python -m benchmarks.load --users 100000 --rates 25 50 100 200 --step-seconds 20 --json load.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from benchmarks.harness import (
+    DEFAULT_DATA_DIR, BenchEnvironment, environment_info, measure_loop_lag, percentile, rss_bytes
+)
+from benchmarks.fakes import FakeChannel
+from bot.misc.rate_limit import RateLimited
+
+WRITE_COMMANDS = ('set-links', 'set-profile', 'add-project')
+WRITE_OPERATIONS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+def parse_mix(values: List[str]) -> Dict[str, float]:
+    """`profile=70 preview=20 write=10` → нормированные доли"""
+    mix = {}
+    for value in values:
+        name, weight = value.split('=', 1)
+        mix[name] = float(weight)
+
+    total = sum(mix.values())
+    return {name: weight / total for name, weight in mix.items()}
+
+
+@dataclass
+class StepResult:
+    target_rate: float
+    duration: float = 0.0
+    issued: int = 0
+    completed: int = 0
+    errors: int = 0
+    skipped: int = 0
+    latencies: List[float] = field(default_factory=list)
+    loop_lag: List[float] = field(default_factory=list)
+    write_waits: List[float] = field(default_factory=list)
+    locked_errors: int = 0
+    max_inflight: int = 0
+    rss_start: int = 0
+    rss_end: int = 0
+    throttled: int = 0
+    # Секунды, которые ответы ждали окна лимита канала и своей очереди в SendQueue
+    send_window_wait: float = 0.0
+    send_queue_wait: float = 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'target_rate': self.target_rate,
+            'achieved_rate': self.completed / self.duration if self.duration else 0.0,
+            'handled_rate': (self.completed + self.throttled) / self.duration if self.duration else 0.0,
+            'issued': self.issued,
+            'completed': self.completed,
+            'errors': self.errors,
+            'skipped': self.skipped,
+            'throttled': self.throttled,
+            'p50_ms': percentile(self.latencies, 0.5) * 1000,
+            'p99_ms': percentile(self.latencies, 0.99) * 1000,
+            'send_window_wait_s': self.send_window_wait,
+            'send_queue_wait_s': self.send_queue_wait,
+            'loop_lag_p99_ms': percentile(self.loop_lag, 0.99) * 1000,
+            'loop_lag_max_ms': max(self.loop_lag, default=0.0) * 1000,
+            'write_p99_ms': percentile(self.write_waits, 0.99) * 1000,
+            'locked_errors': self.locked_errors,
+            'max_inflight': self.max_inflight,
+            'rss_mb': self.rss_end / 2 ** 20,
+            'rss_growth_mb': (self.rss_end - self.rss_start) / 2 ** 20,
+        }
+
+
+class LoadGenerator:
+    """Пуассоновский поток команд от множества пользователей из разных серверов"""
+
+    def __init__(self, env: BenchEnvironment, mix: Dict[str, float], active_users: int,
+                 channels_per_guild: int, max_inflight: int, seed: int):
+        self.env = env
+        self.mix = mix
+        self.rng = random.Random(seed)
+        self.users = [env.random_user(self.rng) for _ in range(active_users)]
+        self.channels: List[FakeChannel] = [
+            env.channel(guild) for guild in env.guilds for _ in range(channels_per_guild)
+        ]
+        self.max_inflight = max_inflight
+        self.inflight = 0
+        self.counter = 0
+        self.step: Optional[StepResult] = None
+        self._write_started: Dict[int, List[float]] = {}
+
+    # SQLite: время выполнения изменяющих запросов, включая ожидание блокировки записи
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault('load_started_at', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started_at = conn.info['load_started_at'].pop()
+        if self.step is not None and statement.lstrip()[:6].upper() in WRITE_OPERATIONS:
+            self.step.write_waits.append(time.perf_counter() - started_at)
+
+    def _handle_error(self, exception_context) -> None:
+        conn = exception_context.connection
+        if conn is not None and conn.info.get('load_started_at'):
+            conn.info['load_started_at'].pop()
+        if self.step is not None and 'locked' in str(exception_context.original_exception):
+            self.step.locked_errors += 1
+
+    async def _rate_limit_check(self, ctx) -> bool:
+        """Глобальная проверка ограничителя, которая помечает отклоненный запрос"""
+        try:
+            return await self.env.bot.rate_limiter.check(ctx)
+        except RateLimited:
+            ctx.load_throttled = True
+            raise
+
+    def instrument(self) -> None:
+        engine = self.env.bot.db.engine.sync_engine
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+        bot = self.env.bot
+        bot.remove_check(bot.rate_limiter.check)
+        bot.add_check(self._rate_limit_check)
+
+    def _pick(self) -> Tuple[str, str]:
+        """Команда и строка аргументов"""
+        kind = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        self.counter += 1
+
+        if kind != 'write':
+            return kind, ""
+
+        name = self.rng.choice(WRITE_COMMANDS)
+        if name == 'set-links':
+            return name, f"GitHub: github.com/load{self.counter}, Сайт: example.com/{self.counter}"
+        if name == 'set-profile':
+            return name, f"Нагрузочный профиль {self.counter}"
+        return name, f'"Load {self.counter}" Дизайн Проект из нагрузочного прогона'
+
+    async def _request(self, step: StepResult) -> None:
+        name, args = self._pick()
+        ctx = self.env.context(name, self.rng.choice(self.users), self.rng.choice(self.channels), args)
+
+        self.inflight += 1
+        step.max_inflight = max(step.max_inflight, self.inflight)
+        started_at = time.perf_counter()
+        try:
+            await self.env.bot.invoke(ctx)
+            if getattr(ctx, 'load_throttled', False):
+                step.throttled += 1
+            else:
+                step.latencies.append(time.perf_counter() - started_at)
+                step.completed += 1
+        except Exception:
+            step.errors += 1
+        finally:
+            self.inflight -= 1
+
+    async def run_step(self, rate: float, duration: float) -> StepResult:
+        step = self.step = StepResult(target_rate=rate, rss_start=rss_bytes())
+        send_queue = self.env.bot.send_queue
+        window_wait, queue_wait = send_queue.rate_limit_wait, send_queue.queue_wait
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(measure_loop_lag(step.loop_lag, stop))
+        tasks = set()
+
+        started_at = time.perf_counter()
+        next_at = started_at
+        while next_at - started_at < duration:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            step.issued += 1
+            if self.inflight >= self.max_inflight:
+                # Бот не успевает: новые запросы отбрасываются, а не копятся без предела
+                step.skipped += 1
+            else:
+                task = asyncio.create_task(self._request(step))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            next_at += self.rng.expovariate(rate)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        step.duration = time.perf_counter() - started_at
+
+        stop.set()
+        await lag_task
+        # Ответы в очереди отправки и обработчики ошибок завершаются после команд
+        await asyncio.sleep(0)
+        step.rss_end = rss_bytes()
+        step.send_window_wait = send_queue.rate_limit_wait - window_wait
+        step.send_queue_wait = send_queue.queue_wait - queue_wait
+        self.step = None
+        return step
+
+
+def _saturation(steps: List[Dict[str, Any]]) -> Optional[float]:
+    """Первая частота, на которой бот не держит целевую пропускную способность
+
+    Отклоненные ограничителем команды обработаны — это политика лимитов, а не нехватка ресурсов.
+    """
+    for step in steps:
+        if step['skipped'] or step['handled_rate'] < 0.9 * step['target_rate']:
+            return step['target_rate']
+    return None
+
+
+async def run_load(args: argparse.Namespace) -> Dict[str, Any]:
+    async with BenchEnvironment(args.users, args.seed, args.data_dir, guilds=args.guilds) as env:
+        generator = LoadGenerator(
+            env,
+            parse_mix(args.mix),
+            active_users=args.active_users,
+            channels_per_guild=args.channels_per_guild,
+            max_inflight=args.max_inflight,
+            seed=args.seed
+        )
+        generator.instrument()
+
+        steps = []
+        for rate in args.rates:
+            step = (await generator.run_step(rate, args.step_seconds)).summary()
+            steps.append(step)
+            print(
+                f"{rate:>8.0f}/с → {step['achieved_rate']:>8.1f}/с  p50 {step['p50_ms']:>7.1f} мс  "
+                f"p99 {step['p99_ms']:>8.1f} мс  лаг p99 {step['loop_lag_p99_ms']:>6.1f} мс  "
+                f"запись p99 {step['write_p99_ms']:>6.1f} мс  RSS {step['rss_mb']:>6.0f} МБ "
+                f"({step['rss_growth_mb']:+.1f})  отброшено {step['skipped']}  "
+                f"отклонено лимитом {step['throttled']}  окно канала {step['send_window_wait_s']:.1f} с"
+            )
+
+        return {
+            'users': args.users,
+            'seed': args.seed,
+            'mix': parse_mix(args.mix),
+            'active_users': args.active_users,
+            'guilds': args.guilds,
+            'step_seconds': args.step_seconds,
+            'steps': steps,
+            'saturation_rate': _saturation(steps),
+            'services': env.bot.metrics.collect(),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон смеси команд бота")
+    parser.add_argument('--users', type=int, default=10_000, help="Размер заполненной базы")
+    parser.add_argument('--active-users', type=int, default=5_000, help="Сколько пользователей шлют команды")
+    parser.add_argument('--guilds', type=int, default=50)
+    parser.add_argument('--channels-per-guild', type=int, default=4)
+    parser.add_argument('--mix', nargs='+', default=['profile=70', 'preview=20', 'write=10'],
+                        help="Доли команд: profile, preview и write (set-links, set-profile, add-project)")
+    parser.add_argument('--rates', type=float, nargs='+', default=[25, 50, 100, 200],
+                        help="Ступени целевой частоты, команд в секунду")
+    parser.add_argument('--step-seconds', type=float, default=20)
+    parser.add_argument('--max-inflight', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--json', help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(run_load(args))
+    saturation = result['saturation_rate']
+    print(f"Насыщение: {f'{saturation:.0f} команд/с' if saturation else 'не достигнуто'}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment_info(), 'run': result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Замер `Database.get_project_by_name`: индекс (user_id, name_normalized) против ILIKE.
+
+Прежний запрос искал проект условием `name ILIKE :name` по проектам
+пользователя, и без индексов на внешних ключах читал всю таблицу. Он
+воспроизводится здесь с `NOT INDEXED`. Названия берутся из базы в другом
+регистре; доля `--miss-share` запросов ищет несуществующий проект (так
+`/add-project` проверяет дубликаты). В среднем 1,5 проекта на пользователя:
+`--users 670000` — около миллиона проектов.
+
+    python -m benchmarks.lookup --users 670000 --iterations 500 --json lookup.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from benchmarks.harness import DEFAULT_DATA_DIR, BenchEnvironment, environment_info, percentile
+
+LEGACY_QUERY = text(
+    "SELECT projects.* FROM projects NOT INDEXED "
+    "WHERE projects.user_id = (SELECT id FROM users WHERE discord_id = :discord_id) "
+    "AND lower(projects.name) LIKE lower(:name) LIMIT 1"
+)
+
+
+async def legacy_lookup(env: BenchEnvironment, discord_id: int, name: str) -> Optional[Any]:
+    async with env.bot.db.get_session() as session:
+        return (await session.execute(LEGACY_QUERY, {'discord_id': discord_id, 'name': name})).first()
+
+
+async def _query_plan(env: BenchEnvironment, discord_id: int, name: str) -> List[str]:
+    """План индексного поиска: в нем не должно быть SCAN projects"""
+    async with env.bot.db.get_session() as session:
+        rows = await session.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT projects.id FROM projects JOIN users ON projects.user_id = users.id "
+                "WHERE users.discord_id = :discord_id AND projects.name_normalized = :name"
+            ),
+            {'discord_id': discord_id, 'name': name.casefold()}
+        )
+        return [row.detail for row in rows]
+
+
+def _build_lookups(rng: random.Random, projects: List[Tuple[int, str]], count: int,
+                   miss_share: float) -> List[Tuple[int, str, bool]]:
+    lookups = []
+    for i in range(count):
+        discord_id, name = projects[i % len(projects)]
+        if rng.random() < miss_share:
+            lookups.append((discord_id, f"Missing {i}", False))
+        else:
+            lookups.append((discord_id, name.upper(), True))
+    return lookups
+
+
+async def run_lookup(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+
+    async with BenchEnvironment(args.users, args.seed, args.data_dir) as env:
+        projects = await env.sample_projects(rng, args.iterations)
+        lookups = _build_lookups(rng, projects, args.iterations, args.miss_share)
+
+        result = {
+            'users': args.users,
+            'iterations': args.iterations,
+            'plan': await _query_plan(env, *projects[0]),
+            'methods': {},
+        }
+        methods = {
+            'indexed': lambda discord_id, name: env.bot.db.get_project_by_name(discord_id, name),
+            'ilike_scan': lambda discord_id, name: legacy_lookup(env, discord_id, name),
+        }
+
+        for method, lookup in methods.items():
+            sample = lookups if method == 'indexed' else lookups[:args.scan_iterations]
+            if not sample:
+                continue
+
+            # Прогрев: соединения пула и страницы индекса
+            await lookup(*sample[0][:2])
+
+            latencies = []
+            for discord_id, name, expected in sample:
+                started_at = time.perf_counter()
+                found = await lookup(discord_id, name)
+                latencies.append(time.perf_counter() - started_at)
+                assert (found is not None) == expected, (method, discord_id, name)
+
+            summary = result['methods'][method] = {
+                'count': len(latencies),
+                'p50_ms': percentile(latencies, 0.5) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+            }
+            print(
+                f"{args.users:>9} польз.  {method:<10}  p50 {summary['p50_ms']:>8.3f} мс  "
+                f"p99 {summary['p99_ms']:>8.3f} мс  ({summary['count']} запросов)"
+            )
+
+        print("План индексного поиска: " + "; ".join(result['plan']))
+        return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер поиска проекта по названию")
+    parser.add_argument('--users', type=int, default=670_000, help="Размер заполненной базы")
+    parser.add_argument('--iterations', type=int, default=500, help="Запросов через индекс")
+    parser.add_argument('--scan-iterations', type=int, default=20,
+                        help="Запросов через ILIKE (каждый читает всю таблицу); 0 — пропустить")
+    parser.add_argument('--miss-share', type=float, default=0.2, help="Доля поисков несуществующего проекта")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--json', help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(run_lookup(args))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment_info(), 'run': result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
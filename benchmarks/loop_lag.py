@@ -0,0 +1,186 @@
+"""Лаг event loop при параллельных командах: асинхронный слой базы против блокирующего.
+
+На каждом уровне параллельности `concurrency` обработчиков без пауз вызывают
+`profile`, `preview` и `set-links` через настоящие коги, а отдельная задача
+замеряет, насколько опаздывают пробуждения event loop. Для сравнения те же
+чтения и запись выполняются синхронным `sqlite3` прямо в event loop — так
+работал прежний `Database`. Фоновый поток периодически держит блокировку
+записи SQLite `--lock-ms` миллисекунд: в асинхронном слое запись ждет ее в
+потоке драйвера, а блокирующий запрос останавливает весь event loop.
+
+    python -m benchmarks.loop_lag --users 100000 --concurrency 1 10 50 200 --lock-ms 100 --json loop_lag.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List
+
+from benchmarks.fakes import FakeMember
+from benchmarks.harness import DEFAULT_DATA_DIR, BenchEnvironment, environment_info, measure_loop_lag, percentile
+
+COMMANDS = ('profile', 'preview', 'set-links')
+WRITE_SHARE = 0.1
+
+
+class BlockingQueries:
+    """Чтения и запись команд синхронным sqlite3, как в прежнем `Database`"""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+
+    def run(self, name: str, discord_id: int, iteration: int) -> None:
+        user_id = self.conn.execute("SELECT id FROM users WHERE discord_id = ?", (discord_id,)).fetchone()
+        if user_id is None:
+            return
+
+        if name == 'set-links':
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("DELETE FROM links WHERE user_id = ?", user_id)
+            self.conn.execute(
+                "INSERT INTO links (user_id, url, title, created_at) VALUES (?, ?, 'Сайт', datetime('now'))",
+                (user_id[0], f"https://example.com/{iteration}")
+            )
+            self.conn.execute("COMMIT")
+            return
+
+        self.conn.execute("SELECT * FROM links WHERE user_id = ?", user_id).fetchall()
+        self.conn.execute(
+            "SELECT * FROM projects LEFT JOIN media ON media.project_id = projects.id WHERE projects.user_id = ?",
+            user_id
+        ).fetchall()
+
+    def close(self) -> None:
+        self.conn.close()
+
+
+class LockHolder(threading.Thread):
+    """Поток, который попеременно берет блокировку записи на `hold` секунд и отпускает ее"""
+
+    def __init__(self, path: str, hold: float):
+        super().__init__(daemon=True)
+        self.path = path
+        self.hold = hold
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            while not self.stopped.is_set():
+                conn.execute("BEGIN IMMEDIATE")
+                time.sleep(self.hold)
+                conn.execute("COMMIT")
+                self.stopped.wait(self.hold)
+        finally:
+            conn.close()
+
+
+async def _run_level(env: BenchEnvironment, mode: str, concurrency: int, seconds: float,
+                     rng: random.Random, blocking: BlockingQueries) -> Dict[str, Any]:
+    latencies: List[float] = []
+    lag: List[float] = []
+    counter = 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker() -> None:
+        nonlocal counter
+        while time.perf_counter() < deadline:
+            counter += 1
+            name = 'set-links' if rng.random() < WRITE_SHARE else rng.choice(COMMANDS[:2])
+            author = env.random_user(rng)
+
+            started_at = time.perf_counter()
+            if mode == 'blocking':
+                blocking.run(name, author, counter)
+                # Прежние команды отдавали управление только на отправке ответа
+                await asyncio.sleep(0)
+            else:
+                ctx = env.context(name, author, env.channel(rng.choice(env.guilds)))
+                if name == 'set-links':
+                    await ctx.command(ctx, links=f"GitHub: github.com/lag{counter}, Сайт: example.com/{counter}")
+                else:
+                    await ctx.command(ctx, FakeMember(env.random_user(rng)))
+            latencies.append(time.perf_counter() - started_at)
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(lag, stop))
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    duration = time.perf_counter() - started_at
+    stop.set()
+    await lag_task
+
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'commands': len(latencies),
+        'rate': len(latencies) / duration,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'lag_p50_ms': percentile(lag, 0.5) * 1000,
+        'lag_p99_ms': percentile(lag, 0.99) * 1000,
+        'lag_max_ms': max(lag, default=0.0) * 1000,
+    }
+
+
+async def run_loop_lag(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+
+    async with BenchEnvironment(args.users, args.seed, args.data_dir) as env:
+        blocking = BlockingQueries(env.db_path)
+        result = {'users': args.users, 'seconds': args.seconds, 'lock_ms': args.lock_ms, 'levels': []}
+
+        holder = LockHolder(env.db_path, args.lock_ms / 1000) if args.lock_ms else None
+        if holder is not None:
+            holder.start()
+
+        try:
+            for mode in args.modes:
+                for concurrency in args.concurrency:
+                    level = await _run_level(env, mode, concurrency, args.seconds, rng, blocking)
+                    result['levels'].append(level)
+                    print(
+                        f"{mode:<9} x{concurrency:<5} {level['rate']:>8.1f} команд/с  "
+                        f"p50 {level['p50_ms']:>8.1f} мс  p99 {level['p99_ms']:>8.1f} мс  "
+                        f"лаг p50 {level['lag_p50_ms']:>6.2f} мс  p99 {level['lag_p99_ms']:>7.2f} мс  "
+                        f"max {level['lag_max_ms']:>7.1f} мс"
+                    )
+        finally:
+            if holder is not None:
+                holder.stopped.set()
+                await asyncio.to_thread(holder.join)
+            blocking.close()
+
+        return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер лага event loop при параллельных командах")
+    parser.add_argument('--users', type=int, default=100_000, help="Размер заполненной базы")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50, 200],
+                        help="Сколько команд выполняется одновременно")
+    parser.add_argument('--modes', nargs='+', choices=('async', 'blocking'), default=['async', 'blocking'])
+    parser.add_argument('--seconds', type=float, default=10, help="Длительность каждого уровня")
+    parser.add_argument('--lock-ms', type=float, default=100,
+                        help="Сколько фоновый поток держит блокировку записи; 0 — не держать")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--json', help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(run_loop_lag(args))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment_info(), 'run': result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
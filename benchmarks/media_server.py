@@ -0,0 +1,43 @@
+import os
+from typing import Dict, Optional
+
+from aiohttp import web
+
+
+class MediaServer:
+    """Локальный HTTP-сервер с файлами для `/add-media` вместо CDN Discord"""
+
+    def __init__(self, files: Dict[str, str], host: str = "127.0.0.1"):
+        self.files = files
+        self.host = host
+        self.base_url: Optional[str] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle(self, request: web.Request) -> web.StreamResponse:
+        path = self.files.get(request.match_info['name'])
+        if path is None:
+            raise web.HTTPNotFound()
+        return web.FileResponse(path)
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_get("/files/{name}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, 0)
+        await site.start()
+
+        port = self._runner.addresses[0][1]
+        self.base_url = f"http://{self.host}:{port}"
+        return self.base_url
+
+    def url(self, name: str) -> str:
+        return f"{self.base_url}/files/{name}"
+
+    def size(self, name: str) -> int:
+        return os.path.getsize(self.files[name])
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,219 @@
+"""Тысячи одновременно ожидающих `/remove-media`: меню выбора против `wait_for`.
+
+Для каждого уровня `--pending` команда вызывается через настоящий ког для
+разных проектов, и ее `MediaRemoveView` регистрируется в `ViewStore` бота,
+как при отправке в Discord. Затем замеряются:
+
+* стоимость доставки обычного сообщения, пока удаления ждут выбора, — и она
+  же для прежней реализации, где каждое ожидание — это `wait_for('message')`
+  с проверкой каждого сообщения бота;
+* задержка выбора в меню: от доставки взаимодействия по custom_id до ответа,
+  включая пакетное удаление из базы.
+
+Удаления ждут выбора `BotConfig.REMOVE_MEDIA_TIMEOUT` секунд, а живых view не
+больше `BotConfig.MAX_LIVE_VIEWS`: более старые вытесняются, это видно по
+`evictions`. `ViewStore.dispatch` в nextcord перед поиском по custom_id
+проверяет все зарегистрированные view, поэтому `dispatch_*_us` растет с их
+числом — до предела `MAX_LIVE_VIEWS`.
+
+    python -m benchmarks.removals --users 10000 --pending 100 1000 3000 --json removals.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+from nextcord import ComponentType
+from sqlalchemy import exists, select
+
+from benchmarks.fakes import FakeInteraction, FakeMember, FakeMessage, next_id
+from benchmarks.harness import DEFAULT_DATA_DIR, BenchEnvironment, environment_info, percentile
+from bot.database import Media, Project, User
+
+CREATE_CONCURRENCY = 50
+
+
+async def _projects_with_media(env: BenchEnvironment, rng: random.Random, count: int) -> List[Tuple[int, str]]:
+    """Случайные (discord_id владельца, название) проектов, у которых есть медиафайлы"""
+    async with env.bot.db.get_session() as session:
+        rows = await session.execute(
+            select(User.discord_id, Project.name)
+            .join(User, User.id == Project.user_id)
+            .where(exists().where(Media.project_id == Project.id))
+            .order_by(Project.id)
+        )
+        projects = [tuple(row) for row in rows]
+
+    return rng.sample(projects, min(count, len(projects)))
+
+
+async def _create_pending(env: BenchEnvironment, targets: List[Tuple[int, str]],
+                          rng: random.Random) -> Tuple[List[Tuple[int, FakeMessage]], List[float]]:
+    """Вызывает /remove-media для каждого проекта; возвращает (автор, сообщение с меню)"""
+    store = env.bot._connection
+    semaphore = asyncio.Semaphore(CREATE_CONCURRENCY)
+    pending, latencies = [], []
+
+    async def create(author: int, project_name: str) -> None:
+        async with semaphore:
+            channel = env.channel(rng.choice(env.guilds))
+            ctx = env.context('remove-media', author, channel)
+
+            started_at = time.perf_counter()
+            await ctx.command(ctx, project_name)
+            latencies.append(time.perf_counter() - started_at)
+
+            message = next(m for m in channel.messages.values() if m.view is not None)
+            # Так `Messageable.send` регистрирует view отправленного сообщения
+            store.store_view(message.view, message.id)
+            pending.append((author, message))
+
+    await asyncio.gather(*(create(author, name) for author, name in targets))
+    return pending, latencies
+
+
+def _dispatch_messages(env: BenchEnvironment, messages: List[FakeMessage]) -> float:
+    """Среднее время синхронной доставки сообщения слушателям бота, мкс"""
+    started_at = time.perf_counter()
+    for message in messages:
+        env.bot.dispatch('message', message)
+    return (time.perf_counter() - started_at) / len(messages) * 1e6
+
+
+async def _message_cost(env: BenchEnvironment, pending: List[Tuple[int, FakeMessage]],
+                        count: int) -> Dict[str, float]:
+    channel = env.channel()
+    # Сообщения другого бота: `process_commands` их пропускает, а проверки `wait_for` выполняются
+    other_bot = FakeMember(next_id())
+    other_bot.bot = True
+    messages = [FakeMessage(channel, other_bot, "привет") for _ in range(count)]
+
+    views_us = _dispatch_messages(env, messages)
+    await asyncio.sleep(0.1)
+
+    # Прежняя реализация: каждое ожидающее удаление проверяет каждое сообщение бота
+    waiters = []
+    for author, message in pending:
+        def check(m, author=author, channel=message.channel):
+            return m.author.id == author and m.channel == channel and m.content.isdigit()
+        waiters.append(asyncio.ensure_future(env.bot.wait_for('message', check=check, timeout=600)))
+    await asyncio.sleep(0)
+
+    wait_for_us = _dispatch_messages(env, messages)
+
+    for waiter in waiters:
+        waiter.cancel()
+    await asyncio.gather(*waiters, return_exceptions=True)
+    await asyncio.sleep(0.1)
+
+    return {'views_us': views_us, 'wait_for_us': wait_for_us}
+
+
+async def _select(env: BenchEnvironment, pending: List[Tuple[int, FakeMessage]], count: int,
+                  rng: random.Random) -> Dict[str, Any]:
+    view_store = env.bot._connection._view_store
+    live = [(author, message) for author, message in pending if not message.view.is_finished()]
+    dispatch, latencies = [], []
+
+    for author, message in rng.sample(live, min(count, len(live))):
+        select_menu = message.view.select
+        interaction = FakeInteraction(FakeMember(author), message, select_menu.custom_id,
+                                      [select_menu.options[0].value])
+
+        started_at = time.perf_counter()
+        view_store.dispatch(ComponentType.select.value, select_menu.custom_id, interaction)
+        dispatch.append(time.perf_counter() - started_at)
+        await asyncio.wait_for(interaction.edited.wait(), timeout=30)
+        latencies.append(time.perf_counter() - started_at)
+
+    return {
+        'live': len(live),
+        'selections': len(latencies),
+        'dispatch_p50_us': percentile(dispatch, 0.5) * 1e6,
+        'dispatch_p99_us': percentile(dispatch, 0.99) * 1e6,
+        'select_p50_ms': percentile(latencies, 0.5) * 1000,
+        'select_p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+async def _run_level(env: BenchEnvironment, targets: List[Tuple[int, str]], args: argparse.Namespace,
+                     rng: random.Random) -> Dict[str, Any]:
+    registry = env.bot.get_command('remove-media').cog.views
+    evictions = registry.evictions
+
+    tracemalloc.start()
+    try:
+        pending, latencies = await _create_pending(env, targets, rng)
+        memory, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    level = {
+        'pending': len(pending),
+        'create_p50_ms': percentile(latencies, 0.5) * 1000,
+        'create_p99_ms': percentile(latencies, 0.99) * 1000,
+        'kb_per_pending': memory / len(pending) / 1024,
+    }
+    level.update(await _message_cost(env, pending, args.messages))
+    level.update(await _select(env, pending, args.selections, rng))
+    level['evictions'] = registry.evictions - evictions
+
+    # Оставшиеся меню закрываются, чтобы не влиять на следующий уровень
+    for _, message in pending:
+        message.view.stop()
+
+    return level
+
+
+async def run_removals(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+
+    async with BenchEnvironment(args.users, args.seed, args.data_dir) as env:
+        targets = await _projects_with_media(env, rng, sum(args.pending))
+        if len(targets) < sum(args.pending):
+            raise SystemExit(f"В базе {len(targets)} проектов с медиафайлами, нужно {sum(args.pending)}")
+
+        result = {'users': args.users, 'levels': []}
+        offset = 0
+
+        for pending in args.pending:
+            level = await _run_level(env, targets[offset:offset + pending], args, rng)
+            offset += pending
+            result['levels'].append(level)
+            print(
+                f"ожидают {level['pending']:>6} (живых {level['live']:>5}, вытеснено {level['evictions']:>5})  "
+                f"{level['kb_per_pending']:>5.1f} КБ/шт  сообщение: view {level['views_us']:>7.1f} мкс, "
+                f"wait_for {level['wait_for_us']:>9.1f} мкс  выбор p50 {level['select_p50_ms']:>6.1f} мс  "
+                f"p99 {level['select_p99_ms']:>6.1f} мс  (поиск view {level['dispatch_p50_us']:.0f} мкс)"
+            )
+
+        return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер множества ожидающих выбора /remove-media")
+    parser.add_argument('--users', type=int, default=10_000, help="Размер заполненной базы")
+    parser.add_argument('--pending', type=int, nargs='+', default=[100, 1000, 3000],
+                        help="Сколько удалений одновременно ждут выбора")
+    parser.add_argument('--messages', type=int, default=2000, help="Обычных сообщений для замера доставки")
+    parser.add_argument('--selections', type=int, default=200, help="Выборов в меню на каждом уровне")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--json', help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(run_removals(args))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment_info(), 'run': result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
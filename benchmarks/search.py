@@ -0,0 +1,124 @@
+"""Замер `/search`: полнотекстовый индекс FTS5 против сканирования через LIKE.
+
+Оба варианта возвращают первую страницу и общее число совпадений, все слова
+запроса обязательны. LIKE сравнивает подстроки по названию, категории,
+описанию и профилю автора и читает таблицу целиком на каждый запрос.
+В среднем 1,5 проекта на пользователя: `--users 670000` — около миллиона проектов.
+
+    python -m benchmarks.search --users 670000 --iterations 200 --json search.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import text
+
+from benchmarks.harness import DEFAULT_DATA_DIR, BenchEnvironment, environment_info, percentile
+from benchmarks.seed import CATEGORIES, WORDS
+from bot.misc.config import BotConfig
+
+LIKE_COLUMNS = ("projects.name", "projects.category", "projects.description", "users.bio")
+
+
+def build_queries(rng: random.Random, count: int) -> List[str]:
+    """Одно слово, два слова, префикс и категория вперемешку"""
+    queries = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            queries.append(rng.choice(WORDS))
+        elif kind == 1:
+            queries.append(" ".join(rng.sample(WORDS, 2)))
+        elif kind == 2:
+            queries.append(rng.choice(WORDS)[:4])
+        else:
+            queries.append(f"{rng.choice(CATEGORIES).split()[0]} {rng.choice(WORDS)}")
+    return queries
+
+
+async def like_search(env: BenchEnvironment, query: str, per_page: int) -> int:
+    """Поиск без индекса: каждое слово должно встретиться хотя бы в одной колонке"""
+    words = query.split()
+    conditions = " AND ".join(
+        "(" + " OR ".join(f"{column} LIKE :w{i}" for column in LIKE_COLUMNS) + ")"
+        for i in range(len(words))
+    )
+    params = {f"w{i}": f"%{word}%" for i, word in enumerate(words)}
+    source = f"FROM projects JOIN users ON users.id = projects.user_id WHERE {conditions}"
+
+    async with env.bot.db.get_session() as session:
+        total = await session.scalar(text(f"SELECT count(*) {source}"), params)
+        await session.execute(
+            text(f"SELECT projects.id {source} ORDER BY projects.id LIMIT :limit"),
+            {**params, 'limit': per_page}
+        )
+    return total
+
+
+async def run_search(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    queries = build_queries(rng, args.iterations)
+
+    async with BenchEnvironment(args.users, args.seed, args.data_dir) as env:
+        async with env.bot.db.get_session() as session:
+            projects = await session.scalar(text("SELECT count(*) FROM projects"))
+
+        result = {'users': args.users, 'projects': projects, 'iterations': args.iterations, 'methods': {}}
+        searches = {
+            'fts5': lambda q: env.bot.db.search_projects(q, per_page=BotConfig.SEARCH_PAGE_SIZE),
+            'like': lambda q: like_search(env, q, BotConfig.SEARCH_PAGE_SIZE),
+        }
+
+        for method, search in searches.items():
+            if method == 'like' and args.like_iterations == 0:
+                continue
+
+            latencies, matches = [], []
+            sample = queries if method == 'fts5' else queries[:args.like_iterations]
+            for query in sample:
+                started_at = time.perf_counter()
+                found = await search(query)
+                latencies.append(time.perf_counter() - started_at)
+                matches.append(found if isinstance(found, int) else found.total)
+
+            summary = {
+                'count': len(latencies),
+                'p50_ms': percentile(latencies, 0.5) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+                'mean_matches': sum(matches) / len(matches) if matches else 0.0,
+            }
+            result['methods'][method] = summary
+            print(
+                f"{args.users:>9} польз. {projects:>9} проектов  {method:<5}  p50 {summary['p50_ms']:>8.1f} мс  "
+                f"p99 {summary['p99_ms']:>8.1f} мс  совпадений {summary['mean_matches']:>9.0f}"
+            )
+
+        return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер полнотекстового поиска проектов")
+    parser.add_argument('--users', type=int, default=670_000, help="Размер заполненной базы")
+    parser.add_argument('--iterations', type=int, default=200, help="Запросов к FTS5")
+    parser.add_argument('--like-iterations', type=int, default=20,
+                        help="Запросов через LIKE (каждый читает всю таблицу); 0 — пропустить")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--json', help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(run_search(args))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment_info(), 'run': result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import os
+import random
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List
+
+from PIL import Image, ImageDraw
+from sqlalchemy import insert, select, func
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from bot.database import User, Project, Media, Link
+from bot.misc.media_utils import MediaUtils, StoredMedia
+
+BASE_DISCORD_ID = 10 ** 17
+BATCH_SIZE = 20_000
+MEDIA_POOL_SIZE = 32
+
+CATEGORIES = [
+    "Веб-разработка", "Дизайн", "Иллюстрация", "Фотография", "Мобильные приложения", "Игры",
+    "3D", "Музыка", "Видео", "Тексты", "Data Science", "DevOps",
+]
+WORDS = [
+    "современный", "сайт", "приложение", "бренд", "концепт", "редизайн", "интерфейс", "магазин",
+    "портфолио", "игра", "анимация", "логотип", "сервис", "платформа", "бот", "лендинг",
+]
+
+
+@dataclass
+class SeedInfo:
+    users: int
+    media: List[StoredMedia]
+
+    @staticmethod
+    def discord_id(index: int) -> int:
+        return BASE_DISCORD_ID + index
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def build_media_pool(media_utils: MediaUtils, seed: int, size: int = MEDIA_POOL_SIZE) -> List[StoredMedia]:
+    """Одинаковые при каждом запуске изображения в хранилище бота"""
+    rng = random.Random(seed)
+    pool = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i in range(size):
+            image = Image.new("RGB", (1600, 1000), tuple(rng.randrange(256) for _ in range(3)))
+            draw = ImageDraw.Draw(image)
+            for _ in range(40):
+                x, y = rng.randrange(1600), rng.randrange(1000)
+                draw.rectangle(
+                    (x, y, x + rng.randrange(20, 400), y + rng.randrange(20, 300)),
+                    fill=tuple(rng.randrange(256) for _ in range(3))
+                )
+
+            path = os.path.join(tmp_dir, f"{i}.png")
+            image.save(path, "PNG")
+            pool.append(media_utils.import_file(path))
+
+    return pool
+
+
+async def seed_database(engine: AsyncEngine, media_utils: MediaUtils, users: int, seed: int = 0) -> SeedInfo:
+    """Заполняет базу `users` пользователями с проектами, медиафайлами и ссылками.
+
+    Данные зависят только от `seed`; уже заполненная база не пересоздается.
+    """
+    pool = build_media_pool(media_utils, seed)
+    info = SeedInfo(users=users, media=pool)
+
+    async with engine.begin() as conn:
+        existing = await conn.scalar(select(func.count()).select_from(User))
+        if existing >= users:
+            return info
+        if existing:
+            raise RuntimeError(f"База уже содержит {existing} пользователей, ожидалось 0 или {users}")
+
+    rng = random.Random(seed)
+    created_at = datetime(2024, 1, 1)
+    project_id = 0
+
+    for start in range(0, users, BATCH_SIZE):
+        stop = min(start + BATCH_SIZE, users)
+        user_rows, project_rows, media_rows, link_rows = [], [], [], []
+
+        async with engine.begin() as conn:
+            for index in range(start, stop):
+                user_id = index + 1
+                user_rows.append({
+                    'id': user_id,
+                    'discord_id': SeedInfo.discord_id(index),
+                    'bio': _sentence(rng, rng.randrange(5, 30)) if rng.random() < 0.7 else None,
+                    'created_at': created_at,
+                    'updated_at': created_at,
+                })
+
+                for k in range(rng.choice((0, 1, 1, 2, 2, 3))):
+                    project_id += 1
+                    name = f"Project {index}-{k}"
+                    category = rng.choice(CATEGORIES)
+                    project_rows.append({
+                        'id': project_id,
+                        'user_id': user_id,
+                        'name': name,
+                        'name_normalized': Project.normalize_name(name),
+                        'category': category,
+                        'category_norm': Project.normalize_category(category),
+                        'description': _sentence(rng, rng.randrange(10, 60)),
+                        'created_at': created_at + timedelta(minutes=index),
+                        'updated_at': created_at + timedelta(minutes=index),
+                    })
+
+                    if rng.random() < 0.4:
+                        for stored in rng.sample(pool, rng.randrange(1, 4)):
+                            media_rows.append({
+                                'project_id': project_id,
+                                'url': stored.path,
+                                'type': 'image',
+                                'sha256': stored.sha256,
+                                'file_ext': stored.file_ext,
+                                'created_at': created_at,
+                            })
+
+                for k in range(rng.choice((0, 1, 2, 3))):
+                    link_rows.append({
+                        'user_id': user_id,
+                        'url': f"https://example.com/u{index}/{k}",
+                        'title': rng.choice(("GitHub", "Behance", "Сайт", "LinkedIn")),
+                        'created_at': created_at,
+                    })
+
+            await conn.execute(insert(User), user_rows)
+            if project_rows:
+                await conn.execute(insert(Project), project_rows)
+            if media_rows:
+                await conn.execute(insert(Media), media_rows)
+            if link_rows:
+                await conn.execute(insert(Link), link_rows)
+
+    return info
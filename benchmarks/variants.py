@@ -0,0 +1,137 @@
+"""Пропускная способность `ImagePipeline` в зависимости от размера пула (`IMAGE_WORKERS`).
+
+Для каждого размера пула все изображения отправляются на кодирование разом, как
+при наплыве загрузок. Запуск процессов пула в замер не входит: перед ним
+каждый процесс кодирует по одному изображению. Лаг event loop показывает, что
+кодирование не занимает его и GIL.
+
+    python -m benchmarks.variants --images 64 --workers 1 2 4 8 --json variants.json
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import shutil
+import time
+from typing import Any, Dict, List
+
+from PIL import Image, ImageDraw
+
+from benchmarks.harness import DEFAULT_DATA_DIR, environment_info, measure_loop_lag, percentile
+from bot.misc.image_pipeline import ImagePipeline
+
+
+def _prepare_sources(source_dir: str, count: int, width: int, height: int, seed: int) -> List[str]:
+    """Фотографии-заменители: градиент, фигуры и шум, чтобы кодирование было не тривиальным"""
+    os.makedirs(source_dir, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+
+    for i in range(count):
+        path = os.path.join(source_dir, f"source-{width}x{height}-{i}.png")
+        paths.append(path)
+        if os.path.exists(path):
+            continue
+
+        image = Image.linear_gradient('L').resize((width, height)).convert('RGB')
+        draw = ImageDraw.Draw(image)
+        for _ in range(40):
+            x, y = rng.randrange(width), rng.randrange(height)
+            draw.ellipse((x, y, x + rng.randrange(50, 400), y + rng.randrange(50, 400)),
+                         fill=tuple(rng.randrange(256) for _ in range(3)))
+        noise = Image.effect_noise((width, height), 24).convert('RGB')
+        Image.blend(image, noise, 0.15).save(path, 'PNG')
+
+    return paths
+
+
+async def _run_pool(workers: int, sources: List[str], variants_dir: str) -> Dict[str, Any]:
+    shutil.rmtree(variants_dir, ignore_errors=True)
+    pipeline = ImagePipeline(variants_dir, workers)
+    pipeline.start()
+
+    def digest(path: str, salt: str) -> str:
+        return hashlib.sha256(f"{salt}:{path}".encode()).hexdigest()
+
+    latencies: List[float] = []
+    lag: List[float] = []
+
+    async def render(path: str) -> int:
+        started_at = time.perf_counter()
+        variants = await pipeline.create_variants(path, digest(path, "run"))
+        latencies.append(time.perf_counter() - started_at)
+        return len(variants)
+
+    try:
+        # Прогрев: процессы пула запускаются и импортируют модули до замера
+        await asyncio.gather(*(pipeline.create_variants(path, digest(path, "warmup"))
+                               for path in sources[:workers]))
+
+        stop = asyncio.Event()
+        lag_task = asyncio.create_task(measure_loop_lag(lag, stop))
+        started_at = time.perf_counter()
+        rendered = await asyncio.gather(*(render(path) for path in sources))
+        duration = time.perf_counter() - started_at
+        stop.set()
+        await lag_task
+    finally:
+        pipeline.close()
+        shutil.rmtree(variants_dir, ignore_errors=True)
+
+    return {
+        'workers': workers,
+        'images': len(sources),
+        'variants': sum(rendered),
+        'seconds': duration,
+        'images_per_second': len(sources) / duration,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'loop_lag_p99_ms': percentile(lag, 0.99) * 1000,
+    }
+
+
+async def run_variants(args: argparse.Namespace) -> Dict[str, Any]:
+    bench_dir = os.path.join(args.data_dir, "variants")
+    sources = await asyncio.to_thread(
+        _prepare_sources, os.path.join(bench_dir, "sources"), args.images, args.width, args.height, args.seed
+    )
+    result = {'images': args.images, 'size': [args.width, args.height], 'pools': []}
+
+    for workers in args.workers:
+        summary = await _run_pool(workers, sources, os.path.join(bench_dir, "out"))
+        result['pools'].append(summary)
+        print(
+            f"пул {workers:>3}  {summary['images_per_second']:>7.1f} изобр./с  "
+            f"p50 {summary['p50_ms']:>8.1f} мс  p99 {summary['p99_ms']:>8.1f} мс  "
+            f"лаг p99 {summary['loop_lag_p99_ms']:>6.2f} мс"
+        )
+
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Замер кодирования вариантов изображений в пуле процессов")
+    parser.add_argument('--images', type=int, default=64, help="Сколько изображений кодируется за прогон")
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, os.cpu_count() or 1}), help="Размеры пула процессов")
+    parser.add_argument('--width', type=int, default=2400)
+    parser.add_argument('--height', type=int, default=1600)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR)
+    parser.add_argument('--json', help="Файл для результатов в JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    result = asyncio.run(run_variants(args))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'environment': environment_info(), 'run': result}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
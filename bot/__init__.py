@@ -1 +1,2 @@
-from .main import start_bot
+from .main import start_bot, create_bot
+from .cluster import launch_cluster
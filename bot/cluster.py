@@ -0,0 +1,163 @@
+import time
+import queue
+import asyncio
+import logging
+import multiprocessing
+from multiprocessing.process import BaseProcess
+from typing import List, Dict, Any
+
+import aiohttp
+
+from bot.main import start_bot
+from bot.misc import Env
+from bot.database import Database, create_db_engine
+from bot.misc.media_utils import MediaUtils
+
+logger = logging.getLogger(__name__)
+
+DISCORD_GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+
+
+def split_shards(shard_count: int, cluster_count: int) -> List[List[int]]:
+    """Делит шарды на непрерывные диапазоны, по одному на процесс"""
+    size, extra = divmod(shard_count, cluster_count)
+    ranges, start = [], 0
+
+    for cluster_id in range(cluster_count):
+        end = start + size + (1 if cluster_id < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+
+    return ranges
+
+
+async def fetch_recommended_shards(token: str) -> int:
+    """Рекомендуемое Discord число шардов"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(DISCORD_GATEWAY_BOT_URL, headers={"Authorization": f"Bot {token}"}) as response:
+            response.raise_for_status()
+            return (await response.json())["shards"]
+
+
+async def _prepare_storage() -> None:
+    db = Database(create_db_engine())
+    try:
+        await db.init_models()
+        await MediaUtils().migrate_media_store(db)
+        await db.reset_running_media_jobs()
+    finally:
+        await db.dispose()
+
+
+def _run_cluster(cluster_id: int, shard_ids: List[int], shard_count: int, health_queue) -> None:
+    start_bot(
+        shard_ids=shard_ids,
+        shard_count=shard_count,
+        cluster_id=cluster_id,
+        health_queue=health_queue,
+        migrate=False
+    )
+
+
+class ClusterLauncher:
+    """Запускает шарды бота в нескольких процессах, следит за их состоянием и перезапускает упавшие"""
+
+    def __init__(self, cluster_count: int = Env.CLUSTER_COUNT, shard_count: int = Env.SHARD_COUNT):
+        self.cluster_count = cluster_count
+        self.shard_count = shard_count
+        self.health: Dict[int, Dict[str, Any]] = {}
+
+        self._context = multiprocessing.get_context("spawn")
+        self._queue = self._context.Queue()
+        self._processes: Dict[int, BaseProcess] = {}
+        self._ranges: List[List[int]] = []
+        self._restart_at: Dict[int, float] = {}
+
+    def _spawn(self, cluster_id: int) -> None:
+        # Не daemon: у демонических процессов не может быть дочерних, а воркеру
+        # нужен пул процессов для изображений. Остановка — в `run`
+        process = self._context.Process(
+            target=_run_cluster,
+            args=(cluster_id, self._ranges[cluster_id], self.shard_count, self._queue),
+            name=f"portfolio-cluster-{cluster_id}",
+            daemon=False
+        )
+        process.start()
+        self._processes[cluster_id] = process
+        logger.info(f"Кластер {cluster_id} запущен (pid={process.pid}, шарды {self._ranges[cluster_id]})")
+
+    def _drain_health(self, timeout: float) -> None:
+        try:
+            report = self._queue.get(timeout=timeout)
+            while True:
+                self.health[report['cluster_id']] = report
+                report = self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _check_processes(self) -> None:
+        now = time.monotonic()
+
+        for cluster_id, process in self._processes.items():
+            if process.is_alive():
+                continue
+
+            if cluster_id not in self._restart_at:
+                logger.error(f"Кластер {cluster_id} завершился с кодом {process.exitcode}")
+                self._restart_at[cluster_id] = now + Env.CLUSTER_RESTART_DELAY
+
+            if now >= self._restart_at[cluster_id]:
+                del self._restart_at[cluster_id]
+                self.health.pop(cluster_id, None)
+                self._spawn(cluster_id)
+
+    def _log_health(self) -> None:
+        stale_after = Env.CLUSTER_HEALTH_INTERVAL * 3
+
+        for cluster_id in range(self.cluster_count):
+            report = self.health.get(cluster_id)
+
+            if report is None:
+                logger.warning(f"Кластер {cluster_id}: нет данных о состоянии")
+            elif time.time() - report['timestamp'] > stale_after:
+                logger.warning(f"Кластер {cluster_id}: не отвечает {time.time() - report['timestamp']:.0f} с")
+            else:
+                logger.info(
+                    f"Кластер {cluster_id}: ready={report['ready']} шарды={report['shards']} "
+                    f"серверов={report['guilds']} задержка={report['latency'] * 1000:.0f} мс"
+                )
+
+    def run(self) -> None:
+        if not self.shard_count:
+            self.shard_count = asyncio.run(fetch_recommended_shards(Env.TOKEN))
+
+        self.cluster_count = max(1, min(self.cluster_count, self.shard_count))
+        self._ranges = split_shards(self.shard_count, self.cluster_count)
+
+        # Схема и хранилище готовятся один раз, до запуска воркеров
+        asyncio.run(_prepare_storage())
+
+        for cluster_id in range(self.cluster_count):
+            self._spawn(cluster_id)
+
+        try:
+            while True:
+                self._drain_health(Env.CLUSTER_HEALTH_INTERVAL)
+                self._check_processes()
+                self._log_health()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for process in self._processes.values():
+                process.terminate()
+            for process in self._processes.values():
+                process.join(timeout=10)
+                if process.is_alive():
+                    logger.warning(f"Процесс {process.name} не завершился, принудительная остановка")
+                    process.kill()
+                    process.join()
+
+
+def launch_cluster() -> None:
+    logging.basicConfig(level=logging.INFO)
+    ClusterLauncher().run()
@@ -1,12 +1,28 @@
-from nextcord.ext.commands import Cog, Bot
+from nextcord.ext.commands import Cog, Bot, Context, command, is_owner
+
+from bot.misc.embeds.admin import AdminEmbeds
+from bot.misc.metrics import Metrics
+from bot.misc.send_queue import SendQueue
 
 
 # todo: AdminCogs
 class __MainAdminCog(Cog):
 
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, metrics: Metrics, send_queue: SendQueue):
         self.bot = bot
+        self.metrics = metrics
+        self.send_queue = send_queue
+
+    @command(name="metrics")
+    @is_owner()
+    async def show_metrics(self, ctx: Context):
+        """Метрики процесса: задержки команд, запросы к БД, кэш и очереди"""
+        await self.send_queue.send(ctx, embed=AdminEmbeds.metrics(
+            self.metrics.command_summary(),
+            self.metrics.db_summary(),
+            self.metrics.collect()
+        ))
 
 
-def register_admin_cogs(bot: Bot) -> None:
-    bot.add_cog(__MainAdminCog(bot))
+def register_admin_cogs(bot: Bot, metrics: Metrics, send_queue: SendQueue) -> None:
+    bot.add_cog(__MainAdminCog(bot, metrics, send_queue))
@@ -1,15 +1,17 @@
 from nextcord.ext.commands import Bot
 
+from bot.database import Database
+from bot.misc.media_utils import MediaUtils
+from bot.misc.send_queue import SendQueue
+from bot.misc.media_jobs import MediaJobQueue
+from bot.misc.metrics import Metrics
 from bot.cogs.admin import register_admin_cogs
 from bot.cogs.other import register_other_cogs
 from bot.cogs.user import register_user_cogs
 
 
-def register_all_cogs(bot: Bot) -> None:
-    cogs = (
-        register_user_cogs,
-        register_admin_cogs,
-        register_other_cogs,
-    )
-    for cog in cogs:
-        cog(bot)
+def register_all_cogs(bot: Bot, db: Database, media_utils: MediaUtils, send_queue: SendQueue,
+                      media_jobs: MediaJobQueue, metrics: Metrics) -> None:
+    register_user_cogs(bot, db, media_utils, send_queue, media_jobs)
+    register_admin_cogs(bot, metrics, send_queue)
+    register_other_cogs(bot)
@@ -3,7 +3,7 @@ from bot.cogs.user.project_manager import register_user_cogs as register_project
 from bot.cogs.user.settings_manager import register_user_cogs as register_settings
 
 
-def register_user_cogs(bot):
-    register_portfolio(bot)
-    register_project(bot)
-    register_settings(bot)
+def register_user_cogs(bot, db, media_utils, send_queue, media_jobs):
+    register_portfolio(bot, send_queue)
+    register_project(bot, db, media_utils, send_queue, media_jobs)
+    register_settings(bot, db, send_queue)
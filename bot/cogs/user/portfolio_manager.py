@@ -1,18 +1,20 @@
 from nextcord.ext.commands import Cog, Bot, command, Context
 
 from bot.misc.embeds import other
+from bot.misc.send_queue import SendQueue
 
 
 class __PortfolioManager(Cog):
 
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, send_queue: SendQueue):
         self.bot = bot
+        self.send_queue = send_queue
 
     @command(name="start")
     async def start(self, ctx: Context):
         embed = other.get_start_embed()
         
-        await ctx.send(embed=embed)
+        await self.send_queue.send(ctx, embed=embed)
 
-def register_user_cogs(bot: Bot) -> None:
-    bot.add_cog(__PortfolioManager(bot))
+def register_user_cogs(bot: Bot, send_queue: SendQueue) -> None:
+    bot.add_cog(__PortfolioManager(bot, send_queue))
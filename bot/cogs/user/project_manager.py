@@ -1,193 +1,351 @@
 from nextcord.ext.commands import Cog, Bot, command, Context
-from nextcord import Embed, Color, Member
+from nextcord import Embed, Color, Member, Message, Interaction
+from nextcord.ui import View
 from datetime import datetime
+from functools import partial
+from typing import Optional, List
 import logging
-import os
+import math
 import nextcord
 
-from bot.database import Database
+from bot.database import Database, ProjectCreateStatus
+from bot.misc import BotConfig
 from bot.misc.embeds.projects import ProjectEmbeds
 from bot.misc.embeds.media import MediaEmbeds
-from bot.misc.embeds.portfolio import PortfolioEmbeds
+from bot.misc.embeds.portfolio import PortfolioEmbeds, PortfolioMessage, DEFAULT_UPLOAD_LIMIT
 from bot.misc.media_utils import MediaUtils
+from bot.misc.media_jobs import MediaJobQueue
+from bot.misc.send_queue import SendQueue
+from bot.misc.views import PortfolioView, MediaRemoveView, ViewRegistry
 
 logger = logging.getLogger(__name__)
 
 
 class __ProjectManager(Cog):
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, db: Database, media_utils: MediaUtils, send_queue: SendQueue,
+                 media_jobs: MediaJobQueue):
         self.bot = bot
-        self.db = Database()
-        self.media_utils = MediaUtils()
+        self.db = db
+        self.media_utils = media_utils
+        self.send_queue = send_queue
+        self.media_jobs = media_jobs
+        self.views = ViewRegistry(BotConfig.MAX_LIVE_VIEWS)
 
     @command(name="add-project")
     async def add_project(self, ctx: Context, name: str = None, category: str = None, *, description: str = None):
         """Добавить новый проект в портфолио"""
         if any(arg is None for arg in [name, category, description]):
             embed = ProjectEmbeds.add_project_missing_args()
-            await ctx.send(embed=embed)
+            await self.send_queue.send(ctx, embed=embed)
             return
 
         try:
-            # Проверяем количество существующих проектов
-            existing_projects = self.db.get_user_projects(ctx.author.id)
-            if len(existing_projects) >= 3:
-                embed = ProjectEmbeds.project_limit_reached()
-                await ctx.send(embed=embed)
-                return
-
-            # Проверяем, существует ли уже проект с таким названием
-            existing_project = self.db.get_project_by_name(ctx.author.id, name)
-            if existing_project:
-                embed = ProjectEmbeds.project_exists(name)
-                await ctx.send(embed=embed)
-                return
-
-            project = self.db.create_project(
+            # Лимит, уникальность названия и вставка — в одной транзакции
+            result = await self.db.create_project_checked(
                 discord_id=ctx.author.id,
                 name=name,
                 category=category,
                 description=description
             )
 
-            remaining = 3 - len(existing_projects) - 1
-            embed = ProjectEmbeds.project_added_success(name, category, description, remaining)
-            await ctx.send(embed=embed)
+            if result.status is ProjectCreateStatus.LIMIT_REACHED:
+                embed = ProjectEmbeds.project_limit_reached()
+            elif result.status is ProjectCreateStatus.DUPLICATE:
+                embed = ProjectEmbeds.project_exists(name)
+            else:
+                embed = ProjectEmbeds.project_added_success(name, category, description, result.remaining)
+
+            await self.send_queue.send(ctx, embed=embed)
 
         except Exception as e:
             logger.error(f"Ошибка при добавлении проекта: {str(e)}")
             embed = ProjectEmbeds.generic_error("Произошла ошибка при добавлении проекта. Пожалуйста, попробуйте позже.")
-            await ctx.send(embed=embed)
+            await self.send_queue.send(ctx, embed=embed)
 
     @command(name="add-media")
     async def add_media(self, ctx: Context, project_name: str = None):
         """Добавить медиафайлы к проекту"""
         if project_name is None:
             embed = MediaEmbeds.add_media_missing_args()
-            await ctx.send(embed=embed)
+            await self.send_queue.send(ctx, embed=embed)
             return
 
         try:
-            project = self.db.get_project_by_name(ctx.author.id, project_name)
+            project = await self.db.get_project_by_name(ctx.author.id, project_name)
 
             if not project:
                 embed = ProjectEmbeds.project_exists(project_name)  
-                await ctx.send(embed=embed)
+                await self.send_queue.send(ctx, embed=embed)
                 return
 
             # Проверяем, есть ли вложения в сообщении
             if not ctx.message.attachments:
                 embed = MediaEmbeds.no_attachments()
-                await ctx.send(embed=embed)
+                await self.send_queue.send(ctx, embed=embed)
                 return
 
-            # Обрабатываем каждое вложение
-            added_media = []
-            errors = []
-
-            for attachment in ctx.message.attachments:
-                try:
-                    # Определяем тип медиафайла
-                    media_type = MediaUtils.get_media_type(attachment.content_type)
-                    if not media_type:
-                        errors.append(f"• Неподдерживаемый формат: {attachment.filename}")
-                        continue
-
-                    # Скачиваем файл
-                    filepath = await self.media_utils.download_media(attachment.url, project.id)
-                    # Добавляем запись в базу данных
-                    media = self.db.add_media(project.id, filepath, media_type)
-                    if media:
-                        added_media.append(f"• {attachment.filename}")
-
-                except Exception as e:
-                    logger.error(f"Ошибка при обработке медиафайла {attachment.filename}: {str(e)}")
-                    errors.append(f"• Ошибка при обработке {attachment.filename}")
-
-            embed = MediaEmbeds.media_add_result(project_name, added_media, errors)
-            await ctx.send(embed=embed)
+            # Загрузка идет в фоне: подтверждение заменится результатом
+            message = await self.send_queue.send(
+                ctx, embed=MediaEmbeds.media_processing(project_name, len(ctx.message.attachments)), merge=False
+            )
+            await self.db.enqueue_media_job(
+                project_id=project.id,
+                project_name=project_name,
+                channel_id=ctx.channel.id,
+                message_id=message.id,
+                attachments=[
+                    {
+                        'url': attachment.url,
+                        'filename': attachment.filename,
+                        'content_type': attachment.content_type,
+                        'size': attachment.size,
+                    }
+                    for attachment in ctx.message.attachments
+                ]
+            )
+            self.media_jobs.notify()
 
         except Exception as e:
             logger.error(f"Ошибка при добавлении медиафайлов: {str(e)}")
             embed = ProjectEmbeds.generic_error("Произошла ошибка при добавлении медиафайлов. Пожалуйста, попробуйте позже.")
-            await ctx.send(embed=embed)
+            await self.send_queue.send(ctx, embed=embed)
 
     @command(name="preview")
     async def preview_portfolio(self, ctx: Context, member: Member = None):
         """Предпросмотр портфолио"""
         try:
             target = member or ctx.author
-            projects = self.db.get_user_projects(target.id)
-            embed = PortfolioEmbeds.portfolio_preview(target, bool(projects))
-            await ctx.send(embed=embed)
-            if projects:
-                for project in projects:
-                    project_embed = PortfolioEmbeds.project_details(project)
-                    await ctx.send(embed=project_embed)
-                    media = self.db.get_project_media(project.id)
-                    if media:
-                        for m in media:
-                            try:
-                                if os.path.exists(m.url):
-                                    await ctx.send(file=nextcord.File(m.url))
-                            except Exception as e:
-                                logger.error(f"Ошибка при отправке медиафайла {m.url}: {str(e)}")
-                    else:
-                        await ctx.send("📎 Нет медиафайлов")
+            total = await self.db.count_user_projects(target.id)
+
+            if not total:
+                await self.send_queue.send(ctx, embed=PortfolioEmbeds.portfolio_preview(target, False))
+                return
+
+            upload_limit = ctx.guild.filesize_limit if ctx.guild else DEFAULT_UPLOAD_LIMIT
+
+            # Страница загружается только при переходе на нее
+            async def render_page(index: int) -> Optional[List[PortfolioMessage]]:
+                project = await self.db.get_project_page(target.id, index)
+                return PortfolioEmbeds.project_page(target, project, upload_limit) if project else None
+
+            parts = await render_page(0)
+            if parts is None:
+                await self.send_queue.send(ctx, embed=PortfolioEmbeds.portfolio_preview(target, False))
+                return
+
+            if total == 1 and len(parts) == 1:
+                await self._send_portfolio_message(ctx, parts[0])
+                return
+
+            view = PortfolioView(
+                author_id=ctx.author.id,
+                total=total,
+                registry=self.views,
+                render_page=render_page,
+                send_page=partial(self._send_portfolio_message, ctx),
+                timeout=BotConfig.VIEW_TIMEOUT,
+                parts=parts
+            )
+            view.message = await self._send_portfolio_message(ctx, parts[0], view=view)
+            self.views.add(view)
         except Exception as e:
             logger.error(f"Ошибка при загрузке портфолио: {str(e)}")
             embed = ProjectEmbeds.generic_error("Произошла ошибка при загрузке портфолио. Пожалуйста, попробуйте позже.")
-            await ctx.send(embed=embed)
+            await self.send_queue.send(ctx, embed=embed)
+
+    @command(name="search")
+    async def search_projects(self, ctx: Context, *, query: str = None):
+        """Поиск проектов по названию, категории, описанию и профилю автора"""
+        if not query:
+            embed = ProjectEmbeds.generic_error(
+                "Пожалуйста, укажите, что искать.\nПример: `/search python дизайн`"
+            )
+            await self.send_queue.send(ctx, embed=embed)
+            return
+
+        try:
+            async def render_page(index: int) -> Optional[List[PortfolioMessage]]:
+                page = await self.db.search_projects(query, index)
+                if not page.projects and index:
+                    return None
+                return [PortfolioMessage(embeds=[PortfolioEmbeds.search_results(query, page)])]
+
+            first = await self.db.search_projects(query, 0)
+            payload = PortfolioMessage(embeds=[PortfolioEmbeds.search_results(query, first)])
+
+            if first.pages == 1:
+                await self._send_portfolio_message(ctx, payload)
+                return
+
+            view = PortfolioView(
+                author_id=ctx.author.id,
+                total=first.pages,
+                registry=self.views,
+                render_page=render_page,
+                send_page=partial(self._send_portfolio_message, ctx),
+                timeout=BotConfig.VIEW_TIMEOUT,
+                parts=[payload]
+            )
+            view.message = await self._send_portfolio_message(ctx, payload, view=view)
+            self.views.add(view)
+        except Exception as e:
+            logger.error(f"Ошибка при поиске проектов: {str(e)}")
+            embed = ProjectEmbeds.generic_error("Произошла ошибка при поиске. Пожалуйста, попробуйте позже.")
+            await self.send_queue.send(ctx, embed=embed)
+
+    @command(name="browse")
+    async def browse_category(self, ctx: Context, *, category: str = None):
+        """Проекты категории, новые первыми; без аргумента — список категорий"""
+        try:
+            if not category:
+                categories = await self.db.get_categories()
+                await self.send_queue.send(ctx, embed=PortfolioEmbeds.categories(categories))
+                return
+
+            found = await self.db.get_category(category)
+            if found is None or not found.project_count:
+                suggestions = await self.db.suggest_categories(category)
+                await self.send_queue.send(ctx, embed=PortfolioEmbeds.category_not_found(category, suggestions))
+                return
+
+            pages = math.ceil(found.project_count / BotConfig.BROWSE_PAGE_SIZE)
+            # Ключ последнего проекта каждой открытой страницы: кнопки листают
+            # на одну страницу, поэтому ключ предыдущей страницы всегда известен
+            cursors = {0: None}
+
+            async def render_page(index: int) -> Optional[List[PortfolioMessage]]:
+                if index not in cursors:
+                    return None
+
+                projects = await self.db.browse_category(found.norm, cursors[index])
+                if not projects:
+                    return None
+
+                cursors[index + 1] = (projects[-1].created_at, projects[-1].id)
+                return [PortfolioMessage(embeds=[PortfolioEmbeds.browse_results(found, projects, index, pages)])]
+
+            parts = await render_page(0)
+            if parts is None:
+                await self.send_queue.send(ctx, embed=PortfolioEmbeds.category_not_found(category, []))
+                return
+
+            if pages == 1:
+                await self._send_portfolio_message(ctx, parts[0])
+                return
+
+            view = PortfolioView(
+                author_id=ctx.author.id,
+                total=pages,
+                registry=self.views,
+                render_page=render_page,
+                send_page=partial(self._send_portfolio_message, ctx),
+                timeout=BotConfig.VIEW_TIMEOUT,
+                parts=parts
+            )
+            view.message = await self._send_portfolio_message(ctx, parts[0], view=view)
+            self.views.add(view)
+        except Exception as e:
+            logger.error(f"Ошибка при просмотре категории: {str(e)}")
+            embed = ProjectEmbeds.generic_error("Произошла ошибка при загрузке категории. Пожалуйста, попробуйте позже.")
+            await self.send_queue.send(ctx, embed=embed)
+
+    async def _send_portfolio_message(self, ctx: Context, payload: PortfolioMessage,
+                                      view: Optional[View] = None, message: Optional[Message] = None) -> Message:
+        """Отправляет (или заменяет в `message`) упакованное сообщение и запоминает ссылки CDN на загруженные файлы"""
+        files = []
+        for m in payload.uploads:
+            # Файлы хранилища лежат без расширения, а по нему Discord решает, как показать вложение
+            path = MediaUtils.display_path(m)
+            files.append(nextcord.File(path, filename=MediaUtils.file_name(m, path)))
+
+        if message is None:
+            message = await self.send_queue.send(
+                ctx,
+                content=payload.content,
+                embeds=payload.embeds or None,
+                files=files or None,
+                view=view
+            )
+        else:
+            message = await message.edit(
+                content=payload.content,
+                embeds=payload.embeds,
+                files=files,
+                attachments=[],
+                view=view
+            )
+
+        self.media_utils.record_reuse(payload.reused_refs)
+        for m in payload.uploads:
+            self.media_utils.record_upload(MediaUtils.display_path(m))
+
+        # Вложения в ответе идут в том же порядке, что и загруженные файлы
+        cdn_urls = [
+            (m.id, attachment.url, MediaUtils.parse_cdn_expiry(attachment.url))
+            for m, attachment in zip(payload.uploads, message.attachments)
+        ]
+        if cdn_urls:
+            await self.db.set_media_cdn_urls(cdn_urls)
+
+        return message
 
     @command(name="remove-media")
     async def remove_media(self, ctx: Context, project_name: str = None):
         """Удалить медиафайлы из проекта"""
         if project_name is None:
             embed = MediaEmbeds.no_media_in_project(project_name or "<не указано>")
-            await ctx.send(embed=embed)
+            await self.send_queue.send(ctx, embed=embed)
             return
 
         try:
-            project = self.db.get_project_by_name(ctx.author.id, project_name)
+            project = await self.db.get_project_by_name(ctx.author.id, project_name)
 
             if not project:
                 embed = ProjectEmbeds.project_exists(project_name)
-                await ctx.send(embed=embed)
+                await self.send_queue.send(ctx, embed=embed)
                 return
 
-            media = self.db.get_project_media(project.id)
+            media = await self.db.get_project_media(project.id)
             if not media:
                 embed = MediaEmbeds.no_media_in_project(project_name)
-                await ctx.send(embed=embed)
+                await self.send_queue.send(ctx, embed=embed)
                 return
 
+            async def on_remove(interaction: Interaction, media_ids: List[int]) -> None:
+                # Удаление ждет блокировку записи: ответ откладывается, чтобы не истекло окно взаимодействия
+                await interaction.response.defer()
+                try:
+                    # Файлы удаляются с диска, только если на них не ссылаются другие записи
+                    removed, orphaned_paths = await self.db.remove_media_batch(media_ids, project_id=project.id)
+                    await self.db.remove_unreferenced_files(orphaned_paths, self.media_utils.remove_files)
+                    if removed:
+                        embed = MediaEmbeds.media_removed(project_name, removed)
+                    else:
+                        embed = ProjectEmbeds.generic_error("Выбранные медиафайлы уже удалены.")
+                except Exception as e:
+                    logger.error(f"Ошибка при удалении медиафайла: {str(e)}")
+                    embed = ProjectEmbeds.generic_error(
+                        "Произошла ошибка при удалении медиафайла. Пожалуйста, попробуйте позже."
+                    )
+                await interaction.edit_original_message(embed=embed, view=None)
+
+            view = MediaRemoveView(
+                author_id=ctx.author.id,
+                media=media,
+                registry=self.views,
+                on_remove=on_remove,
+                timeout=BotConfig.REMOVE_MEDIA_TIMEOUT,
+                custom_id=f"remove-media:{ctx.message.id}"
+            )
             embed = MediaEmbeds.media_list(project_name, media)
-            await ctx.send(embed=embed)
-
-            def check(m):
-                return m.author == ctx.author and m.channel == ctx.channel and m.content.isdigit()
-
-            try:
-                msg = await self.bot.wait_for('message', check=check, timeout=30.0)
-                index = int(msg.content) - 1
-                if 0 <= index < len(media):
-                    file_to_remove = media[index]
-                    if os.path.exists(file_to_remove.url):
-                        os.remove(file_to_remove.url)
-                    with self.db.get_session() as session:
-                        session.delete(file_to_remove)
-                        session.commit()
-                    embed = MediaEmbeds.media_removed(project_name)
-                else:
-                    embed = ProjectEmbeds.generic_error("Неверный номер файла.")
-            except TimeoutError:
-                embed = ProjectEmbeds.generic_error("Вы не выбрали файл для удаления.")
-            await ctx.send(embed=embed)
+            view.message = await self.send_queue.send(ctx, embed=embed, view=view)
+            self.views.add(view)
         except Exception as e:
             logger.error(f"Ошибка при удалении медиафайла: {str(e)}")
             embed = ProjectEmbeds.generic_error("Произошла ошибка при удалении медиафайла. Пожалуйста, попробуйте позже.")
-            await ctx.send(embed=embed)
+            await self.send_queue.send(ctx, embed=embed)
 
 
-def register_user_cogs(bot: Bot) -> None:
-    bot.add_cog(__ProjectManager(bot)) 
\ No newline at end of file
+def register_user_cogs(bot: Bot, db: Database, media_utils: MediaUtils, send_queue: SendQueue,
+                       media_jobs: MediaJobQueue) -> None:
+    bot.add_cog(__ProjectManager(bot, db, media_utils, send_queue, media_jobs)) 
\ No newline at end of file
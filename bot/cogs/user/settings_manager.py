@@ -1,6 +1,7 @@
 from nextcord.ext.commands import Cog, Bot, command, Context, CommandNotFound
 from nextcord import Member
 import logging
+import math
 from typing import Optional, Tuple, List
 
 from bot.database import Database
@@ -8,31 +9,40 @@ from bot.database.models import Link
 from bot.misc.embeds.projects import ProjectEmbeds
 from bot.misc.embeds.media import MediaEmbeds
 from bot.misc.embeds.profile import ProfileEmbeds
+from bot.misc.rate_limit import RateLimited
+from bot.misc.send_queue import SendQueue
 
 logger = logging.getLogger(__name__)
 
 
 class __SettingsManager(Cog):
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, db: Database, send_queue: SendQueue):
         self.bot = bot
-        self.db = Database()
+        self.db = db
+        self.send_queue = send_queue
 
     @Cog.listener()
     async def on_command_error(self, ctx: Context, error):
         """Обработка ошибок команд"""
         if isinstance(error, CommandNotFound):
-            await ctx.send(embed=ProjectEmbeds.generic_error(
+            await self.send_queue.send(ctx, embed=ProjectEmbeds.generic_error(
                 "Такой команды не существует.\nИспользуйте `/help` для просмотра списка доступных команд."
             ))
             return
 
+        if isinstance(error, RateLimited):
+            await self.send_queue.send(ctx, embed=ProjectEmbeds.generic_error(
+                f"Слишком много запросов. Попробуйте снова через {math.ceil(error.retry_after)} с."
+            ))
+            return
+
         logger.error(f"Ошибка при выполнении команды: {str(error)}")
-        await ctx.send(embed=ProjectEmbeds.generic_error())
+        await self.send_queue.send(ctx, embed=ProjectEmbeds.generic_error())
 
     async def _handle_error(self, ctx: Context, error: Exception, action: str):
         """Обработка ошибок с логированием"""
         logger.error(f"Ошибка при {action}: {str(error)}")
-        await ctx.send(embed=ProjectEmbeds.generic_error(
+        await self.send_queue.send(ctx, embed=ProjectEmbeds.generic_error(
             f"Произошла ошибка при {action}. Пожалуйста, попробуйте позже."
         ))
 
@@ -41,19 +51,18 @@ class __SettingsManager(Cog):
         """Просмотр профиля пользователя"""
         try:
             target = member or ctx.author
-            user = self.db.get_user(target.id)
+            portfolio = await self.db.get_portfolio(target.id)
             
-            if not user:
-                await ctx.send(embed=ProjectEmbeds.generic_error(
+            if not portfolio:
+                await self.send_queue.send(ctx, embed=ProjectEmbeds.generic_error(
                     f"Профиль пользователя {target.mention} не найден."
                 ))
                 return
 
-            links = self.db.get_user_links(target.id)
-            await ctx.send(embed=ProfileEmbeds.profile_view(
+            await self.send_queue.send(ctx, embed=ProfileEmbeds.profile_view(
                 member=target,
-                bio=user.bio,
-                links=links,
+                bio=portfolio.user.bio,
+                links=portfolio.links,
                 is_own_profile=(target.id == ctx.author.id)
             ))
 
@@ -64,14 +73,14 @@ class __SettingsManager(Cog):
     async def set_profile(self, ctx: Context, *, bio: Optional[str] = None):
         """Установить описание профиля"""
         if bio is None:
-            await ctx.send(embed=ProjectEmbeds.generic_error(
+            await self.send_queue.send(ctx, embed=ProjectEmbeds.generic_error(
                 "Пожалуйста, укажите описание профиля.\nПример: `/set-profile Я веб-разработчик с 5-летним опытом...`"
             ))
             return
 
         try:
-            self.db.update_user_bio(ctx.author.id, bio)
-            await ctx.send(embed=ProfileEmbeds.profile_updated(bio))
+            await self.db.update_user_bio(ctx.author.id, bio)
+            await self.send_queue.send(ctx, embed=ProfileEmbeds.profile_updated(bio))
 
         except Exception as e:
             await self._handle_error(ctx, e, "обновлении профиля")
@@ -100,7 +109,7 @@ class __SettingsManager(Cog):
     async def set_links(self, ctx: Context, *, links: Optional[str] = None):
         """Установить внешние ссылки"""
         if links is None:
-            await ctx.send(embed=ProjectEmbeds.generic_error(
+            await self.send_queue.send(ctx, embed=ProjectEmbeds.generic_error(
                 "Пожалуйста, укажите ссылки в формате:\n"
                 "`/set-links Название: URL, Название: URL`\n\n"
                 "Пример:\n"
@@ -112,10 +121,10 @@ class __SettingsManager(Cog):
             parsed_links, errors = self._parse_links(links)
 
             if parsed_links:
-                self.db.set_links(ctx.author.id, parsed_links)
+                await self.db.set_links(ctx.author.id, parsed_links)
 
             added_links = [f"• {title}: {url}" for url, title in parsed_links]
-            await ctx.send(embed=ProfileEmbeds.links_updated(added_links, errors))
+            await self.send_queue.send(ctx, embed=ProfileEmbeds.links_updated(added_links, errors))
 
         except Exception as e:
             await self._handle_error(ctx, e, "обновлении ссылок")
@@ -123,8 +132,8 @@ class __SettingsManager(Cog):
     @command(name="help")
     async def help_command(self, ctx: Context):
         """Показать список доступных команд"""
-        await ctx.send(embed=ProfileEmbeds.help_command())
+        await self.send_queue.send(ctx, embed=ProfileEmbeds.help_command())
 
 
-def register_user_cogs(bot: Bot) -> None:
-    bot.add_cog(__SettingsManager(bot)) 
\ No newline at end of file
+def register_user_cogs(bot: Bot, db: Database, send_queue: SendQueue) -> None:
+    bot.add_cog(__SettingsManager(bot, db, send_queue)) 
\ No newline at end of file
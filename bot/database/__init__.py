@@ -1,4 +1,11 @@
-from .models import Base, User, Project, Media, Link
+from .models import Base, User, Project, Category, Media, MediaVariant, MediaJob, Link
+from .schemas import ProjectCreateStatus, ProjectCreateResult, Portfolio, SearchPage
+from .cache import PortfolioCache
 from .database import Database
+from .main import create_db_engine
 
-__all__ = ['Base', 'User', 'Project', 'Media', 'Link', 'Database']
+__all__ = [
+    'Base', 'User', 'Project', 'Category', 'Media', 'MediaVariant', 'MediaJob', 'Link',
+    'ProjectCreateStatus', 'ProjectCreateResult', 'Portfolio', 'SearchPage',
+    'PortfolioCache', 'Database', 'create_db_engine'
+]
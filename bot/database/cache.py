@@ -0,0 +1,148 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple, Any
+
+from .schemas import Portfolio
+
+# Маркер промаха: None — валидное закэшированное значение (пользователя нет)
+MISS = object()
+
+# Приблизительные накладные расходы на ORM-объект и запись кэша, байт
+_OBJECT_OVERHEAD = 512
+_ENTRY_OVERHEAD = 256
+
+
+def _str_size(value: Optional[str]) -> int:
+    return sys.getsizeof(value) if value else 0
+
+
+def estimate_portfolio_size(portfolio: Optional[Portfolio]) -> int:
+    """Оценивает объем памяти, занимаемый снимком портфолио"""
+    size = _ENTRY_OVERHEAD
+
+    if portfolio is None:
+        return size
+
+    size += _OBJECT_OVERHEAD + _str_size(portfolio.user.bio)
+
+    for link in portfolio.links:
+        size += _OBJECT_OVERHEAD + _str_size(link.url) + _str_size(link.title)
+
+    for project in portfolio.projects:
+        size += _OBJECT_OVERHEAD + _str_size(project.name) + _str_size(project.category) + _str_size(project.description)
+        for media in project.media:
+            size += _OBJECT_OVERHEAD + _str_size(media.url)
+
+    return size
+
+
+class PortfolioCache:
+    """Ограниченный по памяти LRU-кэш снимков портфолио с TTL, ключ — discord_id.
+
+    Все записи в `Database` явно инвалидируют ключ пользователя. Чтобы загрузка,
+    начатая до инвалидации, не вернула в кэш устаревший снимок, каждая загрузка
+    получает токен через `begin_load`, и `put` принимается только с живым токеном.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_bytes: int = 16 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        # discord_id -> (момент истечения, размер, снимок)
+        self._entries: "OrderedDict[int, Tuple[float, int, Optional[Portfolio]]]" = OrderedDict()
+        self._loads: Dict[int, Set[object]] = {}
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Текущий оценочный объем кэша в байтах"""
+        return self._size
+
+    def get(self, discord_id: int) -> Any:
+        """Возвращает снимок или `MISS`"""
+        entry = self._entries.get(discord_id)
+
+        if entry is None:
+            self.misses += 1
+            return MISS
+
+        expires_at, _, portfolio = entry
+        if expires_at <= time.monotonic():
+            self._drop(discord_id)
+            self.expirations += 1
+            self.misses += 1
+            return MISS
+
+        self._entries.move_to_end(discord_id)
+        self.hits += 1
+        return portfolio
+
+    def begin_load(self, discord_id: int) -> object:
+        token = object()
+        self._loads.setdefault(discord_id, set()).add(token)
+        return token
+
+    def end_load(self, discord_id: int, token: object) -> None:
+        tokens = self._loads.get(discord_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._loads[discord_id]
+
+    def put(self, discord_id: int, portfolio: Optional[Portfolio], token: object) -> None:
+        """Сохраняет снимок, если с начала загрузки ключ не инвалидировался"""
+        tokens = self._loads.get(discord_id)
+        if tokens is None or token not in tokens:
+            return
+
+        size = estimate_portfolio_size(portfolio)
+        if size > self.max_bytes:
+            return
+
+        self._drop(discord_id)
+        self._entries[discord_id] = (time.monotonic() + self.ttl, size, portfolio)
+        self._size += size
+
+        while self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def invalidate(self, discord_id: int) -> None:
+        """Удаляет снимок и отменяет все начатые загрузки этого ключа"""
+        self._drop(discord_id)
+        self._loads.pop(discord_id, None)
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._loads.clear()
+        self._size = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+    def _drop(self, discord_id: int) -> None:
+        entry = self._entries.pop(discord_id, None)
+        if entry is not None:
+            self._size -= entry[1]
@@ -1,182 +1,878 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import select, update, delete, func, case, text, tuple_, or_, and_, Select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, AsyncEngine
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.exc import IntegrityError
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Tuple, Dict, Any, AsyncIterator, Awaitable, Callable
+from datetime import datetime, timedelta
+from contextlib import aclosing
+import asyncio
 import logging
+import os
+import re
 
-from .models import User, Project, Media, Link, register_models
+from bot.misc import BotConfig
+from .models import (
+    User, Project, Category, Media, MediaVariant, MediaJob, Link, register_models,
+    PROJECTS_FTS_TABLE, PROJECTS_FTS_WEIGHTS
+)
+from .schemas import ProjectCreateStatus, ProjectCreateResult, Portfolio, SearchPage
+from .cache import PortfolioCache, MISS
 
 logger = logging.getLogger(__name__)
 
 
 class Database:
-    def __init__(self, db_url: str = "sqlite:///portfolio.db"):
-        self.engine = create_engine(db_url, echo=False)
-        self.SessionLocal = sessionmaker(bind=self.engine)
-        
-        register_models()
+    """Сервис базы данных, общий для всего процесса.
+
+    Создается один раз в `start_bot` и передается во все коги.
+    """
+
+    def __init__(self, engine: AsyncEngine, cache: Optional[PortfolioCache] = None):
+        self.engine = engine
+        # Кэш снимков портфолио; каждая запись ниже инвалидирует ключ пользователя
+        self.cache = cache
+        # expire_on_commit=False: объекты остаются доступными после закрытия сессии,
+        # иначе обращение к атрибутам вызовет ленивую загрузку вне event loop
+        self.SessionLocal = async_sessionmaker(bind=self.engine, expire_on_commit=False)
+
+    async def init_models(self) -> None:
+        """Создает таблицы (один раз при запуске бота)"""
+        await register_models(self.engine)
 
-    def get_session(self) -> Session:
+    async def dispose(self) -> None:
+        """Закрывает все соединения пула"""
+        await self.engine.dispose()
+
+    def get_session(self) -> AsyncSession:
         return self.SessionLocal()
 
-    # User methods
-    def get_user(self, discord_id: int) -> Optional[User]:
-        try:
-            with self.get_session() as session:
-                return session.query(User).filter(User.discord_id == discord_id).first()
-        except Exception as e:
-            self._handle_error(e, "получении пользователя")
+    @staticmethod
+    async def _find_user(session: AsyncSession, discord_id: int) -> Optional[User]:
+        return await session.scalar(select(User).where(User.discord_id == discord_id))
+
+    @staticmethod
+    async def _project_owner(session: AsyncSession, project_id: int) -> Optional[int]:
+        """discord_id владельца проекта"""
+        return await session.scalar(
+            select(User.discord_id).join(Project, Project.user_id == User.id).where(Project.id == project_id)
+        )
+
+    def _invalidate(self, discord_id: Optional[int]) -> None:
+        if self.cache is not None and discord_id is not None:
+            self.cache.invalidate(discord_id)
 
-    def create_user(self, discord_id: int) -> User:
+    async def _iter_keyset(self, query: Select, key, batch_size: int) -> AsyncIterator[Any]:
+        """Объекты запроса по возрастанию `key` пачками по `batch_size`
+
+        Каждая пачка читается отдельным запросом `key > последний` в своей
+        сессии, а внутри пачки строки приходят по `ITER_YIELD_PER`: память не
+        зависит от размера таблицы, а транзакция чтения длится одну пачку.
+        Связи объектов не загружаются.
+        """
+        last = None
+        while True:
+            batch_query = query if last is None else query.where(key > last)
+            count = 0
+
+            async with self.get_session() as session:
+                result = await session.stream_scalars(
+                    batch_query.order_by(key).limit(batch_size)
+                    .execution_options(yield_per=min(batch_size, BotConfig.ITER_YIELD_PER))
+                )
+                async for row in result:
+                    count += 1
+                    last = getattr(row, key.key)
+                    yield row
+
+            if count < batch_size:
+                return
+
+    # User methods
+    async def create_user(self, discord_id: int) -> User:
         try:
-            with self.get_session() as session:
+            async with self.get_session() as session:
                 user = User(discord_id=discord_id)
                 session.add(user)
-                session.commit()
-                session.refresh(user)
+                await session.commit()
+                await session.refresh(user)
+                self._invalidate(discord_id)
                 
                 return user
         except Exception as e:
             self._handle_error(e, "создании пользователя")
 
-    def update_user_bio(self, discord_id: int, bio: str) -> Optional[User]:
+    async def update_user_bio(self, discord_id: int, bio: str) -> Optional[User]:
         try:
-            with self.get_session() as session:
-                user = session.query(User).filter(User.discord_id == discord_id).first()
+            async with self.get_session() as session:
+                user = await self._find_user(session, discord_id)
                 
                 if user:
                     user.bio = bio
                     user.updated_at = datetime.utcnow()
-                    session.commit()
-                    session.refresh(user)
+                    await session.commit()
+                    await session.refresh(user)
+                    self._invalidate(discord_id)
                     
                 return user
         except Exception as e:
             self._handle_error(e, "обновлении профиля пользователя")
 
-    # Project methods
-    def create_project(self, discord_id: int, name: str, category: str, description: str) -> Optional[Project]:
+    async def get_portfolio(self, discord_id: int) -> Optional[Portfolio]:
+        """Получить портфолио пользователя (из кэша или не более чем за два запроса)"""
+        if self.cache is None:
+            return await self._load_portfolio(discord_id)
+
+        cached = self.cache.get(discord_id)
+        if cached is not MISS:
+            return cached
+
+        token = self.cache.begin_load(discord_id)
         try:
-            with self.get_session() as session:
-                user = session.query(User).filter(User.discord_id == discord_id).first()
-                
+            portfolio = await self._load_portfolio(discord_id)
+            self.cache.put(discord_id, portfolio, token)
+            return portfolio
+        finally:
+            self.cache.end_load(discord_id, token)
+
+    async def _load_portfolio(self, discord_id: int) -> Optional[Portfolio]:
+        try:
+            async with self.get_session() as session:
+                # 1) users JOIN links; 2) projects JOIN media для найденного пользователя
+                result = await session.scalars(
+                    select(User)
+                    .where(User.discord_id == discord_id)
+                    .options(
+                        joinedload(User.links),
+                        selectinload(User.projects).joinedload(Project.media).joinedload(Media.variants)
+                    )
+                )
+                user = result.unique().first()
+
                 if not user:
-                    user = self.create_user(discord_id)
+                    return None
+
+                return Portfolio(user=user, links=list(user.links), projects=list(user.projects))
+        except Exception as e:
+            self._handle_error(e, "получении портфолио пользователя")
+
+    # Project methods
+    async def create_project_checked(self, discord_id: int, name: str, category: str, description: str,
+                                     limit: int = BotConfig.MAX_PROJECTS) -> ProjectCreateResult:
+        """Создать проект в одной транзакции с проверкой лимита и уникальности названия"""
+        try:
+            async with self.get_session() as session:
+                # Upsert пользователя — первая запись в транзакции, она берет блокировку
+                # на запись SQLite, поэтому параллельные вызовы не пройдут проверку лимита вместе
+                await session.execute(
+                    sqlite_insert(User)
+                    .values(discord_id=discord_id, created_at=datetime.utcnow(), updated_at=datetime.utcnow())
+                    .on_conflict_do_nothing(index_elements=[User.discord_id])
+                )
+                user_id = await session.scalar(select(User.id).where(User.discord_id == discord_id))
+
+                normalized = Project.normalize_name(name)
+                count, duplicates = (await session.execute(
+                    select(
+                        func.count(Project.id),
+                        func.coalesce(func.sum(case((Project.name_normalized == normalized, 1), else_=0)), 0)
+                    ).where(Project.user_id == user_id)
+                )).one()
+
+                if count >= limit:
+                    await session.rollback()
+                    return ProjectCreateResult(ProjectCreateStatus.LIMIT_REACHED)
+
+                if duplicates:
+                    await session.rollback()
+                    return ProjectCreateResult(ProjectCreateStatus.DUPLICATE, remaining=limit - count)
 
                 project = Project(
-                    user_id=user.id,
+                    user_id=user_id,
                     name=name,
                     category=category,
                     description=description
                 )
-                
+
                 session.add(project)
-                session.commit()
-                session.refresh(project)
-                
-                return project
+                await session.commit()
+                self._invalidate(discord_id)
+
+                return ProjectCreateResult(ProjectCreateStatus.CREATED, project, limit - count - 1)
         except Exception as e:
             self._handle_error(e, "создании проекта")
 
-    def get_user_projects(self, discord_id: int) -> List[Project]:
+    async def count_user_projects(self, discord_id: int) -> int:
         try:
-            with self.get_session() as session:
-                user = session.query(User).filter(User.discord_id == discord_id).first()
-                
-                if not user:
-                    return []
-                
-                return session.query(Project).filter(Project.user_id == user.id).all()
+            async with self.get_session() as session:
+                return await session.scalar(
+                    select(func.count(Project.id))
+                    .join(User, Project.user_id == User.id)
+                    .where(User.discord_id == discord_id)
+                )
         except Exception as e:
-            self._handle_error(e, "получении проектов пользователя")
+            self._handle_error(e, "подсчете проектов пользователя")
 
-    def get_project_by_name(self, discord_id: int, project_name: str) -> Optional[Project]:
+    async def get_project_page(self, discord_id: int, index: int) -> Optional[Project]:
+        """Получить проект пользователя по порядковому номеру вместе с медиафайлами одним запросом"""
         try:
-            with self.get_session() as session:
-                user = session.query(User).filter(User.discord_id == discord_id).first()
-                
-                if not user:
-                    return None
-                
-                return session.query(Project).filter(
-                    Project.user_id == user.id,
-                    Project.name.ilike(project_name)
-                ).first()
+            async with self.get_session() as session:
+                result = await session.scalars(
+                    select(Project)
+                    .join(User, Project.user_id == User.id)
+                    .where(User.discord_id == discord_id)
+                    .order_by(Project.id)
+                    .offset(index)
+                    .limit(1)
+                    .options(joinedload(Project.media).joinedload(Media.variants))
+                )
+                return result.unique().first()
+        except Exception as e:
+            self._handle_error(e, "получении страницы портфолио")
+
+    async def iter_projects(self, discord_id: Optional[int] = None,
+                            batch_size: int = BotConfig.ITER_BATCH_SIZE) -> AsyncIterator[Project]:
+        """Проекты пользователя или, без `discord_id`, всей базы — потоком, без загрузки списка целиком"""
+        try:
+            query = select(Project)
+            if discord_id is not None:
+                query = query.join(User, Project.user_id == User.id).where(User.discord_id == discord_id)
+
+            # aclosing: при досрочном выходе из обхода сессия пачки закрывается сразу, а не сборщиком мусора
+            async with aclosing(self._iter_keyset(query, Project.id, batch_size)) as rows:
+                async for project in rows:
+                    yield project
+        except Exception as e:
+            self._handle_error(e, "обходе проектов")
+
+    async def get_project_by_name(self, discord_id: int, project_name: str) -> Optional[Project]:
+        try:
+            async with self.get_session() as session:
+                # Поиск по индексу (user_id, name_normalized) вместо ILIKE
+                return await session.scalar(
+                    select(Project)
+                    .join(User, Project.user_id == User.id)
+                    .where(
+                        User.discord_id == discord_id,
+                        Project.name_normalized == Project.normalize_name(project_name)
+                    )
+                )
         except Exception as e:
             self._handle_error(e, "поиске проекта по имени")
 
+    @staticmethod
+    def _fts_query(query: str) -> Optional[str]:
+        """Запрос пользователя → выражение FTS5 MATCH: все слова обязательны, последнее — как префикс
+
+        Префикс только у последнего слова: поиск по началу частого слова
+        собирает в памяти весь его список документов. Синтаксис FTS5
+        (кавычки, NEAR, OR, `-`) из запроса не используется.
+        """
+        words = re.findall(r"\w+", query)
+        if not words:
+            return None
+        return " ".join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*'])
+
+    async def search_projects(self, query: str, page: int = 0, per_page: int = BotConfig.SEARCH_PAGE_SIZE,
+                              max_results: int = BotConfig.SEARCH_MAX_RESULTS) -> SearchPage:
+        """Полнотекстовый поиск проектов по названию, категории, описанию и профилю автора (BM25)
+
+        bm25 считается для каждого совпадения, поэтому ранжируются только
+        `max_results` самых новых проектов: широкий запрос на миллионе
+        проектов иначе сортировал бы сотни тысяч строк.
+        """
+        try:
+            match = self._fts_query(query)
+            if match is None:
+                return SearchPage(projects=[], total=0, page=page, per_page=per_page)
+
+            # matches — на одно совпадение больше лимита, чтобы знать, что результаты
+            # обрезаны; ранжируется только окно из max_results самых новых
+            matches = (
+                f"WITH matches AS (SELECT rowid FROM {PROJECTS_FTS_TABLE} WHERE {PROJECTS_FTS_TABLE} MATCH :match "
+                f"ORDER BY rowid DESC LIMIT :max_results + 1), "
+                f"ranked AS (SELECT rowid FROM matches ORDER BY rowid DESC LIMIT :max_results) "
+            )
+            params = {'match': match, 'max_results': max_results}
+
+            async with self.get_session() as session:
+                weights = ", ".join(str(weight) for weight in PROJECTS_FTS_WEIGHTS)
+                rows = (await session.execute(
+                    text(
+                        matches +
+                        f"SELECT rowid, (SELECT count(*) FROM matches) AS total FROM {PROJECTS_FTS_TABLE} "
+                        f"WHERE {PROJECTS_FTS_TABLE} MATCH :match "
+                        f"AND rowid >= (SELECT coalesce(min(rowid), 0) FROM ranked) "
+                        f"ORDER BY bm25({PROJECTS_FTS_TABLE}, {weights}) LIMIT :limit OFFSET :offset"
+                    ),
+                    {**params, 'limit': per_page, 'offset': page * per_page}
+                )).all()
+
+                if rows:
+                    found = rows[0].total
+                elif page:
+                    found = await session.scalar(text(matches + "SELECT count(*) FROM matches"), params)
+                else:
+                    found = 0
+
+                total = min(found, max_results)
+                if not rows or page * per_page >= total:
+                    return SearchPage(projects=[], total=total, page=page, per_page=per_page,
+                                      truncated=found > max_results)
+
+                ids = [row.rowid for row in rows]
+                result = await session.scalars(
+                    select(Project).options(joinedload(Project.user)).where(Project.id.in_(ids))
+                )
+                by_id = {project.id: project for project in result.unique().all()}
+
+                return SearchPage(
+                    projects=[by_id[project_id] for project_id in ids if project_id in by_id],
+                    total=total,
+                    page=page,
+                    per_page=per_page,
+                    truncated=found > max_results
+                )
+        except Exception as e:
+            self._handle_error(e, "поиске проектов")
+
+    # Category methods
+    async def get_categories(self, limit: int = BotConfig.CATEGORY_LIST_SIZE) -> List[Category]:
+        """Самые крупные категории по числу проектов"""
+        try:
+            async with self.get_session() as session:
+                result = await session.scalars(
+                    select(Category)
+                    .where(Category.project_count > 0)
+                    .order_by(Category.project_count.desc(), Category.norm)
+                    .limit(limit)
+                )
+                return result.all()
+        except Exception as e:
+            self._handle_error(e, "получении списка категорий")
+
+    async def get_category(self, category: str) -> Optional[Category]:
+        try:
+            async with self.get_session() as session:
+                return await session.get(Category, Project.normalize_category(category))
+        except Exception as e:
+            self._handle_error(e, "получении категории")
+
+    async def suggest_categories(self, query: str, limit: int = BotConfig.CATEGORY_SUGGESTIONS) -> List[Category]:
+        """Подсказки для /browse: категории, начинающиеся с запроса, а если таких нет — содержащие его"""
+        try:
+            norm = Project.normalize_category(query)
+            if not norm:
+                return []
+
+            async with self.get_session() as session:
+                # Диапазон по первичному ключу вместо LIKE, чтобы работал индекс
+                result = await session.scalars(
+                    select(Category)
+                    .where(Category.norm >= norm, Category.norm < norm + "\U0010ffff", Category.project_count > 0)
+                    .order_by(Category.project_count.desc(), Category.norm)
+                    .limit(limit)
+                )
+                categories = result.all()
+                if categories:
+                    return categories
+
+                result = await session.scalars(
+                    select(Category)
+                    .where(Category.norm.contains(norm, autoescape=True), Category.project_count > 0)
+                    .order_by(Category.project_count.desc(), Category.norm)
+                    .limit(limit)
+                )
+                return result.all()
+        except Exception as e:
+            self._handle_error(e, "подборе категорий")
+
+    async def browse_category(self, category_norm: str, after: Optional[Tuple[datetime, int]] = None,
+                              limit: int = BotConfig.BROWSE_PAGE_SIZE) -> List[Project]:
+        """Страница проектов категории, новые первыми
+
+        Args:
+            after: (created_at, id) последнего проекта предыдущей страницы. Поиск
+                по ключу в индексе вместо OFFSET: дальние страницы не дороже первой.
+        """
+        try:
+            async with self.get_session() as session:
+                query = (
+                    select(Project)
+                    .options(joinedload(Project.user))
+                    .where(Project.category_norm == category_norm)
+                )
+                if after is not None:
+                    query = query.where(tuple_(Project.created_at, Project.id) < tuple_(*after))
+
+                result = await session.scalars(
+                    query.order_by(Project.created_at.desc(), Project.id.desc()).limit(limit)
+                )
+                return result.unique().all()
+        except Exception as e:
+            self._handle_error(e, "просмотре категории")
+
     # Media methods
-    def add_media(self, project_id: int, url: str, media_type: str) -> Optional[Media]:
+    async def add_media_variants(self, media_id: int, variants: List[Tuple[str, str, int, int, int]]) -> None:
+        """Добавить сжатые варианты медиафайла
+
+        Args:
+            variants: Записи (вид, путь, ширина, высота, размер в байтах)
+        """
         try:
-            with self.get_session() as session:
-                media = Media(
-                    project_id=project_id,
-                    url=url,
-                    type=media_type
+            async with self.get_session() as session:
+                session.add_all(
+                    MediaVariant(media_id=media_id, kind=kind, url=url, width=width, height=height, size=size)
+                    for kind, url, width, height, size in variants
                 )
-                
-                session.add(media)
-                session.commit()
-                session.refresh(media)
-                
-                return media
+                media = await session.get(Media, media_id)
+                owner_id = await self._project_owner(session, media.project_id) if media else None
+                await session.commit()
+                self._invalidate(owner_id)
         except Exception as e:
-            self._handle_error(e, "добавлении медиафайла")
+            self._handle_error(e, "добавлении вариантов медиафайла")
 
-    def get_project_media(self, project_id: int) -> List[Media]:
+    async def get_project_media(self, project_id: int) -> List[Media]:
         try:
-            with self.get_session() as session:
-                return session.query(Media).filter(Media.project_id == project_id).all()
+            async with self.get_session() as session:
+                result = await session.scalars(select(Media).where(Media.project_id == project_id))
+                return list(result.all())
         except Exception as e:
             self._handle_error(e, "получении медиафайлов проекта")
 
-    # Link methods
-    def add_link(self, discord_id: int, url: str, title: Optional[str] = None) -> Optional[Link]:
+    async def iter_media(self, project_id: Optional[int] = None,
+                         batch_size: int = BotConfig.ITER_BATCH_SIZE) -> AsyncIterator[Media]:
+        """Медиафайлы проекта или, без `project_id`, всей базы — потоком"""
         try:
-            with self.get_session() as session:
-                user = session.query(User).filter(User.discord_id == discord_id).first()
-                
-                if not user:
-                    user = self.create_user(discord_id)
+            query = select(Media)
+            if project_id is not None:
+                query = query.where(Media.project_id == project_id)
+
+            async with aclosing(self._iter_keyset(query, Media.id, batch_size)) as rows:
+                async for media in rows:
+                    yield media
+        except Exception as e:
+            self._handle_error(e, "обходе медиафайлов")
+
+    async def remove_media_batch(self, media_ids: List[int],
+                                 project_id: Optional[int] = None) -> Tuple[int, List[str]]:
+        """Удалить несколько медиафайлов одной транзакцией
+
+        Args:
+            media_ids: ID удаляемых записей
+            project_id: Если указан, удаляются только записи этого проекта
+
+        Returns:
+            Tuple[int, List[str]]: Число удаленных записей и пути к файлам (и их вариантам),
+                на которые больше не ссылается ни одна запись
+        """
+        try:
+            async with self.get_session() as session:
+                query = select(Media).where(Media.id.in_(media_ids)).options(selectinload(Media.variants))
+                if project_id is not None:
+                    query = query.where(Media.project_id == project_id)
+
+                removed = list((await session.scalars(query)).all())
+                if not removed:
+                    return 0, []
+
+                owners = {
+                    await self._project_owner(session, project)
+                    for project in {media.project_id for media in removed}
+                }
+
+                for media in removed:
+                    await session.delete(media)
+                await session.flush()
+
+                # Счетчик ссылок на файл — число оставшихся записей с тем же содержимым;
+                # старые записи без хэша сравниваются по пути
+                hashes = {media.sha256 for media in removed if media.sha256}
+                paths = {media.url for media in removed if not media.sha256}
+                referenced_hashes = set((await session.scalars(
+                    select(Media.sha256).where(Media.sha256.in_(hashes)).distinct()
+                )).all()) if hashes else set()
+                referenced_paths = set((await session.scalars(
+                    select(Media.url).where(Media.url.in_(paths)).distinct()
+                )).all()) if paths else set()
+
+                await session.commit()
+                for owner_id in owners:
+                    self._invalidate(owner_id)
+
+                orphaned = {}
+                for media in removed:
+                    if media.sha256 in referenced_hashes or media.url in referenced_paths:
+                        continue
+                    for path in [media.url] + [variant.url for variant in media.variants]:
+                        orphaned[path] = None
+
+                return len(removed), list(orphaned)
+        except Exception as e:
+            self._handle_error(e, "удалении медиафайлов")
+
+    @staticmethod
+    async def _lock_for_write(session: AsyncSession) -> None:
+        """Берет блокировку на запись SQLite в начале транзакции: запись без изменений"""
+        await session.execute(update(Media).where(Media.id.is_(None)).values(url=Media.url))
+
+    async def remove_unreferenced_files(self, paths: List[str],
+                                        remove_files: Callable[[List[str]], Awaitable[None]]) -> List[str]:
+        """Удалить файлы, на которые по-прежнему не ссылается ни одна запись
+
+        Пути из `remove_media_batch` перепроверяются и удаляются под блокировкой
+        на запись: параллельная загрузка того же содержимого либо уже сохранила
+        запись (и файл остается), либо проверит файл в `complete_media_job`
+        после удаления и скачает его заново.
+
+        Returns:
+            Удаленные пути
+        """
+        if not paths:
+            return []
+
+        try:
+            async with self.get_session() as session:
+                await self._lock_for_write(session)
+
+                referenced = set((await session.scalars(select(Media.url).where(Media.url.in_(paths)))).all())
+                referenced |= set((await session.scalars(
+                    select(MediaVariant.url).where(MediaVariant.url.in_(paths))
+                )).all())
+
+                unreferenced = [path for path in paths if path not in referenced]
+                await remove_files(unreferenced)
+                await session.commit()
+
+                return unreferenced
+        except Exception as e:
+            self._handle_error(e, "удалении файлов медиафайлов")
+
+    async def set_media_cdn_urls(self, items: List[Tuple[int, str, Optional[datetime]]]) -> None:
+        """Сохранить ссылки на загруженные в Discord вложения одной транзакцией
+
+        Args:
+            items: Записи (id медиафайла, ссылка CDN, срок действия)
+        """
+        try:
+            async with self.get_session() as session:
+                result = await session.scalars(select(Media).where(Media.id.in_([item[0] for item in items])))
+                media_by_id = {media.id: media for media in result.all()}
+
+                for media_id, cdn_url, expires_at in items:
+                    media = media_by_id.get(media_id)
+                    if media:
+                        media.cdn_url = cdn_url
+                        media.cdn_expires_at = expires_at
 
-                link = Link(
-                    user_id=user.id,
-                    url=url,
-                    title=title
+                owners = {
+                    await self._project_owner(session, project_id)
+                    for project_id in {media.project_id for media in media_by_id.values()}
+                }
+                await session.commit()
+
+                for owner_id in owners:
+                    self._invalidate(owner_id)
+        except Exception as e:
+            self._handle_error(e, "сохранении ссылки на медиафайл")
+
+    async def get_unhashed_media(self) -> List[Media]:
+        """Медиафайлы, сохраненные до появления контентно-адресуемого хранилища"""
+        try:
+            async with self.get_session() as session:
+                result = await session.scalars(select(Media).where(Media.sha256.is_(None)))
+                return list(result.all())
+        except Exception as e:
+            self._handle_error(e, "получении медиафайлов без хэша")
+
+    async def set_media_blob(self, old_url: str, url: str, sha256: str) -> None:
+        """Привязать к файлу хранилища все записи без хэша, ссылающиеся на `old_url`"""
+        try:
+            async with self.get_session() as session:
+                rows = (await session.execute(
+                    select(Media.id, Media.project_id).where(Media.url == old_url, Media.sha256.is_(None))
+                )).all()
+                if not rows:
+                    return
+
+                await session.execute(
+                    update(Media).where(Media.id.in_([row.id for row in rows])).values(url=url, sha256=sha256)
                 )
-                session.add(link)
-                session.commit()
-                session.refresh(link)
-                
-                return link
+                owners = {
+                    await self._project_owner(session, project_id)
+                    for project_id in {row.project_id for row in rows}
+                }
+                await session.commit()
+                for owner_id in owners:
+                    self._invalidate(owner_id)
         except Exception as e:
-            self._handle_error(e, "добавлении ссылки")
+            self._handle_error(e, "обновлении медиафайла")
 
-    def get_user_links(self, discord_id: int) -> List[Link]:
+    async def get_suffixed_blobs(self) -> List[Tuple[str, str]]:
+        """Пути (и хэши) файлов хранилища, сохраненных с расширением в имени"""
         try:
-            with self.get_session() as session:
-                user = session.query(User).filter(User.discord_id == discord_id).first()
-                
-                if not user:
+            async with self.get_session() as session:
+                result = await session.execute(
+                    select(Media.url, Media.sha256).where(
+                        Media.sha256.is_not(None),
+                        Media.file_ext != '',
+                        Media.url.endswith(Media.file_ext)
+                    ).distinct()
+                )
+                return [tuple(row) for row in result]
+        except Exception as e:
+            self._handle_error(e, "получении файлов хранилища с расширением")
+
+    async def move_media_blob(self, old_url: str, url: str, sha256: str) -> None:
+        """Перевести все записи, ссылающиеся на `old_url`, на новый путь того же файла"""
+        try:
+            async with self.get_session() as session:
+                # Поиск по индексу sha256: колонка url не индексирована
+                condition = (Media.sha256 == sha256) & (Media.url == old_url)
+                # Популярный файл встречается в тысячах проектов: владельцы выбираются одним запросом
+                owners = set((await session.scalars(
+                    select(User.discord_id)
+                    .join(Project, Project.user_id == User.id)
+                    .join(Media, Media.project_id == Project.id)
+                    .where(condition)
+                    .distinct()
+                )).all())
+                if not owners:
+                    return
+
+                await session.execute(update(Media).where(condition).values(url=url))
+                await session.commit()
+                for owner_id in owners:
+                    self._invalidate(owner_id)
+        except Exception as e:
+            self._handle_error(e, "переносе файла хранилища")
+
+    # Media job methods
+    async def enqueue_media_job(self, project_id: int, project_name: str, channel_id: int, message_id: int,
+                                attachments: List[Dict[str, Any]]) -> MediaJob:
+        """Поставить загрузку вложений в очередь"""
+        try:
+            async with self.get_session() as session:
+                job = MediaJob(
+                    project_id=project_id,
+                    project_name=project_name,
+                    channel_id=channel_id,
+                    message_id=message_id,
+                    attachments=attachments,
+                    status='pending'
+                )
+                session.add(job)
+                await session.commit()
+
+                return job
+        except Exception as e:
+            self._handle_error(e, "постановке задачи загрузки в очередь")
+
+    async def claim_media_job(self, lease: float) -> Optional[MediaJob]:
+        """Забрать самую старую ожидающую задачу или задачу с истекшей арендой
+
+        Выполняемая задача, чей `updated_at` старше `lease` секунд, осталась от
+        упавшего процесса: обработчик обновляет отметку, пока работает
+        (`touch_media_job`). Задачу забирает тот, чей UPDATE изменил `attempts`,
+        поэтому одну задачу не возьмут два обработчика, в том числе из разных
+        процессов кластера. Новое значение `attempts` — токен владельца задачи.
+        """
+        try:
+            async with self.get_session() as session:
+                while True:
+                    expired = datetime.utcnow() - timedelta(seconds=lease)
+                    claimable = or_(
+                        MediaJob.status == 'pending',
+                        and_(MediaJob.status == 'running', MediaJob.updated_at < expired)
+                    )
+                    row = (await session.execute(
+                        select(MediaJob.id, MediaJob.attempts).where(claimable).order_by(MediaJob.id).limit(1)
+                    )).first()
+                    if row is None:
+                        return None
+
+                    result = await session.execute(
+                        update(MediaJob)
+                        .where(MediaJob.id == row.id, MediaJob.attempts == row.attempts, claimable)
+                        .values(status='running', attempts=MediaJob.attempts + 1, updated_at=datetime.utcnow())
+                    )
+                    await session.commit()
+
+                    if result.rowcount:
+                        return await session.get(MediaJob, row.id)
+        except Exception as e:
+            self._handle_error(e, "получении задачи загрузки")
+
+    async def touch_media_job(self, job_id: int, attempts: int) -> bool:
+        """Продлить аренду задачи
+
+        Returns:
+            False, если задачу уже забрал другой обработчик
+        """
+        try:
+            async with self.get_session() as session:
+                result = await session.execute(
+                    update(MediaJob)
+                    .where(MediaJob.id == job_id, MediaJob.status == 'running', MediaJob.attempts == attempts)
+                    .values(updated_at=datetime.utcnow())
+                )
+                await session.commit()
+                return bool(result.rowcount)
+        except Exception as e:
+            self._handle_error(e, "продлении задачи загрузки")
+
+    async def complete_media_job(self, job_id: int, attempts: int, project_id: int,
+                                 items: List[Tuple[str, str, Optional[str], str]],
+                                 result: Dict[str, Any]) -> Optional[List[Media]]:
+        """Сохранить медиафайлы задачи и завершить ее одной транзакцией
+
+        Args:
+            attempts: Токен владельца из `claim_media_job`
+            items: Записи (url, тип, sha256, расширение исходного файла)
+
+        Returns:
+            Добавленные записи или None, если задача уже не выполняется этим
+            обработчиком (повторная обработка не создает дубликатов)
+        """
+        try:
+            async with self.get_session() as session:
+                finished = await session.execute(
+                    update(MediaJob)
+                    .where(MediaJob.id == job_id, MediaJob.status == 'running', MediaJob.attempts == attempts)
+                    .values(status='done', result=result, updated_at=datetime.utcnow())
+                )
+                if not finished.rowcount:
+                    await session.rollback()
+                    return None
+
+                # Файл мог быть удален вместе с последней записью, ссылавшейся на то же
+                # содержимое, пока шла загрузка; под блокировкой на запись это уже видно
+                missing = await asyncio.to_thread(lambda: [url for url, *_ in items if not os.path.exists(url)])
+                if missing:
+                    await session.rollback()
+                    raise FileNotFoundError(f"Файл хранилища удален во время загрузки: {', '.join(missing)}")
+
+                media = [
+                    Media(project_id=project_id, url=url, type=media_type, sha256=sha256, file_ext=file_ext)
+                    for url, media_type, sha256, file_ext in items
+                ]
+                session.add_all(media)
+                owner_id = await self._project_owner(session, project_id)
+                await session.commit()
+                self._invalidate(owner_id)
+
+                return media
+        except Exception as e:
+            self._handle_error(e, "завершении задачи загрузки")
+
+    async def claim_unacked_media_jobs(self, lease: float, limit: int = 50) -> List[MediaJob]:
+        """Забрать завершенные задачи, итог которых так и не доставлен пользователю
+
+        Задача в статусе done или failed ждет правки сообщения-подтверждения:
+        правка не удалась или процесс упал до нее. Подтверждение передается
+        тому, чей UPDATE обновил `updated_at`, и повторяется не раньше, чем
+        через `lease` секунд.
+        """
+        try:
+            async with self.get_session() as session:
+                expired = datetime.utcnow() - timedelta(seconds=lease)
+                unacked = and_(MediaJob.status.in_(('done', 'failed')), MediaJob.updated_at < expired)
+                ids = (await session.scalars(
+                    select(MediaJob.id).where(unacked).order_by(MediaJob.id).limit(limit)
+                )).all()
+
+                claimed = []
+                for job_id in ids:
+                    result = await session.execute(
+                        update(MediaJob).where(MediaJob.id == job_id, unacked).values(updated_at=datetime.utcnow())
+                    )
+                    if result.rowcount:
+                        claimed.append(job_id)
+                await session.commit()
+
+                if not claimed:
                     return []
-                
-                return session.query(Link).filter(Link.user_id == user.id).all()
+                return list((await session.scalars(select(MediaJob).where(MediaJob.id.in_(claimed)))).all())
+        except Exception as e:
+            self._handle_error(e, "получении неподтвержденных задач загрузки")
+
+    async def ack_media_job(self, job_id: int) -> None:
+        """Отметить, что итог задачи доставлен пользователю"""
+        try:
+            async with self.get_session() as session:
+                await session.execute(
+                    update(MediaJob)
+                    .where(MediaJob.id == job_id, MediaJob.status.in_(('done', 'failed')))
+                    .values(status='acked', updated_at=datetime.utcnow())
+                )
+                await session.commit()
+        except Exception as e:
+            self._handle_error(e, "подтверждении задачи загрузки")
+
+    async def retry_media_job(self, job_id: int, attempts: int, max_attempts: int) -> Optional[str]:
+        """Вернуть задачу в очередь после сбоя или пометить ее проваленной
+
+        Returns:
+            Новый статус задачи или None, если ее уже забрал другой обработчик
+        """
+        try:
+            async with self.get_session() as session:
+                job = await session.get(MediaJob, job_id)
+                if job is None:
+                    return 'failed'
+
+                if job.status != 'running' or job.attempts != attempts:
+                    return None
+
+                job.status = 'pending' if job.attempts < max_attempts else 'failed'
+                await session.commit()
+
+                return job.status
+        except Exception as e:
+            self._handle_error(e, "повторе задачи загрузки")
+
+    async def reset_running_media_jobs(self) -> int:
+        """Вернуть в очередь задачи, прерванные остановкой бота
+
+        Вызывается при запуске, до старта обработчиков.
+        """
+        try:
+            async with self.get_session() as session:
+                result = await session.execute(
+                    update(MediaJob).where(MediaJob.status == 'running').values(status='pending')
+                )
+                await session.commit()
+                return result.rowcount
+        except Exception as e:
+            self._handle_error(e, "восстановлении задач загрузки")
+
+    # Link methods
+    async def iter_links(self, discord_id: Optional[int] = None,
+                         batch_size: int = BotConfig.ITER_BATCH_SIZE) -> AsyncIterator[Link]:
+        """Ссылки пользователя или, без `discord_id`, всей базы — потоком"""
+        try:
+            query = select(Link)
+            if discord_id is not None:
+                query = query.join(User, Link.user_id == User.id).where(User.discord_id == discord_id)
+
+            async with aclosing(self._iter_keyset(query, Link.id, batch_size)) as rows:
+                async for link in rows:
+                    yield link
         except Exception as e:
-            self._handle_error(e, "получении ссылок пользователя")
+            self._handle_error(e, "обходе ссылок")
 
-    def set_links(self, discord_id: int, links: list[tuple[str, str]]) -> list[Link]:
+    async def set_links(self, discord_id: int, links: list[tuple[str, str]]) -> list[Link]:
         """Установить новые ссылки для пользователя (заменяет все существующие)"""
         try:
-            with self.get_session() as session:
+            async with self.get_session() as session:
                 # Получаем или создаем пользователя
-                user = session.query(User).filter(User.discord_id == discord_id).first()
+                user = await self._find_user(session, discord_id)
                 
                 if not user:
-                    user = self.create_user(discord_id)
+                    user = await self.create_user(discord_id)
                 
                 # Удаляем все существующие ссылки
-                session.query(Link).filter(Link.user_id == user.id).delete()
+                await session.execute(delete(Link).where(Link.user_id == user.id))
                 
                 # Добавляем новые ссылки
                 new_links = []
@@ -186,7 +882,8 @@ class Database:
                     session.add(link)
                     new_links.append(link)
                 
-                session.commit()
+                await session.commit()
+                self._invalidate(discord_id)
                 return new_links
         except Exception as e:
             self._handle_error(e, "установке ссылок пользователя")
@@ -198,4 +895,4 @@ class Database:
             logger.error(f"Ошибка целостности данных при {operation}: {str(e)}")
         else:
             logger.error(f"Ошибка базы данных при {operation}: {str(e)}")
-        raise e
\ No newline at end of file
+        raise e
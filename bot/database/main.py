@@ -1 +1,33 @@
-# todo: Database engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine
+
+from bot.misc import Env
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """Настраивает каждое новое SQLite-соединение пула"""
+    cursor = dbapi_connection.cursor()
+    # WAL: читатели не блокируются писателем
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={Env.DB_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size={Env.DB_CACHE_SIZE}")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+def create_db_engine(db_url: str = Env.DB_URL,
+                     pool_size: int = Env.DB_POOL_SIZE,
+                     max_overflow: int = Env.DB_MAX_OVERFLOW) -> AsyncEngine:
+    """Создает единственный на процесс движок базы данных с пулом соединений"""
+    engine = create_async_engine(
+        db_url,
+        echo=False,
+        pool_size=pool_size,
+        max_overflow=max_overflow
+    )
+
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+
+    return engine
@@ -1,7 +1,16 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, create_engine
+from sqlalchemy import (
+    Column, Integer, String, DateTime, ForeignKey, Text, JSON, Index, inspect, text, select, update, bindparam
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
+import logging
+import os
+
+logger = logging.getLogger(__name__)
 
 Base = declarative_base()
 
@@ -27,9 +36,13 @@ class Project(Base):
     __tablename__ = 'projects'
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     name = Column(String(255), nullable=False)
+    # Название в casefold для индексируемого регистронезависимого поиска
+    name_normalized = Column(String(255), nullable=False)
     category = Column(String(100), nullable=False)
+    # Категория без учета регистра и лишних пробелов для /browse
+    category_norm = Column(String(100), nullable=False)
     description = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -38,31 +51,125 @@ class Project(Base):
     user = relationship("User", back_populates="projects")
     media = relationship("Media", back_populates="project", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index('ix_projects_user_id_name_normalized', 'user_id', 'name_normalized', unique=True),
+        # Постраничный просмотр категории по ключу (created_at, id), новые первыми
+        Index('ix_projects_category_browse', 'category_norm', 'created_at', 'id'),
+    )
+
+    @staticmethod
+    def normalize_name(name: str) -> str:
+        """Приводит название проекта к виду для сравнения без учета регистра"""
+        return name.casefold()
+
+    @staticmethod
+    def normalize_category(category: str) -> str:
+        """Приводит категорию к виду для сравнения: без регистра и повторных пробелов"""
+        return " ".join(category.split()).casefold()
+
+    @validates('name')
+    def _sync_name_normalized(self, key, name):
+        self.name_normalized = self.normalize_name(name)
+        return name
+
+    @validates('category')
+    def _sync_category_norm(self, key, category):
+        self.category_norm = self.normalize_category(category)
+        return category
+
     def __repr__(self):
         return f"<Project(name={self.name}, category={self.category})>"
 
 
+class Category(Base):
+    """Категория с числом проектов; строки ведут триггеры на projects"""
+    __tablename__ = 'categories'
+
+    norm = Column(String(100), primary_key=True)
+    # Написание из первого проекта категории
+    name = Column(String(100), nullable=False)
+    project_count = Column(Integer, nullable=False, default=0, index=True)
+
+    def __repr__(self):
+        return f"<Category(name={self.name}, project_count={self.project_count})>"
+
+
 class Media(Base):
     __tablename__ = 'media'
 
     id = Column(Integer, primary_key=True)
-    project_id = Column(Integer, ForeignKey('projects.id', ondelete='CASCADE'), nullable=False)
+    project_id = Column(Integer, ForeignKey('projects.id', ondelete='CASCADE'), nullable=False, index=True)
     url = Column(String(2048), nullable=False)
     type = Column(String(20), nullable=False)  # 'image', 'video', 'link'
+    # SHA-256 содержимого: один файл хранилища может принадлежать нескольким записям
+    sha256 = Column(String(64), nullable=True, index=True)
+    # Расширение исходного файла: путь в хранилище определяется только хэшем
+    file_ext = Column(String(16), nullable=True)
+    # Ссылка на вложение в CDN Discord после первой загрузки и срок ее действия
+    cdn_url = Column(String(2048), nullable=True)
+    cdn_expires_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Отношения
     project = relationship("Project", back_populates="media")
+    variants = relationship("MediaVariant", back_populates="media", cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"<Media(type={self.type}, url={self.url})>"
 
 
+class MediaVariant(Base):
+    __tablename__ = 'media_variants'
+
+    id = Column(Integer, primary_key=True)
+    media_id = Column(Integer, ForeignKey('media.id', ondelete='CASCADE'), nullable=False, index=True)
+    kind = Column(String(20), nullable=False)  # 'preview'
+    url = Column(String(2048), nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    # Отношения
+    media = relationship("Media", back_populates="variants")
+
+    def __repr__(self):
+        return f"<MediaVariant(kind={self.kind}, url={self.url})>"
+
+
+class MediaJob(Base):
+    __tablename__ = 'media_jobs'
+
+    id = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey('projects.id', ondelete='CASCADE'), nullable=False, index=True)
+    # Название проекта, как его указал пользователь, для итогового сообщения
+    project_name = Column(String(255), nullable=False)
+    # Сообщение-подтверждение, которое заменяется результатом
+    channel_id = Column(Integer, nullable=False)
+    message_id = Column(Integer, nullable=False)
+    # Вложения: [{"url", "filename", "content_type", "size"}]
+    attachments = Column(JSON, nullable=False)
+    # 'pending', 'running', 'done', 'failed', 'acked'; done и failed ждут правки подтверждения
+    status = Column(String(20), nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    # Итог: {"added": [...], "errors": [...]}; по нему подтверждение доставляется повторно
+    result = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_media_jobs_status_id', 'status', 'id'),
+    )
+
+    def __repr__(self):
+        return f"<MediaJob(id={self.id}, status={self.status})>"
+
+
 class Link(Base):
     __tablename__ = 'links'
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
     url = Column(String(2048), nullable=False)
     title = Column(String(255), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -74,9 +181,168 @@ class Link(Base):
         return f"<Link(url={self.url}, title={self.title})>"
 
 
-def register_models(engine=None):
+def _backfill_project_names(conn: Connection) -> None:
+    """Заполняет name_normalized для проектов, созданных до появления колонки"""
+    rows = conn.execute(select(Project.id, Project.name)).all()
+    if rows:
+        conn.execute(
+            update(Project.__table__)
+            .where(Project.__table__.c.id == bindparam('project_id'))
+            .values(name_normalized=bindparam('normalized')),
+            [{'project_id': row.id, 'normalized': Project.normalize_name(row.name)} for row in rows]
+        )
+
+
+def _backfill_project_categories(conn: Connection) -> None:
+    """Заполняет category_norm для проектов, созданных до появления колонки"""
+    rows = conn.execute(select(Project.id, Project.category)).all()
+    if rows:
+        conn.execute(
+            update(Project.__table__)
+            .where(Project.__table__.c.id == bindparam('project_id'))
+            .values(category_norm=bindparam('normalized')),
+            [{'project_id': row.id, 'normalized': Project.normalize_category(row.category)} for row in rows]
+        )
+
+
+def _backfill_media_extensions(conn: Connection) -> None:
+    """Заполняет file_ext из путей, сохраненных вместе с расширением"""
+    rows = conn.execute(select(Media.id, Media.url)).all()
+    if rows:
+        conn.execute(
+            update(Media.__table__)
+            .where(Media.__table__.c.id == bindparam('media_id'))
+            .values(file_ext=bindparam('file_ext')),
+            [{'media_id': row.id, 'file_ext': os.path.splitext(row.url)[1]} for row in rows]
+        )
+
+
+# Заполнение колонок, добавленных в уже существующие таблицы
+_BACKFILLS = {
+    'projects.name_normalized': _backfill_project_names,
+    'projects.category_norm': _backfill_project_categories,
+    'media.file_ext': _backfill_media_extensions,
+}
+
+
+def _migrate(conn: Connection) -> None:
+    """Приводит существующую базу к текущим моделям: новые колонки и индексы"""
+    inspector = inspect(conn)
+
+    for table in Base.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+
+        for column in table.columns:
+            if column.name in existing:
+                continue
+
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            logger.info(f"Добавлена колонка {table.name}.{column.name}")
+
+            backfill = _BACKFILLS.get(f'{table.name}.{column.name}')
+            if backfill:
+                backfill(conn)
+
+        for index in table.indexes:
+            try:
+                index.create(conn, checkfirst=True)
+            except IntegrityError as e:
+                logger.error(f"Не удалось создать индекс {index.name}: {str(e)}")
+
+
+# Полнотекстовый индекс проектов (SQLite FTS5): rowid совпадает с projects.id,
+# bio дублируется из владельца. Таблица и триггеры создаются DDL, а не моделью.
+# Префиксные индексы ускоряют поиск по началу слова длиной до 4 символов.
+PROJECTS_FTS_TABLE = 'projects_fts'
+# Веса колонок для bm25: name, category, description, bio
+PROJECTS_FTS_WEIGHTS = (10.0, 5.0, 1.0, 0.5)
+
+_PROJECTS_FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {PROJECTS_FTS_TABLE}
+        USING fts5(name, category, description, bio, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')""",
+    f"""CREATE TRIGGER IF NOT EXISTS projects_fts_insert AFTER INSERT ON projects BEGIN
+        INSERT INTO {PROJECTS_FTS_TABLE}(rowid, name, category, description, bio)
+        VALUES (new.id, new.name, new.category, new.description, (SELECT bio FROM users WHERE id = new.user_id));
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS projects_fts_update AFTER UPDATE OF name, category, description, user_id
+        ON projects BEGIN
+        DELETE FROM {PROJECTS_FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {PROJECTS_FTS_TABLE}(rowid, name, category, description, bio)
+        VALUES (new.id, new.name, new.category, new.description, (SELECT bio FROM users WHERE id = new.user_id));
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS projects_fts_delete AFTER DELETE ON projects BEGIN
+        DELETE FROM {PROJECTS_FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_fts_bio AFTER UPDATE OF bio ON users BEGIN
+        UPDATE {PROJECTS_FTS_TABLE} SET bio = new.bio
+        WHERE rowid IN (SELECT id FROM projects WHERE user_id = new.id);
+    END""",
+]
+
+
+def _create_search_index(conn: Connection) -> None:
+    """Создает FTS5-индекс проектов и заполняет его, если таблица новая"""
+    if conn.dialect.name != 'sqlite':
+        return
+
+    exists = inspect(conn).has_table(PROJECTS_FTS_TABLE)
+    for ddl in _PROJECTS_FTS_DDL:
+        conn.execute(text(ddl))
+
+    if not exists:
+        conn.execute(text(
+            f"""INSERT INTO {PROJECTS_FTS_TABLE}(rowid, name, category, description, bio)
+                SELECT projects.id, projects.name, projects.category, projects.description, users.bio
+                FROM projects JOIN users ON users.id = projects.user_id"""
+        ))
+        logger.info(f"Создан полнотекстовый индекс {PROJECTS_FTS_TABLE}")
+
+
+# Счетчики категорий: триггеры на projects ведут таблицу categories, поэтому
+# список категорий с числом проектов не требует GROUP BY по всем проектам
+_CATEGORY_COUNTS_DDL = [
+    """CREATE TRIGGER IF NOT EXISTS categories_project_insert AFTER INSERT ON projects BEGIN
+        INSERT INTO categories(norm, name, project_count) VALUES (new.category_norm, new.category, 1)
+        ON CONFLICT(norm) DO UPDATE SET project_count = project_count + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS categories_project_update AFTER UPDATE OF category_norm ON projects
+        WHEN old.category_norm IS NOT new.category_norm BEGIN
+        UPDATE categories SET project_count = project_count - 1 WHERE norm = old.category_norm;
+        DELETE FROM categories WHERE norm = old.category_norm AND project_count <= 0;
+        INSERT INTO categories(norm, name, project_count) VALUES (new.category_norm, new.category, 1)
+        ON CONFLICT(norm) DO UPDATE SET project_count = project_count + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS categories_project_delete AFTER DELETE ON projects BEGIN
+        UPDATE categories SET project_count = project_count - 1 WHERE norm = old.category_norm;
+        DELETE FROM categories WHERE norm = old.category_norm AND project_count <= 0;
+    END""",
+]
+
+
+def _create_category_counts(conn: Connection) -> None:
+    """Создает триггеры счетчиков категорий и пересчитывает пустую таблицу"""
+    if conn.dialect.name != 'sqlite':
+        return
+
+    for ddl in _CATEGORY_COUNTS_DDL:
+        conn.execute(text(ddl))
+
+    if conn.scalar(select(Category.norm).limit(1)) is None:
+        conn.execute(text(
+            """INSERT INTO categories(norm, name, project_count)
+               SELECT category_norm, category, project_count FROM (
+                   -- category берется из строки с min(id), то есть из первого проекта
+                   SELECT category_norm, category, min(id), count(*) AS project_count FROM projects
+                   WHERE category_norm IS NOT NULL GROUP BY category_norm
+               )"""
+        ))
+
+
+async def register_models(engine: AsyncEngine) -> None:
     """Регистрирует все модели в базе данных"""
-    if not engine:
-        engine = create_engine("sqlite:///portfolio.db", echo=False)
-        
-    Base.metadata.create_all(engine) 
\ No newline at end of file
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_migrate)
+        await conn.run_sync(_create_search_index)
+        await conn.run_sync(_create_category_counts)
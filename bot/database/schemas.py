@@ -0,0 +1,42 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import Optional, List
+
+from .models import User, Project, Link
+
+
+class ProjectCreateStatus(Enum):
+    CREATED = "created"
+    LIMIT_REACHED = "limit_reached"
+    DUPLICATE = "duplicate"
+
+
+@dataclass(frozen=True)
+class ProjectCreateResult:
+    """Результат атомарного создания проекта"""
+    status: ProjectCreateStatus
+    project: Optional[Project] = None
+    remaining: int = 0
+
+
+@dataclass(frozen=True)
+class SearchPage:
+    """Страница результатов полнотекстового поиска, лучшие совпадения первыми"""
+    projects: List[Project]
+    total: int
+    page: int
+    per_page: int
+    # Совпадений больше, чем ранжируется (BotConfig.SEARCH_MAX_RESULTS)
+    truncated: bool = False
+
+    @property
+    def pages(self) -> int:
+        return max(1, -(-self.total // self.per_page))
+
+
+@dataclass(frozen=True)
+class Portfolio:
+    """Портфолио пользователя целиком: профиль, ссылки, проекты с медиафайлами"""
+    user: User
+    links: List[Link]
+    projects: List[Project]
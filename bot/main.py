@@ -1,20 +1,163 @@
+import os
+import time
+import asyncio
+from multiprocessing.queues import Queue
+from typing import Optional, List, Dict, Any
+
 from nextcord import Intents
-from nextcord.ext.commands import Bot
+from nextcord.ext.commands import Bot, AutoShardedBot
 
 from bot.misc import Env, BotConfig
 from bot.cogs import register_all_cogs
-from bot.database.models import register_models
+from bot.database import Database, PortfolioCache, create_db_engine
+from bot.misc.media_utils import MediaUtils
+from bot.misc.rate_limit import CommandRateLimiter
+from bot.misc.send_queue import SendQueue
+from bot.misc.media_jobs import MediaJobQueue
+from bot.misc.metrics import Metrics, MetricsServer
+
+
+class PortfolioBotMixin:
+    """Общие сервисы процесса и их жизненный цикл; подмешивается к Bot или AutoShardedBot"""
+
+    def __init__(self, *args, db: Database, media_utils: MediaUtils, send_queue: SendQueue,
+                 media_jobs: MediaJobQueue, metrics: Metrics, rate_limiter: CommandRateLimiter,
+                 metrics_server: Optional[MetricsServer] = None, migrate: bool = True, cluster_id: int = 0,
+                 health_queue: Optional[Queue] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.db = db
+        self.media_utils = media_utils
+        self.send_queue = send_queue
+        self.media_jobs = media_jobs
+        self.metrics = metrics
+        self.rate_limiter = rate_limiter
+        self.metrics_server = metrics_server
+        self.migrate = migrate
+        self.cluster_id = cluster_id
+        self.health_queue = health_queue
+        self._health_task: Optional[asyncio.Task] = None
+
+    async def start(self, *args, **kwargs) -> None:
+        await self.start_services()
+        await super().start(*args, **kwargs)
+
+    async def close(self) -> None:
+        await self.close_services()
+        await super().close()
+        await self.send_queue.close()
+        await self.media_utils.close()
+        await self.db.dispose()
+
+    async def start_services(self) -> None:
+        """Готовит базу и хранилище и запускает фоновые сервисы (без подключения к шлюзу)"""
+        # В кластере схему и хранилище готовит родительский процесс до запуска воркеров
+        if self.migrate:
+            await self.db.init_models()
+            await self.media_utils.migrate_media_store(self.db)
+            await self.db.reset_running_media_jobs()
+
+        await self.media_utils.start()
+        self.media_jobs.start(self)
+
+        if self.metrics_server is not None:
+            await self.metrics_server.start()
+
+        if self.health_queue is not None:
+            self._health_task = asyncio.create_task(self._report_health())
+
+    async def close_services(self) -> None:
+        """Останавливает фоновые сервисы, принимающие новую работу"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+
+        await self.media_jobs.close()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
 
+    def health(self) -> Dict[str, Any]:
+        """Состояние процесса для родительского процесса кластера"""
+        shard_ids = getattr(self, 'shard_ids', None) or [self.shard_id or 0]
+        return {
+            'cluster_id': self.cluster_id,
+            'pid': os.getpid(),
+            'shards': list(shard_ids),
+            'ready': self.is_ready(),
+            'guilds': len(self.guilds),
+            'latency': self.latency,
+            'timestamp': time.time(),
+        }
 
-def start_bot():
+    async def _report_health(self) -> None:
+        while not self.is_closed():
+            self.health_queue.put_nowait(self.health())
+            await asyncio.sleep(Env.CLUSTER_HEALTH_INTERVAL)
+
+
+class PortfolioBot(PortfolioBotMixin, Bot):
+    """Бот с одним подключением к шлюзу"""
+
+
+class ShardedPortfolioBot(PortfolioBotMixin, AutoShardedBot):
+    """Бот, обслуживающий несколько шардов в одном процессе"""
+
+
+def create_bot(shard_ids: Optional[List[int]] = None, shard_count: Optional[int] = None,
+               cluster_id: int = 0, health_queue: Optional[Queue] = None, migrate: bool = True,
+               db_url: str = Env.DB_URL, media_dir: str = "media") -> PortfolioBotMixin:
+    """Собирает бота со всеми сервисами и когами, не подключаясь к Discord"""
     intents = Intents.default()
     intents.message_content = True
 
-    bot = Bot(BotConfig.CMD_PREFIX, intents=intents)
+    # Каждый процесс кластера создает собственный пул БД, HTTP-сессию и метрики
+    metrics = Metrics()
+    # Кэш инвалидируется только в своем процессе: в кластере другие процессы отдавали бы устаревшие портфолио
+    cache = None
+    if Env.CLUSTER_COUNT <= 1:
+        cache = PortfolioCache(ttl=Env.PORTFOLIO_CACHE_TTL, max_bytes=Env.PORTFOLIO_CACHE_MAX_BYTES)
+    db = Database(create_db_engine(db_url), cache)
+    metrics.instrument_engine(db.engine)
+    media_utils = MediaUtils(media_dir, metrics=metrics)
+    send_queue = SendQueue()
+    media_jobs = MediaJobQueue(db, media_utils)
+    rate_limiter = CommandRateLimiter()
+
+    if cache is not None:
+        metrics.register_collector('cache', cache.stats)
+    metrics.register_collector('send_queue', send_queue.stats)
+    metrics.register_collector('rate_limit', rate_limiter.stats)
+    metrics.register_collector('media_jobs', media_jobs.stats)
+    metrics.register_collector('media_delivery', lambda: media_utils.delivery_stats)
+
+    metrics_server = None
+    if Env.METRICS_PORT:
+        metrics_server = MetricsServer(metrics, Env.METRICS_HOST, Env.METRICS_PORT + cluster_id)
+
+    services = dict(db=db, media_utils=media_utils, send_queue=send_queue, media_jobs=media_jobs,
+                    metrics=metrics, rate_limiter=rate_limiter, metrics_server=metrics_server, migrate=migrate,
+                    cluster_id=cluster_id, health_queue=health_queue)
+
+    if Env.SHARDED or shard_ids is not None:
+        bot = ShardedPortfolioBot(
+            BotConfig.CMD_PREFIX,
+            intents=intents,
+            shard_ids=shard_ids,
+            shard_count=shard_count or Env.SHARD_COUNT or None,
+            **services
+        )
+    else:
+        bot = PortfolioBot(BotConfig.CMD_PREFIX, intents=intents, **services)
 
     bot.remove_command("help")
+    bot.add_check(rate_limiter.check)
+    bot.before_invoke(metrics.before_invoke)
+    bot.after_invoke(metrics.after_invoke)
+
+    register_all_cogs(bot, db, media_utils, send_queue, media_jobs, metrics)
+
+    return bot
 
-    register_all_cogs(bot)
-    register_models()
 
+def start_bot(shard_ids: Optional[List[int]] = None, shard_count: Optional[int] = None,
+              cluster_id: int = 0, health_queue: Optional[Queue] = None, migrate: bool = True):
+    bot = create_bot(shard_ids, shard_count, cluster_id, health_queue, migrate)
     bot.run(Env.TOKEN)
@@ -4,3 +4,48 @@ from typing import Final
 
 class BotConfig(ABC):
     CMD_PREFIX: Final = '/'
+    MAX_PROJECTS: Final = 3
+    MEDIA_DOWNLOAD_CONCURRENCY: Final = 4
+    # За сколько секунд до истечения ссылки CDN файл загружается заново
+    CDN_URL_REFRESH_MARGIN: Final = 3600
+    # Срок жизни ссылки CDN без параметра `ex`
+    CDN_URL_DEFAULT_TTL: Final = 24 * 3600
+    # Минимальная сторона варианта изображения, достаточная для /preview
+    PREVIEW_MIN_SIDE: Final = 800
+    # Постраничный просмотр: время жизни кнопок и лимит живых view на процесс
+    VIEW_TIMEOUT: Final = 180
+    REMOVE_MEDIA_TIMEOUT: Final = 30
+    MAX_LIVE_VIEWS: Final = 1000
+    # Лимит отправки сообщений в один канал: не больше N за окно в секундах
+    CHANNEL_SEND_LIMIT: Final = 5
+    CHANNEL_SEND_WINDOW: Final = 5.0
+
+    # Стоимость команд в токенах ограничителя частоты (остальные команды бесплатны)
+    COMMAND_COSTS: Final = {
+        'preview': 3,
+        'search': 2,
+        'browse': 1,
+        'profile': 1,
+        'add-media': 2,
+        'add-project': 1,
+        'remove-media': 1,
+        'set-profile': 1,
+        'set-links': 1,
+    }
+    # Дополнительная стоимость add-media за каждый МиБ вложений
+    MEDIA_COST_PER_MB: Final = 1
+
+    # Результатов полнотекстового поиска на странице /search
+    SEARCH_PAGE_SIZE: Final = 5
+    # Сколько самых новых совпадений ранжируется и доступно для листания
+    SEARCH_MAX_RESULTS: Final = 1000
+
+    # Проектов на странице /browse, категорий в общем списке и в подсказках
+    BROWSE_PAGE_SIZE: Final = 5
+    CATEGORY_LIST_SIZE: Final = 20
+    CATEGORY_SUGGESTIONS: Final = 5
+
+    # Потоковый обход таблиц (Database.iter_*): строк в одном запросе по ключу
+    # и строк, которые ORM держит в буфере внутри запроса
+    ITER_BATCH_SIZE: Final = 5000
+    ITER_YIELD_PER: Final = 500
@@ -1,5 +1,6 @@
 from .projects import ProjectEmbeds
 from .media import MediaEmbeds
 from .portfolio import PortfolioEmbeds
+from .admin import AdminEmbeds
 
-__all__ = ['ProjectEmbeds', 'MediaEmbeds', 'PortfolioEmbeds']
\ No newline at end of file
+__all__ = ['ProjectEmbeds', 'MediaEmbeds', 'PortfolioEmbeds', 'AdminEmbeds']
\ No newline at end of file
@@ -0,0 +1,41 @@
+from nextcord import Embed, Color
+from typing import Dict, List, Tuple
+
+
+class AdminEmbeds:
+    @staticmethod
+    def metrics(commands: List[Tuple[str, int, float, float]], db: Tuple[int, float, float],
+                collected: Dict[str, Dict[str, float]]) -> Embed:
+        embed = Embed(
+            title="📊 Метрики бота",
+            color=Color.blue()
+        )
+
+        if commands:
+            embed.add_field(
+                name="⏱️ Команды (вызовов, p50, p99)",
+                value="\n".join(
+                    f"• `{name}`: {count}, {p50 * 1000:.0f} мс, {p99 * 1000:.0f} мс"
+                    for name, count, p50, p99 in commands[:10]
+                ),
+                inline=False
+            )
+
+        statements, avg, p99 = db
+        embed.add_field(
+            name="🗄️ База данных",
+            value=f"Запросов: {statements}\nСреднее: {avg * 1000:.2f} мс\np99: {p99 * 1000:.2f} мс",
+            inline=False
+        )
+
+        for source, values in collected.items():
+            embed.add_field(
+                name=f"📦 {source}",
+                value="\n".join(
+                    f"• {key}: {value:.2f}" if not value.is_integer() else f"• {key}: {value:.0f}"
+                    for key, value in values.items()
+                ) or "—",
+                inline=True
+            )
+
+        return embed
@@ -1,5 +1,6 @@
 from nextcord import Embed, Color
-import os
+
+from bot.misc.media_utils import MediaUtils
 
 class MediaEmbeds:
     @staticmethod
@@ -51,17 +52,28 @@ class MediaEmbeds:
 
         return embed
 
+    @staticmethod
+    def media_processing(project_name: str, count: int) -> Embed:
+        return Embed(
+            title="⏳ Медиафайлы загружаются",
+            description=(
+                f"Проект: **{project_name}**\n"
+                f"Файлов в очереди: {count}. Это сообщение обновится, когда загрузка завершится."
+            ),
+            color=Color.blue()
+        )
+
     @staticmethod
     def media_list(project_name: str, media: list) -> Embed:
         embed = Embed(
             title="📎 Медиафайлы проекта",
-            description=f"Выберите номер файла для удаления из проекта **{project_name}**:",
+            description=f"Выберите в меню файлы для удаления из проекта **{project_name}**:",
             color=Color.blue()
         )
 
         for i, m in enumerate(media, 1):
             embed.add_field(
-                name=f"{i}. {os.path.basename(m.url)}",
+                name=f"{i}. {MediaUtils.file_name(m)}",
                 value=f"Тип: {m.type}",
                 inline=False
             )
@@ -69,10 +81,31 @@ class MediaEmbeds:
         return embed
 
     @staticmethod
-    def media_removed(project_name: str) -> Embed:
+    def media_reference(url: str) -> Embed:
+        return Embed(color=Color.blue()).set_image(url=url)
+
+    @staticmethod
+    def media_too_large(file_name: str, size: int, limit: int) -> Embed:
+        return Embed(
+            description=(
+                f"📎 Файл **{file_name}** ({size / 2 ** 20:.1f} МБ) не показан: "
+                f"он больше лимита загрузки на этом сервере ({limit / 2 ** 20:.0f} МБ)"
+            ),
+            color=Color.orange()
+        )
+
+    @staticmethod
+    def media_removed(project_name: str, count: int = 1) -> Embed:
+        if count == 1:
+            return Embed(
+                title="✅ Файл удален",
+                description=f"Медиафайл успешно удален из проекта **{project_name}**",
+                color=Color.green()
+            )
+
         return Embed(
-            title="✅ Файл удален",
-            description=f"Медиафайл успешно удален из проекта **{project_name}**",
+            title="✅ Файлы удалены",
+            description=f"Медиафайлы ({count}) успешно удалены из проекта **{project_name}**",
             color=Color.green()
         )
 
@@ -1,5 +1,40 @@
+import os
+from dataclasses import dataclass, field
+from typing import List, Optional
+
 from nextcord import Embed, Color, Member
 
+from bot.misc.media_utils import MediaUtils
+from .media import MediaEmbeds
+
+# Ограничения Discord на одно сообщение
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_FILES_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+MAX_CONTENT_LENGTH = 2000
+DEFAULT_UPLOAD_LIMIT = 25 * 1024 * 1024
+
+
+@dataclass
+class PortfolioMessage:
+    """Одно сообщение упакованного портфолио"""
+    embeds: List[Embed] = field(default_factory=list)
+    # Ссылки CDN на видео — Discord разворачивает их из текста сообщения
+    links: List[str] = field(default_factory=list)
+    # Медиафайлы, которые нужно загрузить файлами
+    uploads: list = field(default_factory=list)
+    upload_bytes: int = 0
+    # Сколько медиафайлов отправлено ссылкой CDN без повторной загрузки
+    reused_refs: int = 0
+
+    @property
+    def content(self) -> Optional[str]:
+        return "\n".join(self.links) or None
+
+    def embed_chars(self) -> int:
+        return sum(len(embed) for embed in self.embeds)
+
+
 class PortfolioEmbeds:
     @staticmethod
     def portfolio_preview(member: Member, has_projects: bool) -> Embed:
@@ -22,12 +57,177 @@ class PortfolioEmbeds:
         return embed
 
     @staticmethod
-    def project_details(project) -> Embed:
-        return Embed(
+    def project_details(project, has_media: bool = True) -> Embed:
+        embed = Embed(
             title=f"📁 {project.name}",
             description=(
                 f"**Категория:** {project.category}\n"
                 f"**Описание:** {project.description}"
             ),
             color=Color.blue()
-        )
\ No newline at end of file
+        )
+
+        if not has_media:
+            embed.set_footer(text="📎 Нет медиафайлов")
+
+        return embed
+
+    @staticmethod
+    def search_results(query: str, page) -> Embed:
+        """Страница результатов /search: проекты с автором и началом описания"""
+        embed = Embed(
+            title=f"🔎 Поиск: {query}",
+            description=(
+                f"Найдено проектов: {page.total}{'+' if page.truncated else ''}"
+                if page.total else "По вашему запросу ничего не найдено."
+            ),
+            color=Color.blue()
+        )
+
+        PortfolioEmbeds._add_project_fields(embed, page.projects)
+
+        if page.pages > 1:
+            embed.set_footer(text=f"Страница {page.page + 1} из {page.pages}")
+
+        return embed
+
+    @staticmethod
+    def browse_results(category, projects: list, page: int, pages: int) -> Embed:
+        """Страница /browse: проекты категории, новые первыми"""
+        embed = Embed(
+            title=f"🗂️ Категория: {category.name}",
+            description=f"Проектов в категории: {category.project_count}",
+            color=Color.blue()
+        )
+
+        PortfolioEmbeds._add_project_fields(embed, projects, show_category=False)
+
+        if pages > 1:
+            embed.set_footer(text=f"Страница {page + 1} из {pages}")
+
+        return embed
+
+    @staticmethod
+    def categories(categories: list) -> Embed:
+        """Список категорий с числом проектов для /browse без аргументов"""
+        embed = Embed(
+            title="🗂️ Категории проектов",
+            description=(
+                "\n".join(f"• **{category.name}** — {category.project_count}" for category in categories)
+                if categories else "Пока нет ни одного проекта."
+            ),
+            color=Color.blue()
+        )
+
+        if categories:
+            embed.set_footer(text="Открыть категорию: /browse <категория>")
+
+        return embed
+
+    @staticmethod
+    def category_not_found(query: str, suggestions: list) -> Embed:
+        embed = Embed(
+            title="❌ Категория не найдена",
+            description=f"Категории «{query}» нет ни у одного проекта.",
+            color=Color.red()
+        )
+
+        if suggestions:
+            embed.add_field(
+                name="Возможно, вы имели в виду",
+                value="\n".join(f"• **{category.name}** — {category.project_count}" for category in suggestions),
+                inline=False
+            )
+
+        return embed
+
+    @staticmethod
+    def _add_project_fields(embed: Embed, projects: list, show_category: bool = True) -> None:
+        """Поля со списком проектов: название, автор и начало описания"""
+        for project in projects:
+            description = project.description
+            if len(description) > 200:
+                description = description[:200].rstrip() + "…"
+
+            embed.add_field(
+                name=f"📁 {project.name} · {project.category}" if show_category else f"📁 {project.name}",
+                value=f"Автор: <@{project.user.discord_id}>\n{description}",
+                inline=False
+            )
+
+    @classmethod
+    def portfolio_messages(cls, member: Member, projects: list,
+                           upload_limit: int = DEFAULT_UPLOAD_LIMIT) -> List[PortfolioMessage]:
+        """Упаковывает портфолио в минимальное число сообщений
+
+        В одно сообщение входит до 10 эмбедов и 10 файлов в пределах лимитов Discord
+        на размер эмбедов, текста и загрузки. Изображения с действующей ссылкой CDN
+        отправляются эмбедом, видео — ссылкой, остальные файлы загружаются заново.
+        Файл больше лимита загрузки Discord не примет, поэтому вместо него
+        отправляется заметка. Вложения отображаются отдельно от эмбедов, поэтому после сообщения с файлами
+        следующий проект начинается с нового сообщения.
+        """
+        messages = [PortfolioMessage()]
+
+        def fits(embeds: int = 0, embed_chars: int = 0, links: Optional[str] = None,
+                 files: int = 0, upload_bytes: int = 0) -> bool:
+            current = messages[-1]
+            content_length = len(current.content or "") + (len(links) + 1 if links else 0)
+            return (
+                len(current.embeds) + embeds <= MAX_EMBEDS_PER_MESSAGE
+                and current.embed_chars() + embed_chars <= MAX_EMBED_CHARS_PER_MESSAGE
+                and content_length <= MAX_CONTENT_LENGTH
+                and len(current.uploads) + files <= MAX_FILES_PER_MESSAGE
+                and current.upload_bytes + upload_bytes <= upload_limit
+            )
+
+        def add_embed(embed: Embed) -> None:
+            if not fits(embeds=1, embed_chars=len(embed)):
+                messages.append(PortfolioMessage())
+            messages[-1].embeds.append(embed)
+
+        add_embed(cls.portfolio_preview(member, bool(projects)))
+
+        for project in projects:
+            if messages[-1].uploads:
+                messages.append(PortfolioMessage())
+
+            media = [
+                m for m in project.media
+                if MediaUtils.cdn_reference(m) or os.path.exists(MediaUtils.display_path(m))
+            ]
+            add_embed(cls.project_details(project, has_media=bool(media)))
+
+            for m in media:
+                cdn_url = MediaUtils.cdn_reference(m)
+
+                if cdn_url and m.type == 'image':
+                    add_embed(MediaEmbeds.media_reference(cdn_url))
+                    messages[-1].reused_refs += 1
+                elif cdn_url:
+                    if not fits(links=cdn_url):
+                        messages.append(PortfolioMessage())
+                    messages[-1].links.append(cdn_url)
+                    messages[-1].reused_refs += 1
+                else:
+                    size = os.path.getsize(MediaUtils.display_path(m))
+                    if size > upload_limit:
+                        add_embed(MediaEmbeds.media_too_large(MediaUtils.file_name(m), size, upload_limit))
+                        continue
+
+                    if messages[-1].uploads and not fits(files=1, upload_bytes=size):
+                        messages.append(PortfolioMessage())
+                    messages[-1].uploads.append(m)
+                    messages[-1].upload_bytes += size
+
+        return messages
+
+    @classmethod
+    def project_page(cls, member: Member, project,
+                     upload_limit: int = DEFAULT_UPLOAD_LIMIT) -> List[PortfolioMessage]:
+        """Страница постраничного просмотра: шапка и один проект
+
+        Медиафайлы, которые не помещаются в первое сообщение, идут в следующих
+        частях страницы, которые `PortfolioView` листает отдельно.
+        """
+        return cls.portfolio_messages(member, [project], upload_limit)
@@ -24,7 +24,9 @@ class ProfileEmbeds:
         ],
         "📁 Проекты": [
             CommandInfo("add-project", "создать проект", "Веб-сайт Веб-разработка Современный сайт для компании"),
-            CommandInfo("preview", "просмотреть портфолио", "@пользователь")
+            CommandInfo("preview", "просмотреть портфолио", "@пользователь"),
+            CommandInfo("search", "найти проекты по навыкам и описанию", "python дизайн"),
+            CommandInfo("browse", "проекты категории или список категорий", "Дизайн")
         ],
         "📎 Медиафайлы": [
             CommandInfo("add-media", "добавить медиафайлы"),
@@ -8,3 +8,60 @@ load_dotenv()
 
 class Env(ABC):
     TOKEN: Final = os.environ.get('TOKEN', 'define me!')
+
+    # Sharding / cluster (SHARD_COUNT=0 — по рекомендации Discord)
+    SHARDED: Final = os.environ.get('SHARDED', '').lower() in ('1', 'true', 'yes')
+    SHARD_COUNT: Final = int(os.environ.get('SHARD_COUNT', 0))
+    CLUSTER_COUNT: Final = int(os.environ.get('CLUSTER_COUNT', 1))
+    CLUSTER_HEALTH_INTERVAL: Final = float(os.environ.get('CLUSTER_HEALTH_INTERVAL', 30))
+    CLUSTER_RESTART_DELAY: Final = float(os.environ.get('CLUSTER_RESTART_DELAY', 5))
+
+    # Database
+    DB_URL: Final = os.environ.get('DB_URL', 'sqlite+aiosqlite:///portfolio.db')
+    DB_POOL_SIZE: Final = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW: Final = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_MMAP_SIZE: Final = int(os.environ.get('DB_MMAP_SIZE', 256 * 1024 * 1024))
+    # Отрицательное значение — размер в КиБ (см. PRAGMA cache_size)
+    DB_CACHE_SIZE: Final = int(os.environ.get('DB_CACHE_SIZE', -64 * 1024))
+
+    # Rate limits (емкость бакета в токенах и пополнение в токенах в секунду)
+    RATE_LIMIT_USER_CAPACITY: Final = float(os.environ.get('RATE_LIMIT_USER_CAPACITY', 20))
+    RATE_LIMIT_USER_REFILL: Final = float(os.environ.get('RATE_LIMIT_USER_REFILL', 0.5))
+    RATE_LIMIT_GUILD_CAPACITY: Final = float(os.environ.get('RATE_LIMIT_GUILD_CAPACITY', 200))
+    RATE_LIMIT_GUILD_REFILL: Final = float(os.environ.get('RATE_LIMIT_GUILD_REFILL', 5))
+
+    # Outbound messages: сообщений в очереди канала, после которых send ждет
+    SEND_QUEUE_MAX_DEPTH: Final = int(os.environ.get('SEND_QUEUE_MAX_DEPTH', 50))
+
+    # Background media ingestion
+    MEDIA_JOB_WORKERS: Final = int(os.environ.get('MEDIA_JOB_WORKERS', 2))
+    MEDIA_JOB_POLL_INTERVAL: Final = float(os.environ.get('MEDIA_JOB_POLL_INTERVAL', 5))
+    MEDIA_JOB_MAX_ATTEMPTS: Final = int(os.environ.get('MEDIA_JOB_MAX_ATTEMPTS', 3))
+    # Аренда задачи, с; задача упавшего процесса забирается снова по ее истечении
+    MEDIA_JOB_LEASE: Final = float(os.environ.get('MEDIA_JOB_LEASE', 120))
+
+    # Metrics: порт HTTP-сервера /metrics (0 — выключен); процесс кластера N слушает порт + N
+    METRICS_HOST: Final = os.environ.get('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT: Final = int(os.environ.get('METRICS_PORT', 0))
+
+    # Portfolio cache
+    PORTFOLIO_CACHE_TTL: Final = float(os.environ.get('PORTFOLIO_CACHE_TTL', 60))
+    PORTFOLIO_CACHE_MAX_BYTES: Final = int(os.environ.get('PORTFOLIO_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+
+    # Media downloads
+    MEDIA_MAX_BYTES: Final = int(os.environ.get('MEDIA_MAX_BYTES', 25 * 1024 * 1024))
+    MEDIA_INFLIGHT_BYTES: Final = int(os.environ.get('MEDIA_INFLIGHT_BYTES', 128 * 1024 * 1024))
+
+    # Media HTTP client
+    MEDIA_HTTP_LIMIT: Final = int(os.environ.get('MEDIA_HTTP_LIMIT', 100))
+    MEDIA_HTTP_LIMIT_PER_HOST: Final = int(os.environ.get('MEDIA_HTTP_LIMIT_PER_HOST', 20))
+    MEDIA_HTTP_DNS_TTL: Final = int(os.environ.get('MEDIA_HTTP_DNS_TTL', 300))
+    MEDIA_HTTP_KEEPALIVE: Final = float(os.environ.get('MEDIA_HTTP_KEEPALIVE', 30))
+    MEDIA_HTTP_TIMEOUT: Final = float(os.environ.get('MEDIA_HTTP_TIMEOUT', 120))
+    MEDIA_HTTP_CONNECT_TIMEOUT: Final = float(os.environ.get('MEDIA_HTTP_CONNECT_TIMEOUT', 10))
+    MEDIA_HTTP_READ_TIMEOUT: Final = float(os.environ.get('MEDIA_HTTP_READ_TIMEOUT', 30))
+    MEDIA_HTTP_RETRIES: Final = int(os.environ.get('MEDIA_HTTP_RETRIES', 3))
+    MEDIA_HTTP_RETRY_BACKOFF: Final = float(os.environ.get('MEDIA_HTTP_RETRY_BACKOFF', 0.5))
+
+    # Image variants (0 — ядра поровну между процессами кластера)
+    IMAGE_WORKERS: Final = int(os.environ.get('IMAGE_WORKERS', 0)) or None
@@ -0,0 +1,112 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Вид варианта -> (максимальная сторона в пикселях, качество WebP).
+# Создаются только варианты, которые бот отдает: /preview берет наименьший
+# не меньше BotConfig.PREVIEW_MIN_SIDE
+VARIANT_SPECS = {
+    'preview': (1280, 80),
+}
+
+# fork копирует процесс с потоками aiosqlite и `to_thread` вместе с их захваченными блокировками
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+@dataclass(frozen=True)
+class ImageVariant:
+    """Сжатая копия изображения"""
+    kind: str
+    path: str
+    width: int
+    height: int
+    size: int
+
+
+def variant_path(variants_dir: str, sha256: str, kind: str) -> str:
+    """Путь к варианту: варианты адресуются хэшем оригинала, как и сами файлы"""
+    return os.path.join(variants_dir, sha256[:2], sha256[2:4], f"{sha256}_{kind}.webp")
+
+
+def render_variants(src_path: str, variants_dir: str, sha256: str) -> List[Tuple[str, str, int, int, int]]:
+    """Создает варианты изображения; выполняется в дочернем процессе пула
+
+    Уже существующие варианты не перекодируются. Варианты не крупнее оригинала
+    и анимированные изображения пропускаются.
+
+    Returns:
+        Кортежи (вид, путь, ширина, высота, размер в байтах)
+    """
+    results = []
+
+    with Image.open(src_path) as image:
+        if getattr(image, 'is_animated', False):
+            return results
+
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+
+        for kind, (max_side, quality) in VARIANT_SPECS.items():
+            if max(image.size) <= max_side:
+                continue
+
+            path = variant_path(variants_dir, sha256, kind)
+
+            if not os.path.exists(path):
+                variant = image.copy()
+                variant.thumbnail((max_side, max_side), Image.LANCZOS)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                variant.save(tmp_path, 'WEBP', quality=quality, method=4)
+                os.replace(tmp_path, path)
+
+            with Image.open(path) as rendered:
+                width, height = rendered.size
+
+            results.append((kind, path, width, height, os.path.getsize(path)))
+
+    return results
+
+
+class ImagePipeline:
+    """Кодирование вариантов изображений в пуле процессов, вне event loop и GIL"""
+
+    def __init__(self, variants_dir: str, workers: Optional[int] = None, cluster_count: int = 1):
+        """
+        Args:
+            workers: Размер пула; по умолчанию ядра делятся поровну между
+                `cluster_count` процессами кластера, у каждого из которых свой пул
+        """
+        self.variants_dir = variants_dir
+        self.workers = workers or max(1, (os.cpu_count() or 1) // max(1, cluster_count))
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(START_METHOD)
+            )
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def create_variants(self, src_path: str, sha256: str) -> List[ImageVariant]:
+        if self._executor is None:
+            raise RuntimeError("Пул процессов не запущен, вызовите ImagePipeline.start()")
+
+        loop = asyncio.get_running_loop()
+        rendered = await loop.run_in_executor(self._executor, render_variants, src_path, self.variants_dir, sha256)
+        return [ImageVariant(*variant) for variant in rendered]
@@ -0,0 +1,252 @@
+import asyncio
+import logging
+from typing import Optional, Tuple, List, Dict, Any
+
+from nextcord import Client, Embed, Forbidden, NotFound
+
+from bot.database import Database, MediaJob
+from bot.misc.config import BotConfig
+from bot.misc.env import Env
+from bot.misc.embeds.media import MediaEmbeds
+from bot.misc.embeds.projects import ProjectEmbeds
+from bot.misc.media_utils import MediaUtils, MediaTooLargeError
+
+logger = logging.getLogger(__name__)
+
+
+class MediaJobQueue:
+    """Фоновая загрузка вложений `/add-media`.
+
+    Команда ставит задачу в таблицу `media_jobs` и сразу отвечает, а
+    обработчики скачивают файлы и заменяют подтверждение результатом.
+    Задачи, прерванные остановкой, возвращаются в очередь при запуске
+    (`Database.reset_running_media_jobs`). Пока задача выполняется, обработчик
+    продлевает ее аренду; задачу упавшего процесса кластера другой обработчик
+    забирает, когда аренда истекает.
+
+    Правка подтверждения — отдельный шаг: задача остается в статусе done или
+    failed, пока сообщение не заменено итогом, и только потом становится
+    acked. Если правка не удалась или процесс упал до нее, итог доставляется
+    повторно по сохраненному `result`; повторная правка того же сообщения
+    безопасна.
+    """
+
+    def __init__(self, db: Database, media_utils: MediaUtils, workers: int = Env.MEDIA_JOB_WORKERS,
+                 poll_interval: float = Env.MEDIA_JOB_POLL_INTERVAL, max_attempts: int = Env.MEDIA_JOB_MAX_ATTEMPTS,
+                 lease: float = Env.MEDIA_JOB_LEASE):
+        self.db = db
+        self.media_utils = media_utils
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.client: Optional[Client] = None
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self, client: Client) -> None:
+        """Запускает обработчики; `client` нужен для правки сообщений-подтверждений"""
+        self.client = client
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._redeliver()))
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Будит обработчики после постановки задачи в этом процессе"""
+        self._wakeup.set()
+
+    async def _worker(self) -> None:
+        # До входа в Discord HTTP-сессии нет, и итог задачи нельзя было бы доставить
+        await self.client.wait_until_ready()
+
+        while True:
+            # Сброс до запроса: задача, поставленная во время запроса, не потеряется
+            self._wakeup.clear()
+
+            try:
+                job = await self.db.claim_media_job(self.lease)
+            except Exception as e:
+                logger.error(f"Ошибка при получении задачи загрузки: {str(e)}")
+                job = None
+
+            if job is None:
+                # Опрос нужен для задач из других процессов и оставшихся после перезапуска
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self.active += 1
+            heartbeat = asyncio.create_task(self._heartbeat(job))
+            try:
+                await self._process(job)
+            finally:
+                heartbeat.cancel()
+                self.active -= 1
+
+    async def _redeliver(self) -> None:
+        """Повторно доставляет итоги завершенных задач, чьи подтверждения не удалось заменить"""
+        await self.client.wait_until_ready()
+
+        while True:
+            try:
+                jobs = await self.db.claim_unacked_media_jobs(self.lease)
+            except Exception as e:
+                logger.error(f"Ошибка при получении неподтвержденных задач загрузки: {str(e)}")
+                jobs = []
+
+            for job in jobs:
+                await self._acknowledge(job, self._result_embed(job))
+
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, int]:
+        return {'active': self.active, 'completed': self.completed, 'failed': self.failed}
+
+    async def _heartbeat(self, job: MediaJob) -> None:
+        """Продлевает аренду задачи, пока она обрабатывается"""
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                if not await self.db.touch_media_job(job.id, job.attempts):
+                    return
+            except Exception as e:
+                logger.error(f"Ошибка при продлении задачи загрузки {job.id}: {str(e)}")
+
+    async def _process(self, job: MediaJob) -> None:
+        if job.attempts > self.max_attempts:
+            # Аренда истекла после последней попытки: процесс падает на этой задаче
+            await self._fail(job)
+            return
+
+        try:
+            semaphore = asyncio.Semaphore(BotConfig.MEDIA_DOWNLOAD_CONCURRENCY)
+            results = await asyncio.gather(*(
+                self._download_attachment(attachment, semaphore)
+                for attachment in job.attachments
+            ))
+
+            added_media = []
+            errors = []
+            records = []
+
+            for attachment, (record, error) in zip(job.attachments, results):
+                if error:
+                    errors.append(error)
+                else:
+                    records.append(record)
+                    added_media.append(f"• {attachment['filename']}")
+
+            # Медиафайлы и статус задачи сохраняются одной транзакцией
+            media_rows = await self.db.complete_media_job(
+                job.id, job.attempts, job.project_id, records, {'added': added_media, 'errors': errors}
+            )
+            if media_rows is None:
+                return
+
+            self.completed += 1
+            await self._acknowledge(job, MediaEmbeds.media_add_result(job.project_name, added_media, errors))
+
+            # Сжатые варианты создаются уже после ответа пользователю
+            await self._create_variants(media_rows)
+
+        except Exception as e:
+            logger.error(f"Ошибка при обработке задачи загрузки {job.id}: {str(e)}")
+            await self._fail(job)
+
+    async def _fail(self, job: MediaJob) -> None:
+        """Возвращает задачу в очередь, а после последней попытки сообщает об ошибке"""
+        try:
+            status = await self.db.retry_media_job(job.id, job.attempts, self.max_attempts)
+        except Exception as e:
+            logger.error(f"Ошибка при повторе задачи загрузки {job.id}: {str(e)}")
+            return
+
+        if status == 'pending':
+            self.notify()
+        elif status == 'failed':
+            self.failed += 1
+            await self._acknowledge(job, self._failure_embed())
+
+    @staticmethod
+    def _failure_embed() -> Embed:
+        return ProjectEmbeds.generic_error("Произошла ошибка при добавлении медиафайлов. Пожалуйста, попробуйте позже.")
+
+    @classmethod
+    def _result_embed(cls, job: MediaJob) -> Embed:
+        """Итог завершенной задачи по сохраненному в базе результату"""
+        if job.status == 'failed' or not job.result:
+            return cls._failure_embed()
+        return MediaEmbeds.media_add_result(job.project_name, job.result['added'], job.result['errors'])
+
+    async def _acknowledge(self, job: MediaJob, embed: Embed) -> None:
+        """Заменяет сообщение-подтверждение итогом и отмечает задачу подтвержденной
+
+        Если правка не удалась, задача остается неподтвержденной, и `_redeliver`
+        повторит ее после истечения аренды.
+        """
+        try:
+            channel = self.client.get_partial_messageable(job.channel_id)
+            await channel.get_partial_message(job.message_id).edit(embed=embed)
+        except (NotFound, Forbidden) as e:
+            # Сообщение удалено или канал недоступен: доставлять итог больше некуда
+            logger.warning(f"Подтверждение задачи загрузки {job.id} недоступно: {str(e)}")
+        except Exception as e:
+            logger.error(f"Ошибка при обновлении сообщения задачи загрузки {job.id}: {str(e)}")
+            return
+
+        try:
+            await self.db.ack_media_job(job.id)
+        except Exception as e:
+            logger.error(f"Ошибка при подтверждении задачи загрузки {job.id}: {str(e)}")
+
+    async def _download_attachment(self, attachment: Dict[str, Any], semaphore: asyncio.Semaphore
+                                   ) -> Tuple[Optional[Tuple[str, str, str, str]], Optional[str]]:
+        """Скачивает вложение в хранилище
+
+        Returns:
+            Запись (путь, тип, sha256, расширение) для `Database.complete_media_job` или текст ошибки
+        """
+        filename = attachment['filename']
+
+        # Определяем тип медиафайла
+        media_type = MediaUtils.get_media_type(attachment['content_type'])
+        if not media_type:
+            return None, f"• Неподдерживаемый формат: {filename}"
+
+        if attachment['size'] > self.media_utils.max_size:
+            return None, f"• Файл слишком большой: {filename}"
+
+        try:
+            async with semaphore:
+                stored = await self.media_utils.download_media(attachment['url'])
+            return (stored.path, media_type, stored.sha256, stored.file_ext), None
+        except MediaTooLargeError:
+            return None, f"• Файл слишком большой: {filename}"
+        except Exception as e:
+            logger.error(f"Ошибка при обработке медиафайла {filename}: {str(e)}")
+            return None, f"• Ошибка при обработке {filename}"
+
+    async def _create_variants(self, media_rows: list) -> None:
+        """Создает превью и миниатюры для добавленных изображений"""
+        for media in media_rows:
+            if media.type != 'image':
+                continue
+
+            try:
+                variants = await self.media_utils.create_variants(media.url, media.sha256)
+                if variants:
+                    await self.db.add_media_variants(media.id, [
+                        (v.kind, v.path, v.width, v.height, v.size) for v in variants
+                    ])
+            except Exception as e:
+                logger.error(f"Ошибка при создании вариантов медиафайла {media.url}: {str(e)}")
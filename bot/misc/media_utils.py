@@ -1,65 +1,366 @@
 import os
+import asyncio
+import hashlib
 import logging
+import tempfile
+import time
 import aiohttp
-from datetime import datetime
-from urllib.parse import urlparse
-from typing import Optional
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from urllib.parse import urlparse, parse_qs
+from typing import Optional, List, BinaryIO, AsyncIterator, TYPE_CHECKING
+
+from bot.misc.config import BotConfig
+from bot.misc.env import Env
+from bot.misc.image_pipeline import ImagePipeline, ImageVariant
+
+if TYPE_CHECKING:
+    from bot.database import Database
+    from bot.misc.metrics import Metrics
 
 logger = logging.getLogger(__name__)
 
+CHUNK_SIZE = 256 * 1024
+
+
+class MediaTooLargeError(Exception):
+    """Файл превышает допустимый размер"""
+
+    def __init__(self, size: int, max_size: int):
+        super().__init__(f"Размер файла {size} байт превышает лимит {max_size} байт")
+        self.size = size
+        self.max_size = max_size
+
+
+class ByteBudget:
+    """Общий на процесс бюджет байт, которые одновременно находятся в загрузке"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def reserve(self, size: int) -> AsyncIterator[None]:
+        # Файл крупнее всего бюджета ждет, пока остальные загрузки не завершатся
+        size = min(size, self.capacity)
+
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight + size <= self.capacity)
+            self.in_flight += size
+
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= size
+                self._condition.notify_all()
+
+
+@dataclass(frozen=True)
+class StoredMedia:
+    """Файл в контентно-адресуемом хранилище"""
+    path: str
+    sha256: str
+    size: int
+    # Расширение исходного файла; в путь хранилища не входит
+    file_ext: str = ""
+
+
+@dataclass
+class DeliveryStats:
+    """Счетчики отправки медиафайлов в Discord"""
+    uploaded_files: int = 0
+    uploaded_bytes: int = 0
+    reused_refs: int = 0
+
+
 class MediaUtils:
-    def __init__(self, media_dir: str = "media"):
+    def __init__(self, media_dir: str = "media",
+                 max_size: int = Env.MEDIA_MAX_BYTES,
+                 inflight_bytes: int = Env.MEDIA_INFLIGHT_BYTES,
+                 metrics: Optional["Metrics"] = None):
         """Инициализация утилит для работы с медиафайлами
         
         Args:
             media_dir (str): Директория для хранения медиафайлов
+            max_size (int): Максимальный размер одного файла в байтах
+            inflight_bytes (int): Сколько байт всего может скачиваться одновременно
+            metrics (Metrics): Учет объема и длительности скачиваний
         """
         self.media_dir = media_dir
-        if not os.path.exists(self.media_dir):
-            os.makedirs(self.media_dir)
+        self.tmp_dir = os.path.join(self.media_dir, "tmp")
+        self.max_size = max_size
+        self.budget = ByteBudget(inflight_bytes)
+        self.retries = Env.MEDIA_HTTP_RETRIES
+        self.retry_backoff = Env.MEDIA_HTTP_RETRY_BACKOFF
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.delivery_stats = DeliveryStats()
+        self.metrics = metrics
+        self.images = ImagePipeline(os.path.join(self.media_dir, "variants"), Env.IMAGE_WORKERS, Env.CLUSTER_COUNT)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    async def start(self) -> None:
+        """Создает общую HTTP-сессию с пулом keep-alive соединений к CDN и пул кодирования изображений"""
+        self.images.start()
 
-    async def download_media(self, url: str, project_id: int) -> str:
-        """Скачивает медиафайл и возвращает локальный путь
+        if self.session is not None:
+            return
+
+        connector = aiohttp.TCPConnector(
+            limit=Env.MEDIA_HTTP_LIMIT,
+            limit_per_host=Env.MEDIA_HTTP_LIMIT_PER_HOST,
+            ttl_dns_cache=Env.MEDIA_HTTP_DNS_TTL,
+            keepalive_timeout=Env.MEDIA_HTTP_KEEPALIVE
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=Env.MEDIA_HTTP_TIMEOUT,
+            connect=Env.MEDIA_HTTP_CONNECT_TIMEOUT,
+            sock_read=Env.MEDIA_HTTP_READ_TIMEOUT
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    async def close(self) -> None:
+        """Закрывает HTTP-сессию и пул кодирования изображений"""
+        self.images.close()
+
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def blob_path(self, sha256: str) -> str:
+        """Путь к файлу в хранилище: media/ab/cd/abcd...
+
+        Путь зависит только от содержимого, иначе одни и те же байты с разными
+        расширениями хранились бы дважды. Расширение хранится в записи `Media`.
+        """
+        return os.path.join(self.media_dir, sha256[:2], sha256[2:4], sha256)
+
+    def _commit_blob(self, tmp_path: str, sha256: str, size: int, file_ext: str) -> StoredMedia:
+        """Переносит временный файл в хранилище; одинаковое содержимое хранится один раз"""
+        filepath = self.blob_path(sha256)
+
+        if os.path.exists(filepath):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+            os.replace(tmp_path, filepath)
+
+        return StoredMedia(path=filepath, sha256=sha256, size=size, file_ext=file_ext)
+
+    @staticmethod
+    def _write_chunk(f: BinaryIO, hasher, chunk: bytes) -> None:
+        hasher.update(chunk)
+        f.write(chunk)
+
+    async def download_media(self, url: str) -> StoredMedia:
+        """Скачивает медиафайл в хранилище потоково, считая SHA-256 по мере загрузки
+        
+        Файл пишется по частям во временный файл вне event loop и атомарно
+        переименовывается в хранилище после успешной загрузки.
         
         Args:
             url (str): URL медиафайла
-            project_id (int): ID проекта
             
         Returns:
-            str: Локальный путь к скачанному файлу
+            StoredMedia: Путь, хэш, размер и расширение сохраненного файла
             
         Raises:
+            MediaTooLargeError: Если файл больше `max_size`
             Exception: При ошибке скачивания файла
         """
+        if self.session is None:
+            raise RuntimeError("HTTP-сессия не создана, вызовите MediaUtils.start()")
+
+        started_at = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                stored = await self._download_once(url)
+                if self.metrics is not None:
+                    self.metrics.observe_download(stored.size, time.perf_counter() - started_at)
+                return stored
+            except Exception as e:
+                if attempt >= self.retries or not self._is_retryable(e):
+                    logger.error(f"Ошибка при скачивании медиафайла: {str(e)}")
+                    if self.metrics is not None:
+                        self.metrics.observe_download(0, time.perf_counter() - started_at, ok=False)
+                    raise
+
+                attempt += 1
+                logger.warning(f"Повтор скачивания медиафайла ({attempt}/{self.retries}): {str(e)}")
+                await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Повторяются только сетевые ошибки, таймауты и ответы 429/5xx"""
+        if isinstance(error, aiohttp.ClientResponseError):
+            return error.status == 429 or error.status >= 500
+        return isinstance(error, (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError))
+
+    async def _download_once(self, url: str) -> StoredMedia:
+        async with self.session.get(url) as response:
+            response.raise_for_status()
+
+            if response.content_length is not None and response.content_length > self.max_size:
+                raise MediaTooLargeError(response.content_length, self.max_size)
+
+            # Получаем расширение файла из URL
+            parsed_url = urlparse(url)
+            file_ext = os.path.splitext(parsed_url.path)[1]
+            if not file_ext:
+                content_type = response.headers.get('content-type', '')
+                if 'image' in content_type:
+                    file_ext = '.png'
+                elif 'video' in content_type:
+                    file_ext = '.mp4'
+                else:
+                    file_ext = '.bin'
+
+            async with self.budget.reserve(response.content_length or self.max_size):
+                return await self._stream_to_store(response, file_ext)
+
+    async def _stream_to_store(self, response: aiohttp.ClientResponse, file_ext: str) -> StoredMedia:
+        hasher = hashlib.sha256()
+        size = 0
+        fd, tmp_path = await asyncio.to_thread(tempfile.mkstemp, dir=self.tmp_dir)
+        f = os.fdopen(fd, 'wb')
+
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        # Получаем расширение файла из URL
-                        parsed_url = urlparse(url)
-                        file_ext = os.path.splitext(parsed_url.path)[1]
-                        if not file_ext:
-                            content_type = response.headers.get('content-type', '')
-                            if 'image' in content_type:
-                                file_ext = '.png'
-                            elif 'video' in content_type:
-                                file_ext = '.mp4'
-                            else:
-                                file_ext = '.bin'
-
-                        # Создаем уникальное имя файла
-                        filename = f"{project_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}{file_ext}"
-                        filepath = os.path.join(self.media_dir, filename)
-
-                        # Сохраняем файл
-                        with open(filepath, 'wb') as f:
-                            f.write(await response.read())
-                        
-                        return filepath
-        except Exception as e:
-            logger.error(f"Ошибка при скачивании медиафайла: {str(e)}")
+            try:
+                async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_size:
+                        raise MediaTooLargeError(size, self.max_size)
+
+                    await asyncio.to_thread(self._write_chunk, f, hasher, chunk)
+            finally:
+                await asyncio.to_thread(f.close)
+
+            return await asyncio.to_thread(self._commit_blob, tmp_path, hasher.hexdigest(), size, file_ext)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             raise
 
+    def import_file(self, path: str) -> StoredMedia:
+        """Переносит существующий локальный файл в хранилище"""
+        hasher = hashlib.sha256()
+        size = 0
+
+        with open(path, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                hasher.update(chunk)
+                size += len(chunk)
+
+        return self._commit_blob(path, hasher.hexdigest(), size, os.path.splitext(path)[1])
+
+    def remove_file(self, path: str) -> None:
+        """Удаляет файл из хранилища"""
+        if os.path.exists(path):
+            os.remove(path)
+
+    async def remove_files(self, paths: List[str]) -> None:
+        """Удаляет файлы из хранилища вне event loop"""
+        if paths:
+            await asyncio.to_thread(lambda: [self.remove_file(path) for path in paths])
+
+    async def create_variants(self, path: str, sha256: str) -> List[ImageVariant]:
+        """Создает сжатые варианты изображения в пуле процессов"""
+        return await self.images.create_variants(path, sha256)
+
+    @staticmethod
+    def display_path(media) -> str:
+        """Наименьший файл, пригодный для показа в /preview: вариант или оригинал"""
+        adequate = [
+            variant for variant in getattr(media, 'variants', None) or []
+            if max(variant.width, variant.height) >= BotConfig.PREVIEW_MIN_SIDE and os.path.exists(variant.url)
+        ]
+
+        if adequate:
+            return min(adequate, key=lambda variant: variant.size).url
+
+        return media.url
+
+    @staticmethod
+    def file_name(media, path: Optional[str] = None) -> str:
+        """Имя файла для Discord: к пути хранилища без расширения добавляется расширение записи"""
+        name = os.path.basename(path or media.url)
+        if not os.path.splitext(name)[1] and getattr(media, 'file_ext', None):
+            name += media.file_ext
+        return name
+
+    def _move_blob(self, old_path: str, sha256: str) -> str:
+        """Переносит файл хранилища с расширением в имени на путь по одному хэшу"""
+        path = self.blob_path(sha256)
+
+        if os.path.exists(old_path):
+            if os.path.exists(path):
+                os.remove(old_path)
+            else:
+                os.replace(old_path, path)
+
+        return path
+
+    async def migrate_media_store(self, db: "Database") -> None:
+        """Переносит файлы, сохраненные по старым схемам, в хранилище
+
+        Файлы по схеме `{project_id}_{timestamp}` хэшируются; несколько записей
+        могут ссылаться на один старый путь (совпавшие метки времени): файл
+        переносится один раз, и к нему привязываются все они. Файлы хранилища с
+        расширением в имени переименовываются в путь по одному хэшу; повторный
+        запуск после сбоя между переносом файла и записью в базу безопасен.
+        """
+        for old_path, sha256 in await db.get_suffixed_blobs():
+            try:
+                path = await asyncio.to_thread(self._move_blob, old_path, sha256)
+                await db.move_media_blob(old_path, path, sha256)
+            except Exception as e:
+                logger.error(f"Ошибка при переносе файла хранилища {old_path}: {str(e)}")
+
+        paths = {media.url for media in await db.get_unhashed_media()}
+
+        for path in sorted(paths):
+            if not os.path.exists(path):
+                logger.warning(f"Медиафайл {path} не найден, пропускаем")
+                continue
+
+            try:
+                stored = await asyncio.to_thread(self.import_file, path)
+                await db.set_media_blob(path, stored.path, stored.sha256)
+            except Exception as e:
+                logger.error(f"Ошибка при переносе медиафайла {path}: {str(e)}")
+
+    @staticmethod
+    def parse_cdn_expiry(url: str) -> datetime:
+        """Срок действия ссылки CDN Discord из параметра `ex` (unix-время в hex)"""
+        expiry = parse_qs(urlparse(url).query).get('ex')
+
+        if expiry:
+            try:
+                return datetime.utcfromtimestamp(int(expiry[0], 16))
+            except ValueError:
+                pass
+
+        return datetime.utcnow() + timedelta(seconds=BotConfig.CDN_URL_DEFAULT_TTL)
+
+    @staticmethod
+    def cdn_reference(media) -> Optional[str]:
+        """Ссылка CDN, которую еще можно отправить вместо повторной загрузки файла"""
+        if not media.cdn_url or not media.cdn_expires_at:
+            return None
+
+        refresh_at = media.cdn_expires_at - timedelta(seconds=BotConfig.CDN_URL_REFRESH_MARGIN)
+        return media.cdn_url if datetime.utcnow() < refresh_at else None
+
+    def record_upload(self, path: str) -> None:
+        self.delivery_stats.uploaded_files += 1
+        self.delivery_stats.uploaded_bytes += os.path.getsize(path)
+
+    def record_reuse(self, count: int = 1) -> None:
+        self.delivery_stats.reused_refs += count
+
     @staticmethod
     def get_media_type(content_type: Optional[str]) -> Optional[str]:
         """Определяет тип медиафайла по content-type
@@ -77,4 +378,4 @@ class MediaUtils:
             return 'image'
         elif 'video' in content_type:
             return 'video'
-        return None 
\ No newline at end of file
+        return None
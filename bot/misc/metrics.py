@@ -0,0 +1,244 @@
+import bisect
+import logging
+import time
+from dataclasses import asdict, is_dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Any
+
+from aiohttp import web
+from nextcord.ext.commands import Context
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм в секундах
+COMMAND_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+DOWNLOAD_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PREFIX = "portfolio"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами, как в Prometheus"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Оценка квантиля линейной интерполяцией внутри корзины"""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if seen + count >= rank and count:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+
+        return self.buckets[-1]
+
+    def merge(self, other: "Histogram") -> None:
+        """Добавляет наблюдения гистограммы с теми же корзинами"""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Накопленные счетчики по корзинам в формате Prometheus (le, count)"""
+        result, total = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((repr(bound), total))
+        result.append(("+Inf", self.count))
+        return result
+
+
+class Metrics:
+    """Метрики процесса: задержки команд, запросы к БД, скачивания медиафайлов.
+
+    Счетчики других сервисов (кэш, очереди, лимитер) подключаются через
+    `register_collector` и читаются в момент выгрузки.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self.buckets: Dict[str, Sequence[float]] = {
+            'command_latency_seconds': COMMAND_BUCKETS,
+            'db_statement_seconds': DB_BUCKETS,
+            'media_download_seconds': DOWNLOAD_BUCKETS,
+        }
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self._collectors: Dict[str, Callable[[], Any]] = {}
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        series = self.histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram(self.buckets[name])
+        histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        series = self.counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def register_collector(self, name: str, collector: Callable[[], Any]) -> None:
+        """Подключает источник значений: словарь `stats()` или dataclass со счетчиками"""
+        self._collectors[name] = collector
+
+    def collect(self) -> Dict[str, Dict[str, float]]:
+        collected = {}
+        for name, collector in self._collectors.items():
+            try:
+                values = collector()
+                if is_dataclass(values):
+                    values = asdict(values)
+                collected[name] = {
+                    key: float(value) for key, value in values.items() if isinstance(value, (int, float))
+                }
+            except Exception as e:
+                logger.error(f"Ошибка при сборе метрик {name}: {str(e)}")
+        return collected
+
+    # Команды
+    async def before_invoke(self, ctx: Context) -> None:
+        ctx.metrics_started_at = time.perf_counter()
+
+    async def after_invoke(self, ctx: Context) -> None:
+        started_at = getattr(ctx, 'metrics_started_at', None)
+        if started_at is None:
+            return
+
+        self.observe(
+            'command_latency_seconds',
+            time.perf_counter() - started_at,
+            command=ctx.command.qualified_name,
+            status='error' if ctx.command_failed else 'ok'
+        )
+
+    # База данных
+    def instrument_engine(self, engine: AsyncEngine) -> None:
+        """Замеряет каждый SQL-запрос движка"""
+        sync_engine = engine.sync_engine
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('metrics_started_at', []).append(time.perf_counter())
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started_at = conn.info['metrics_started_at'].pop()
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+            self.observe('db_statement_seconds', time.perf_counter() - started_at, operation=operation)
+
+        def handle_error(exception_context):
+            conn = exception_context.connection
+            if conn is not None and conn.info.get('metrics_started_at'):
+                conn.info['metrics_started_at'].pop()
+            self.inc('db_errors_total')
+
+        event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(sync_engine, "handle_error", handle_error)
+
+    # Медиафайлы
+    def observe_download(self, size: int, seconds: float, ok: bool = True) -> None:
+        status = 'ok' if ok else 'error'
+        self.observe('media_download_seconds', seconds, status=status)
+        self.inc('media_download_bytes_total', size, status=status)
+
+    # Выгрузка
+    @staticmethod
+    def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(labels) + ([extra] if extra else [])
+        if not pairs:
+            return ""
+
+        def escape(value: str) -> str:
+            return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        return "{" + ",".join(f'{key}="{escape(str(value))}"' for key, value in pairs) + "}"
+
+    def render_prometheus(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+
+        for name, series in sorted(self.histograms.items()):
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, histogram in sorted(series.items()):
+                for bound, count in histogram.cumulative():
+                    lines.append(f"{metric}_bucket{self._format_labels(labels, ('le', bound))} {count}")
+                lines.append(f"{metric}_sum{self._format_labels(labels)} {histogram.sum}")
+                lines.append(f"{metric}_count{self._format_labels(labels)} {histogram.count}")
+
+        for name, series in sorted(self.counters.items()):
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# TYPE {metric} counter")
+            for labels, value in sorted(series.items()):
+                lines.append(f"{metric}{self._format_labels(labels)} {value}")
+
+        for source, values in sorted(self.collect().items()):
+            for key, value in sorted(values.items()):
+                metric = f"{PREFIX}_{source}_{key}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def command_summary(self) -> List[Tuple[str, int, float, float]]:
+        """(команда, вызовов, p50, p99) по всем статусам, самые медленные по p99 первыми"""
+        merged: Dict[str, Histogram] = {}
+        for labels, histogram in self.histograms.get('command_latency_seconds', {}).items():
+            command = dict(labels)['command']
+            merged.setdefault(command, Histogram(COMMAND_BUCKETS)).merge(histogram)
+
+        rows = [(command, h.count, h.quantile(0.5), h.quantile(0.99)) for command, h in merged.items()]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+    def db_summary(self) -> Tuple[int, float, float]:
+        """(запросов, среднее время, p99) по всем операциям"""
+        total = Histogram(DB_BUCKETS)
+        for histogram in self.histograms.get('db_statement_seconds', {}).values():
+            total.merge(histogram)
+
+        return total.count, (total.sum / total.count if total.count else 0.0), total.quantile(0.99)
+
+
+class MetricsServer:
+    """Локальный HTTP-сервер с `/metrics` для Prometheus"""
+
+    def __init__(self, metrics: Metrics, host: str, port: int):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.metrics.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Метрики доступны на http://{self.host}:{self.port}/metrics")
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
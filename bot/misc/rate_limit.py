@@ -0,0 +1,125 @@
+import math
+import time
+from typing import Dict, Tuple, Optional
+
+from nextcord.ext.commands import Context, CheckFailure
+
+from bot.misc.config import BotConfig
+from bot.misc.env import Env
+
+
+class RateLimited(CheckFailure):
+    """Команда отклонена ограничителем частоты"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Слишком много запросов, повторите через {retry_after:.1f} с")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Набор token bucket'ов с общими параметрами, ключ — id пользователя или сервера.
+
+    Бакет хранится кортежем (токены, время обновления). Бакет, простоявший
+    достаточно долго, чтобы снова наполниться, неотличим от нового и удаляется.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float, sweep_interval: float = 60.0):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.sweep_interval = sweep_interval
+        self._buckets: Dict[int, Tuple[float, float]] = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _tokens(self, key: int, now: float) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return self.capacity
+
+        tokens, updated_at = bucket
+        return min(self.capacity, tokens + (now - updated_at) * self.refill_rate)
+
+    def retry_after(self, key: int, cost: float, now: float) -> float:
+        """Через сколько секунд в бакете наберется `cost` токенов (0 — уже набралось)"""
+        cost = min(cost, self.capacity)
+        missing = cost - self._tokens(key, now)
+        return max(0.0, missing / self.refill_rate)
+
+    def consume(self, key: int, cost: float, now: float) -> None:
+        cost = min(cost, self.capacity)
+        self._buckets[key] = (self._tokens(key, now) - cost, now)
+        self._maybe_sweep(now)
+
+    def _maybe_sweep(self, now: float) -> None:
+        if now < self._next_sweep:
+            return
+
+        self._next_sweep = now + self.sweep_interval
+        idle = [key for key in self._buckets if self._tokens(key, now) >= self.capacity]
+        for key in idle:
+            del self._buckets[key]
+        self.evictions += len(idle)
+
+
+class CommandRateLimiter:
+    """Ограничение частоты дорогих команд по пользователю и по серверу.
+
+    Стоимость команды берется из `BotConfig.COMMAND_COSTS`; для `add-media`
+    к ней добавляется вес по объему вложений.
+    """
+
+    def __init__(self):
+        self.users = TokenBucket(Env.RATE_LIMIT_USER_CAPACITY, Env.RATE_LIMIT_USER_REFILL)
+        self.guilds = TokenBucket(Env.RATE_LIMIT_GUILD_CAPACITY, Env.RATE_LIMIT_GUILD_REFILL)
+        self.throttled = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'throttled': self.throttled,
+            'user_buckets': len(self.users),
+            'guild_buckets': len(self.guilds),
+            'evictions': self.users.evictions + self.guilds.evictions,
+        }
+
+    @staticmethod
+    def command_cost(ctx: Context) -> float:
+        cost = BotConfig.COMMAND_COSTS.get(ctx.command.qualified_name, 0)
+
+        if ctx.command.qualified_name == 'add-media':
+            attachment_bytes = sum(attachment.size for attachment in ctx.message.attachments)
+            cost += math.ceil(attachment_bytes / (1024 * 1024)) * BotConfig.MEDIA_COST_PER_MB
+
+        return cost
+
+    def acquire(self, user_id: int, guild_id: Optional[int], cost: float) -> float:
+        """Списывает токены у пользователя и сервера; возвращает время ожидания, если их не хватает"""
+        now = time.monotonic()
+
+        retry_after = self.users.retry_after(user_id, cost, now)
+        if guild_id is not None:
+            retry_after = max(retry_after, self.guilds.retry_after(guild_id, cost, now))
+
+        if retry_after > 0:
+            self.throttled += 1
+            return retry_after
+
+        self.users.consume(user_id, cost, now)
+        if guild_id is not None:
+            self.guilds.consume(guild_id, cost, now)
+
+        return 0.0
+
+    async def check(self, ctx: Context) -> bool:
+        """Глобальная проверка команд бота (`Bot.add_check`)"""
+        cost = self.command_cost(ctx)
+        if not cost:
+            return True
+
+        retry_after = self.acquire(ctx.author.id, ctx.guild.id if ctx.guild else None, cost)
+        if retry_after:
+            raise RateLimited(retry_after)
+
+        return True
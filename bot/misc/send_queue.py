@@ -0,0 +1,224 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Any
+
+from nextcord import Embed, File, Message
+from nextcord.abc import Messageable
+from nextcord.ui import View
+
+from bot.misc.config import BotConfig
+from bot.misc.env import Env
+from bot.misc.embeds.portfolio import MAX_EMBEDS_PER_MESSAGE, MAX_EMBED_CHARS_PER_MESSAGE, MAX_CONTENT_LENGTH
+
+
+@dataclass
+class OutboundMessage:
+    """Сообщение в очереди канала; `future` получает отправленное сообщение"""
+    target: Messageable
+    content: Optional[str]
+    embeds: List[Embed]
+    files: List[File]
+    view: Optional[View]
+    future: asyncio.Future
+    # False для сообщений, которые потом редактируются целиком
+    merge: bool = True
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def mergeable(self) -> bool:
+        """Только текст и эмбеды можно склеивать с соседними сообщениями"""
+        return self.merge and not self.files and self.view is None
+
+    def embed_chars(self) -> int:
+        return sum(len(embed) for embed in self.embeds)
+
+
+class ChannelQueue:
+    """Очередь исходящих сообщений одного канала со скользящим окном лимита"""
+
+    def __init__(self, max_depth: int, limit: int, window: float):
+        self.pending: Deque[OutboundMessage] = deque()
+        self.slots = asyncio.Semaphore(max_depth)
+        self.ready = asyncio.Event()
+        self.limit = limit
+        self.window = window
+        self.sent_at: Deque[float] = deque(maxlen=limit)
+        self.worker: Optional[asyncio.Task] = None
+
+    def delay(self, now: float) -> float:
+        """Сколько ждать до следующей отправки, чтобы не выйти за лимит канала"""
+        if len(self.sent_at) < self.limit:
+            return 0.0
+        return max(0.0, self.sent_at[0] + self.window - now)
+
+    def take_batch(self) -> List[OutboundMessage]:
+        """Забирает первое сообщение и склеивает с ним следующие, пока это укладывается в лимиты Discord"""
+        batch = [self.pending.popleft()]
+        if not batch[0].mergeable:
+            return batch
+
+        embeds = len(batch[0].embeds)
+        embed_chars = batch[0].embed_chars()
+        content = len(batch[0].content or "")
+
+        while self.pending and self.pending[0].mergeable:
+            item = self.pending[0]
+            item_content = len(item.content or "")
+            separator = 1 if content and item_content else 0
+
+            if (embeds + len(item.embeds) > MAX_EMBEDS_PER_MESSAGE
+                    or embed_chars + item.embed_chars() > MAX_EMBED_CHARS_PER_MESSAGE
+                    or content + separator + item_content > MAX_CONTENT_LENGTH):
+                break
+
+            embeds += len(item.embeds)
+            embed_chars += item.embed_chars()
+            content += separator + item_content
+            batch.append(self.pending.popleft())
+
+        return batch
+
+
+class SendQueue:
+    """Исходящие сообщения с учетом лимитов Discord на канал.
+
+    Отправки в один канал выполняются по очереди не чаще `CHANNEL_SEND_LIMIT`
+    за `CHANNEL_SEND_WINDOW` секунд, поэтому серии ответов не упираются в 429.
+    Соседние сообщения без файлов и кнопок склеиваются в одно. Когда в очереди
+    канала `SEND_QUEUE_MAX_DEPTH` сообщений, `send` ждет освобождения места.
+    """
+
+    def __init__(self, max_depth: int = Env.SEND_QUEUE_MAX_DEPTH,
+                 limit: int = BotConfig.CHANNEL_SEND_LIMIT, window: float = BotConfig.CHANNEL_SEND_WINDOW):
+        self.max_depth = max_depth
+        self.limit = limit
+        self.window = window
+        self.channels: Dict[int, ChannelQueue] = {}
+        self.sent = 0
+        self.merged = 0
+        self.peak_depth = 0
+        self.rate_limit_wait = 0.0
+        self.queue_wait = 0.0
+
+    @staticmethod
+    def _channel_id(target: Messageable) -> int:
+        channel = getattr(target, 'channel', target)
+        return channel.id
+
+    async def send(self, target: Messageable, content: Optional[str] = None, *,
+                   embed: Optional[Embed] = None, embeds: Optional[List[Embed]] = None,
+                   files: Optional[List[File]] = None, view: Optional[View] = None, merge: bool = True) -> Message:
+        """Ставит сообщение в очередь канала и ждет его отправки
+
+        Args:
+            merge: Разрешить склеивать сообщение с соседними; отключается для
+                сообщений, которые потом заменяются через edit
+
+        Returns:
+            Отправленное сообщение; у склеенных сообщений оно общее
+        """
+        channel_id = self._channel_id(target)
+
+        while True:
+            queue = self.channels.get(channel_id)
+            if queue is None:
+                queue = self.channels[channel_id] = ChannelQueue(self.max_depth, self.limit, self.window)
+
+            await queue.slots.acquire()
+            # Пока ждали место, простаивавшая очередь могла быть удалена
+            if self.channels.get(channel_id) is queue:
+                break
+            queue.slots.release()
+
+        item = OutboundMessage(
+            target=target,
+            content=content,
+            embeds=[embed] if embed is not None else list(embeds or []),
+            files=list(files or []),
+            view=view,
+            future=asyncio.get_running_loop().create_future(),
+            merge=merge
+        )
+        queue.pending.append(item)
+        queue.ready.set()
+        self.peak_depth = max(self.peak_depth, len(queue.pending))
+
+        if queue.worker is None or queue.worker.done():
+            queue.worker = asyncio.create_task(self._drain(channel_id, queue))
+
+        return await item.future
+
+    async def _drain(self, channel_id: int, queue: ChannelQueue) -> None:
+        while True:
+            if not queue.pending:
+                queue.ready.clear()
+                try:
+                    # Очередь канала держится, пока его окно лимита не истечет
+                    await asyncio.wait_for(queue.ready.wait(), timeout=queue.window)
+                except asyncio.TimeoutError:
+                    if not queue.pending:
+                        self.channels.pop(channel_id, None)
+                        return
+                continue
+
+            delay = queue.delay(time.monotonic())
+            if delay:
+                self.rate_limit_wait += delay
+                await asyncio.sleep(delay)
+
+            batch = queue.take_batch()
+            await self._send_batch(batch)
+            queue.sent_at.append(time.monotonic())
+
+            for _ in batch:
+                queue.slots.release()
+
+    async def _send_batch(self, batch: List[OutboundMessage]) -> None:
+        first = batch[0]
+        now = time.monotonic()
+        self.queue_wait += sum(now - item.enqueued_at for item in batch)
+
+        contents = [item.content for item in batch if item.content]
+        embeds = [embed for item in batch for embed in item.embeds]
+
+        try:
+            message = await first.target.send(
+                content="\n".join(contents) or None,
+                embeds=embeds or None,
+                files=first.files or None,
+                view=first.view
+            )
+        except Exception as e:
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        self.sent += 1
+        self.merged += len(batch) - 1
+        for item in batch:
+            if not item.future.done():
+                item.future.set_result(message)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики очередей: текущая и пиковая глубина, ожидание лимитов и очереди"""
+        return {
+            'channels': len(self.channels),
+            'depth': sum(len(queue.pending) for queue in self.channels.values()),
+            'peak_depth': self.peak_depth,
+            'sent': self.sent,
+            'merged': self.merged,
+            'rate_limit_wait': self.rate_limit_wait,
+            'queue_wait': self.queue_wait,
+        }
+
+    async def close(self) -> None:
+        """Останавливает обработчики; неотправленные сообщения отменяются"""
+        for queue in self.channels.values():
+            if queue.worker is not None:
+                queue.worker.cancel()
+            for item in queue.pending:
+                item.future.cancel()
+        self.channels.clear()
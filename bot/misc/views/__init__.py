@@ -0,0 +1,5 @@
+from .registry import ViewRegistry
+from .portfolio import PortfolioView
+from .media import MediaRemoveView
+
+__all__ = ['ViewRegistry', 'PortfolioView', 'MediaRemoveView']
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+import nextcord
+from nextcord import Interaction, Message, SelectOption
+from nextcord.ui import View, Select
+
+from bot.misc.embeds.projects import ProjectEmbeds
+from bot.misc.media_utils import MediaUtils
+from .registry import ViewRegistry
+
+# Ограничение Discord на число вариантов в одном меню
+MAX_SELECT_OPTIONS = 25
+
+
+class MediaRemoveView(View):
+    """Меню выбора медиафайлов для удаления.
+
+    Discord доставляет выбор прямо в это view по custom_id меню, поэтому
+    ожидающие удаления не проверяют каждое сообщение бота, как `wait_for`.
+    """
+
+    def __init__(self, author_id: int, media: list, registry: ViewRegistry,
+                 on_remove: Callable[[Interaction, List[int]], Awaitable[None]],
+                 timeout: float, custom_id: str):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.registry = registry
+        self.on_remove = on_remove
+        self.message: Optional[Message] = None
+
+        options = [
+            SelectOption(
+                label=f"{i}. {MediaUtils.file_name(m)}"[:100],
+                value=str(m.id),
+                description=f"Тип: {m.type}"
+            )
+            for i, m in enumerate(media[:MAX_SELECT_OPTIONS], 1)
+        ]
+        self.select = Select(
+            custom_id=custom_id,
+            placeholder="Выберите файлы для удаления",
+            min_values=1,
+            max_values=len(options),
+            options=options
+        )
+        self.select.callback = self._on_select
+        self.add_item(self.select)
+
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        if interaction.user.id == self.author_id:
+            return True
+
+        await interaction.response.send_message(
+            embed=ProjectEmbeds.generic_error("Удалять файлы может только владелец проекта."),
+            ephemeral=True
+        )
+        return False
+
+    async def _on_select(self, interaction: Interaction) -> None:
+        # Сообщение с меню правит `on_remove`
+        self._close()
+        await self.on_remove(interaction, [int(value) for value in self.select.values])
+
+    def _close(self) -> None:
+        super().stop()
+        self.registry.discard(self)
+
+    async def _expire(self, reason: str) -> None:
+        if self.message is not None:
+            try:
+                await self.message.edit(embed=ProjectEmbeds.generic_error(reason), view=None)
+            except nextcord.HTTPException:
+                pass
+
+    def stop(self) -> None:
+        """Останавливает view (в том числе при вытеснении из реестра) и убирает меню из сообщения"""
+        self._close()
+        asyncio.create_task(self._expire("Меню удаления устарело. Вызовите команду еще раз."))
+
+    async def on_timeout(self) -> None:
+        self.registry.discard(self)
+        await self._expire("Вы не выбрали файл для удаления.")
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+import nextcord
+from nextcord import Interaction, Message, ButtonStyle
+from nextcord.ui import View, Button, button
+
+from bot.misc.embeds.portfolio import PortfolioMessage
+from bot.misc.embeds.projects import ProjectEmbeds
+from .registry import ViewRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioView(View):
+    """Постраничный просмотр: один проект портфолио, страница поиска или категории.
+
+    Данные и медиафайлы страницы запрашиваются только при переходе на нее.
+    Страница может не поместиться в одно сообщение (у проекта много
+    медиафайлов): ее части листаются кнопками второго ряда без повторного
+    запроса к базе.
+    """
+
+    def __init__(self, author_id: int, total: int, registry: ViewRegistry,
+                 render_page: Callable[[int], Awaitable[Optional[List[PortfolioMessage]]]],
+                 send_page: Callable[..., Awaitable[Message]],
+                 timeout: float, parts: List[PortfolioMessage]):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.total = total
+        self.page = 0
+        self.part = 0
+        # Сообщения текущей страницы; уже отправленное сообщение `parts[part]`
+        self.parts = parts
+        self.registry = registry
+        self.render_page = render_page
+        self.send_page = send_page
+        self.message: Optional[Message] = None
+
+        if total == 1:
+            # Единственный проект с несколькими частями: листаются только части
+            for item in (self.previous_page, self.counter, self.next_page):
+                self.remove_item(item)
+        self._update_buttons()
+
+    def _update_buttons(self) -> None:
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= self.total - 1
+        self.counter.label = f"{self.page + 1}/{self.total}"
+
+        # Кнопки частей показываются, только если страница не уместилась в одно сообщение
+        part_buttons = (self.previous_part, self.part_counter, self.next_part)
+        for item in part_buttons:
+            self.remove_item(item)
+        if len(self.parts) > 1:
+            for item in part_buttons:
+                self.add_item(item)
+
+        self.previous_part.disabled = self.part <= 0
+        self.next_part.disabled = self.part >= len(self.parts) - 1
+        self.part_counter.label = f"Часть {self.part + 1}/{len(self.parts)}"
+
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        if interaction.user.id == self.author_id:
+            return True
+
+        await interaction.response.send_message(
+            embed=ProjectEmbeds.generic_error("Листать страницы может только тот, кто их открыл."),
+            ephemeral=True
+        )
+        return False
+
+    async def _show(self, interaction: Interaction, page: int) -> None:
+        await interaction.response.defer()
+
+        parts = await self.render_page(page)
+        if not parts:
+            # Проект удалили (или результаты поиска и категории изменились), пока страница была открыта
+            self.stop()
+            return
+
+        self.page = page
+        self.parts = parts
+        await self._send_part(interaction, 0)
+
+    async def _show_part(self, interaction: Interaction, part: int) -> None:
+        await interaction.response.defer()
+        await self._send_part(interaction, part)
+
+    async def _send_part(self, interaction: Interaction, part: int) -> None:
+        self.part = part
+        self._update_buttons()
+
+        try:
+            self.message = await self.send_page(self.parts[part], view=self, message=interaction.message)
+        except Exception as e:
+            logger.error(f"Ошибка при переключении страницы портфолио: {str(e)}")
+
+    @button(emoji="◀️", style=ButtonStyle.secondary)
+    async def previous_page(self, _: Button, interaction: Interaction) -> None:
+        await self._show(interaction, self.page - 1)
+
+    @button(label="1/1", style=ButtonStyle.secondary, disabled=True)
+    async def counter(self, _: Button, interaction: Interaction) -> None:
+        pass
+
+    @button(emoji="▶️", style=ButtonStyle.secondary)
+    async def next_page(self, _: Button, interaction: Interaction) -> None:
+        await self._show(interaction, self.page + 1)
+
+    @button(emoji="⏪", style=ButtonStyle.secondary, row=1)
+    async def previous_part(self, _: Button, interaction: Interaction) -> None:
+        await self._show_part(interaction, self.part - 1)
+
+    @button(label="Часть 1/1", style=ButtonStyle.secondary, disabled=True, row=1)
+    async def part_counter(self, _: Button, interaction: Interaction) -> None:
+        pass
+
+    @button(emoji="⏩", style=ButtonStyle.secondary, row=1)
+    async def next_part(self, _: Button, interaction: Interaction) -> None:
+        await self._show_part(interaction, self.part + 1)
+
+    async def _remove_buttons(self) -> None:
+        if self.message is not None:
+            try:
+                await self.message.edit(view=None)
+            except nextcord.HTTPException:
+                pass
+
+    def stop(self) -> None:
+        """Останавливает view (в том числе при вытеснении из реестра) и убирает кнопки"""
+        super().stop()
+        self.registry.discard(self)
+        asyncio.create_task(self._remove_buttons())
+
+    async def on_timeout(self) -> None:
+        self.registry.discard(self)
+        await self._remove_buttons()
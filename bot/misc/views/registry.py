@@ -0,0 +1,33 @@
+from collections import OrderedDict
+from typing import Dict
+
+from nextcord.ui import View
+
+
+class ViewRegistry:
+    """Ограничивает число одновременно живых интерактивных view в процессе.
+
+    При превышении лимита самое старое view останавливается.
+    """
+
+    def __init__(self, max_views: int):
+        self.max_views = max_views
+        self._views: "OrderedDict[int, View]" = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._views)
+
+    def add(self, view: View) -> None:
+        self._views[id(view)] = view
+
+        while len(self._views) > self.max_views:
+            _, oldest = self._views.popitem(last=False)
+            oldest.stop()
+            self.evictions += 1
+
+    def discard(self, view: View) -> None:
+        self._views.pop(id(view), None)
+
+    def stats(self) -> Dict[str, int]:
+        return {'live': len(self._views), 'evictions': self.evictions}
@@ -1,4 +1,8 @@
-from bot import start_bot
+from bot import start_bot, launch_cluster
+from bot.misc import Env
 
 if __name__ == '__main__':
-    start_bot()
+    if Env.CLUSTER_COUNT > 1:
+        launch_cluster()
+    else:
+        start_bot()
@@ -0,0 +1,37 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+import pytest
+
+from bot.database import Database, Media, create_db_engine
+
+
+@pytest.fixture
+def database(tmp_path) -> Callable[[], AsyncIterator[Database]]:
+    """Асинхронный контекст с `Database` на временной SQLite-базе
+
+    pytest-asyncio не используется: тест запускает свой сценарий через
+    `asyncio.run`, и движок создается и закрывается внутри того же цикла.
+    """
+    @asynccontextmanager
+    async def open_database(cache=None) -> AsyncIterator[Database]:
+        db = Database(create_db_engine(f"sqlite+aiosqlite:///{tmp_path / 'portfolio.db'}"), cache)
+        await db.init_models()
+        try:
+            yield db
+        finally:
+            await db.dispose()
+
+    return open_database
+
+
+async def add_media(db: Database, project_id: int, count: int, media_type: str = 'image') -> list[Media]:
+    """Добавляет медиафайлы проекту напрямую, минуя очередь загрузки"""
+    async with db.get_session() as session:
+        media = [
+            Media(project_id=project_id, url=f"media/{project_id}-{i}.png", type=media_type)
+            for i in range(count)
+        ]
+        session.add_all(media)
+        await session.commit()
+        return media
@@ -0,0 +1,105 @@
+import asyncio
+
+from sqlalchemy import event
+
+from tests.conftest import add_media
+
+USERS = (1001, 1002, 1003)
+
+
+async def _seed(db) -> list:
+    """Три пользователя по три проекта, по два медиафайла и две ссылки у каждого"""
+    projects = []
+    for discord_id in USERS:
+        for i in range(3):
+            result = await db.create_project_checked(discord_id, f"Проект {i}", "Дизайн", "Описание")
+            await add_media(db, result.project.id, 2)
+            projects.append(result.project)
+        await db.set_links(discord_id, [("https://example.com", "Сайт"), ("https://example.org", "Блог")])
+    return projects
+
+
+async def _collect(iterator) -> list:
+    return [row async for row in iterator]
+
+
+def test_iterators_walk_whole_tables(database):
+    async def scenario():
+        async with database() as db:
+            projects = await _seed(db)
+
+            for batch_size in (1, 2, 4, 100):
+                walked = await _collect(db.iter_projects(batch_size=batch_size))
+                assert [project.id for project in walked] == sorted(project.id for project in projects)
+
+            assert len(await _collect(db.iter_media(batch_size=4))) == 18
+            assert len(await _collect(db.iter_links(batch_size=4))) == 6
+
+    asyncio.run(scenario())
+
+
+def test_iterators_filter_by_owner(database):
+    async def scenario():
+        async with database() as db:
+            projects = await _seed(db)
+            owned = [project.id for project in projects if project.user_id == projects[3].user_id]
+
+            walked = await _collect(db.iter_projects(USERS[1], batch_size=2))
+            assert [project.id for project in walked] == owned
+
+            walked = await _collect(db.iter_media(projects[3].id, batch_size=1))
+            assert [media.project_id for media in walked] == [projects[3].id] * 2
+
+            walked = await _collect(db.iter_links(USERS[1], batch_size=1))
+            assert [link.user_id for link in walked] == [projects[3].user_id] * 2
+
+            assert await _collect(db.iter_projects(9999)) == []
+
+    asyncio.run(scenario())
+
+
+def test_batch_size_dividing_row_count(database):
+    async def scenario():
+        async with database() as db:
+            await _seed(db)
+
+            statements = []
+
+            def count(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith("SELECT"):
+                    statements.append(statement)
+
+            event.listen(db.engine.sync_engine, "before_cursor_execute", count)
+            try:
+                walked = await _collect(db.iter_projects(batch_size=3))
+            finally:
+                event.remove(db.engine.sync_engine, "before_cursor_execute", count)
+
+            # 9 строк пачками по 3: три полные пачки и пустая, которая завершает обход
+            assert len(walked) == 9
+            assert len({project.id for project in walked}) == 9
+            assert len(statements) == 4
+
+    asyncio.run(scenario())
+
+
+def test_early_exit_releases_session(database):
+    async def scenario():
+        async with database() as db:
+            projects = await _seed(db)
+
+            iterator = db.iter_projects(batch_size=4)
+            walked = []
+            async for project in iterator:
+                walked.append(project)
+                if len(walked) == 2:
+                    break
+            await iterator.aclose()
+
+            assert [project.id for project in walked] == sorted(project.id for project in projects)[:2]
+            # Прерванный обход не держит соединение и транзакцию чтения
+            assert db.engine.pool.checkedout() == 0
+            result = await db.create_project_checked(9999, "Новый", "Дизайн", "Описание")
+            assert result.project is not None
+
+    asyncio.run(scenario())
@@ -0,0 +1,70 @@
+import asyncio
+
+from bot.database import MediaJob
+from bot.misc.embeds.media import MediaEmbeds
+from bot.misc.media_jobs import MediaJobQueue
+
+RESULT = {'added': ["• photo.png"], 'errors': []}
+
+
+class _Message:
+    def __init__(self, fail: bool):
+        self.fail = fail
+        self.embeds = []
+
+    async def edit(self, embed) -> None:
+        if self.fail:
+            raise ConnectionError("сессия еще не создана")
+        self.embeds.append(embed)
+
+
+class _Client:
+    """Клиент, чья правка сообщения падает, пока `fail` выставлен"""
+
+    def __init__(self):
+        self.message = _Message(fail=True)
+
+    def get_partial_messageable(self, channel_id: int) -> "_Client":
+        return self
+
+    def get_partial_message(self, message_id: int) -> _Message:
+        return self.message
+
+
+async def _completed_job(db) -> MediaJob:
+    project = (await db.create_project_checked(1001, "Проект", "Дизайн", "Описание")).project
+    job = await db.enqueue_media_job(project.id, "Проект", channel_id=1, message_id=2, attachments=[])
+    job = await db.claim_media_job(lease=60)
+    assert await db.complete_media_job(job.id, job.attempts, project.id, [], RESULT) == []
+    return job
+
+
+async def _status(db, job_id: int) -> str:
+    async with db.get_session() as session:
+        return (await session.get(MediaJob, job_id)).status
+
+
+def test_failed_acknowledgement_is_redelivered_from_stored_result(database):
+    async def scenario():
+        async with database() as db:
+            queue = MediaJobQueue(db, media_utils=None)
+            queue.client = _Client()
+            job = await _completed_job(db)
+
+            # Правка не удалась: задача остается done, файлы уже сохранены
+            await queue._acknowledge(job, MediaEmbeds.media_add_result("Проект", RESULT['added'], RESULT['errors']))
+            assert await _status(db, job.id) == 'done'
+
+            # Повторную доставку забирает один обработчик до истечения аренды
+            queue.client.message.fail = False
+            (unacked,) = await db.claim_unacked_media_jobs(lease=0)
+            assert await db.claim_unacked_media_jobs(lease=60) == []
+            assert unacked.result == RESULT
+
+            await queue._acknowledge(unacked, MediaJobQueue._result_embed(unacked))
+            assert await _status(db, job.id) == 'acked'
+            assert "photo.png" in queue.client.message.embeds[0].fields[0].value
+            assert await db.claim_unacked_media_jobs(lease=0) == []
+
+    asyncio.run(scenario())
+
@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+import os
+
+from bot.database import Media
+from bot.misc.media_utils import MediaUtils
+
+
+def _write(path, data: bytes) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+def test_same_bytes_with_different_extensions_share_one_blob(tmp_path):
+    media_utils = MediaUtils(str(tmp_path / "media"))
+
+    png = media_utils.import_file(_write(tmp_path / "upload.png", b"content"))
+    jpg = media_utils.import_file(_write(tmp_path / "upload.jpg", b"content"))
+
+    assert png.path == jpg.path == media_utils.blob_path(hashlib.sha256(b"content").hexdigest())
+    assert (png.file_ext, jpg.file_ext) == (".png", ".jpg")
+    assert os.listdir(os.path.dirname(png.path)) == [os.path.basename(png.path)]
+
+
+def test_migration_moves_suffixed_blobs_to_hash_paths(tmp_path, database):
+    media_utils = MediaUtils(str(tmp_path / "media"))
+    sha256 = hashlib.sha256(b"content").hexdigest()
+    blob = media_utils.blob_path(sha256)
+    # Прежняя схема: одно содержимое под двумя расширениями — две копии
+    png = _write(f"{blob}.png", b"content")
+    jpg = _write(f"{blob}.jpg", b"content")
+
+    async def scenario():
+        async with database() as db:
+            project = (await db.create_project_checked(1001, "Проект", "Дизайн", "Описание")).project
+            async with db.get_session() as session:
+                session.add_all([
+                    Media(project_id=project.id, url=png, type='image', sha256=sha256, file_ext=".png"),
+                    Media(project_id=project.id, url=jpg, type='image', sha256=sha256, file_ext=".jpg"),
+                ])
+                await session.commit()
+
+            await media_utils.migrate_media_store(db)
+            # Повторный запуск ничего не меняет
+            await media_utils.migrate_media_store(db)
+
+            media = await db.get_project_media(project.id)
+            assert [m.url for m in media] == [blob, blob]
+            assert [MediaUtils.file_name(m) for m in media] == [f"{sha256}.png", f"{sha256}.jpg"]
+            assert os.listdir(os.path.dirname(blob)) == [sha256]
+
+            # Файл удаляется только вместе с последней записью
+            assert await db.remove_media_batch([media[0].id]) == (1, [])
+            assert await db.remove_media_batch([media[1].id]) == (1, [blob])
+
+    asyncio.run(scenario())
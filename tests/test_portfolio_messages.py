@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from bot.misc.embeds.portfolio import PortfolioEmbeds, MAX_EMBEDS_PER_MESSAGE, MAX_FILES_PER_MESSAGE
+
+MEMBER = SimpleNamespace(display_name="Тест", avatar=None)
+
+
+def _project(media: list) -> SimpleNamespace:
+    return SimpleNamespace(name="Проект", category="Дизайн", description="Описание", media=media)
+
+
+def _cdn_images(count: int) -> list:
+    expires_at = datetime.utcnow() + timedelta(days=1)
+    return [
+        SimpleNamespace(type='image', url=f"media/{i}.png", variants=[],
+                        cdn_url=f"https://cdn.discordapp.com/attachments/1/{i}/image.png", cdn_expires_at=expires_at)
+        for i in range(count)
+    ]
+
+
+def _uploads(tmp_path, count: int, size: int = 1024) -> list:
+    media = []
+    for i in range(count):
+        path = tmp_path / f"{i}.png"
+        path.write_bytes(b"\0" * size)
+        media.append(SimpleNamespace(type='image', url=str(path), variants=[], cdn_url=None, cdn_expires_at=None))
+    return media
+
+
+def _assert_within_limits(messages: list) -> None:
+    for message in messages:
+        assert len(message.embeds) <= MAX_EMBEDS_PER_MESSAGE
+        assert len(message.uploads) <= MAX_FILES_PER_MESSAGE
+
+
+def test_empty_portfolio_is_one_message():
+    messages = PortfolioEmbeds.portfolio_messages(MEMBER, [])
+
+    assert len(messages) == 1
+    assert len(messages[0].embeds) == 1
+    assert not messages[0].uploads
+
+
+def test_six_cdn_images_fit_one_message():
+    messages = PortfolioEmbeds.portfolio_messages(MEMBER, [_project(_cdn_images(6))])
+
+    # Шапка, проект и 6 изображений — одно сообщение без загрузок
+    assert len(messages) == 1
+    assert len(messages[0].embeds) == 8
+    assert messages[0].reused_refs == 6
+    assert not messages[0].uploads
+
+
+def test_fifteen_cdn_images_take_two_messages():
+    messages = PortfolioEmbeds.portfolio_messages(MEMBER, [_project(_cdn_images(15))])
+
+    _assert_within_limits(messages)
+    assert len(messages) == 2
+    assert [len(message.embeds) for message in messages] == [10, 7]
+    assert sum(message.reused_refs for message in messages) == 15
+
+
+def test_fifteen_cdn_images_page_keeps_overflow_in_second_part():
+    parts = PortfolioEmbeds.project_page(MEMBER, _project(_cdn_images(15)))
+
+    # Ни один медиафайл не теряется: не поместившиеся идут второй частью страницы
+    assert [len(part.embeds) for part in parts] == [10, 7]
+    assert sum(part.reused_refs for part in parts) == 15
+    assert parts[0].embeds[1].footer.text is None
+
+
+def test_eighteen_uploads_take_two_messages(tmp_path):
+    messages = PortfolioEmbeds.portfolio_messages(MEMBER, [_project(_uploads(tmp_path, 18))])
+
+    _assert_within_limits(messages)
+    assert len(messages) == 2
+    assert [len(message.uploads) for message in messages] == [10, 8]
+    assert [message.upload_bytes for message in messages] == [10 * 1024, 8 * 1024]
+    assert sum(message.reused_refs for message in messages) == 0
+
+
+def test_uploads_split_by_upload_limit(tmp_path):
+    messages = PortfolioEmbeds.portfolio_messages(
+        MEMBER, [_project(_uploads(tmp_path, 18, size=1024))], upload_limit=4 * 1024
+    )
+
+    assert [len(message.uploads) for message in messages] == [4, 4, 4, 4, 2]
+    assert all(message.upload_bytes <= 4 * 1024 for message in messages)
+
+
+def test_upload_over_limit_is_replaced_by_note(tmp_path):
+    media = _uploads(tmp_path, 3)
+    (tmp_path / "1.png").write_bytes(b"\0" * 8 * 1024)
+
+    messages = PortfolioEmbeds.portfolio_messages(MEMBER, [_project(media)], upload_limit=4 * 1024)
+
+    assert len(messages) == 1
+    assert [m.url for m in messages[0].uploads] == [media[0].url, media[2].url]
+    assert "1.png" in messages[0].embeds[-1].description
@@ -0,0 +1,45 @@
+import asyncio
+
+from sqlalchemy import event
+
+from tests.conftest import add_media
+
+DISCORD_ID = 1001
+
+
+def test_get_portfolio_loads_in_two_queries(database):
+    async def scenario():
+        async with database() as db:
+            for i in range(3):
+                result = await db.create_project_checked(DISCORD_ID, f"Проект {i}", "Дизайн", "Описание")
+                for media in await add_media(db, result.project.id, 3):
+                    await db.add_media_variants(media.id, [('preview', f"variants/{media.id}.webp", 1280, 960, 10000)])
+            await db.set_links(DISCORD_ID, [("https://example.com", "Сайт"), ("https://example.org", "Блог")])
+
+            statements = []
+
+            def count(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+
+            event.listen(db.engine.sync_engine, "before_cursor_execute", count)
+            try:
+                portfolio = await db.get_portfolio(DISCORD_ID)
+            finally:
+                event.remove(db.engine.sync_engine, "before_cursor_execute", count)
+
+            # Связи загружены заранее: обращение к ним вне сессии не дает запросов
+            assert len(portfolio.links) == 2
+            assert len(portfolio.projects) == 3
+            assert all(len(project.media) == 3 for project in portfolio.projects)
+            assert all(len(media.variants) == 1 for project in portfolio.projects for media in project.media)
+            assert len(statements) <= 2, statements
+
+    asyncio.run(scenario())
+
+
+def test_get_portfolio_unknown_user(database):
+    async def scenario():
+        async with database() as db:
+            assert await db.get_portfolio(DISCORD_ID) is None
+
+    asyncio.run(scenario())